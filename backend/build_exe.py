@@ -107,6 +107,11 @@ def build_exe():
         '--exclude-module=jupyter',
         '--exclude-module=pytest',
 
+        # 座標轉換在打包版使用 NumPy 引擎（numba 僅用於百萬級批次），
+        # 排除 numba/llvmlite 以縮小體積並縮短每次啟動的解壓與匯入時間
+        '--exclude-module=numba',
+        '--exclude-module=llvmlite',
+
         # 優化
         '--noupx',
         '--optimize=2',
@@ -160,7 +165,7 @@ def show_summary():
     print("\n⚠️ 注意:")
     print("  - 必須在 Windows 電腦上執行此腳本")
     print("  - Linux/Mac 無法編譯 Windows exe")
-    print("  - 首次啟動可能需要幾秒鐘")
+    print("  - 首次啟動需建立資料快照，之後啟動直接載入快照")
 
     print("=" * 60)
 
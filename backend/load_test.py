@@ -0,0 +1,161 @@
+"""
+Load Test
+Measures API tail latency under concurrent heatmap traffic.
+
+Runs a set of client threads issuing uncached (cold) heatmap range queries
+while a probe thread polls /health, then prints latency percentiles for
+both. A responsive server keeps /health latency flat no matter how much
+query work is in flight; it also reports how long bursts of identical
+cold requests take to be answered (coalesced into one computation).
+
+To measure what the query pool buys, run a second server with the pool
+disabled (HEATMAP_QUERY_WORKERS=0 runs query work inline on the event loop)
+and pass it as --baseline-url: both servers get the same load, one after
+the other, and the p95/p99 differences are reported.
+
+Usage (server already running):
+    python load_test.py --url http://127.0.0.1:8000 --clients 16 --duration 20
+
+Before/after comparison:
+    HEATMAP_QUERY_WORKERS=0 uvicorn src.main:app --port 8001 &
+    python load_test.py --url http://127.0.0.1:8000 --baseline-url http://127.0.0.1:8001
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+
+def fetch(url: str, timeout: float = 60.0) -> float:
+    """GET a URL and return the elapsed seconds (raises on HTTP errors)."""
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of latency samples, in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {'n': len(ordered), 'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99), 'max': pick(1.0)}
+
+
+def random_range_query(base: str, metadata: Dict) -> str:
+    """Build a heatmap range query that is unlikely to be cached."""
+    months = random.sample(metadata['months'], random.randint(1, len(metadata['months'])))
+    params = {
+        'month': months[0],
+        'months': ','.join(str(m) for m in sorted(months)),
+        'hour': random.randint(0, 23),
+        'hour_end': random.randint(0, 23),
+        'metric': random.choice(metadata['metrics'])['key'],
+        'day_type': random.choice(['平日', '假日']),
+        'agg': random.choice(['sum', 'mean']),
+    }
+    return f"{base}/api/heatmap?{urllib.parse.urlencode(params)}"
+
+
+def measure(base: str, clients: int, duration: float, burst: int) -> Dict:
+    """Run the concurrent load against one server and summarise latencies."""
+    with urllib.request.urlopen(f"{base}/api/metadata") as response:
+        metadata = json.load(response)
+
+    stop = threading.Event()
+    query_latency: List[float] = []
+    health_latency: List[float] = []
+    errors: List[str] = []
+
+    def client():
+        while not stop.is_set():
+            try:
+                query_latency.append(fetch(random_range_query(base, metadata)))
+            except (urllib.error.URLError, OSError) as e:
+                errors.append(str(e))
+
+    def probe():
+        while not stop.is_set():
+            try:
+                health_latency.append(fetch(f"{base}/health"))
+            except (urllib.error.URLError, OSError) as e:
+                errors.append(f"/health: {e}")
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    threads.append(threading.Thread(target=probe))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    def fetch_counting_errors(url: str):
+        try:
+            fetch(url)
+        except (urllib.error.URLError, OSError) as e:
+            errors.append(str(e))
+
+    # Bursts of identical cold requests: with coalescing these are answered
+    # by one computation, so the burst takes about as long as one request
+    burst_latency: List[float] = []
+    with ThreadPoolExecutor(burst) as pool:
+        for _ in range(3):
+            url = random_range_query(base, metadata)
+            started = time.perf_counter()
+            list(pool.map(lambda _: fetch_counting_errors(url), range(burst)))
+            burst_latency.append(time.perf_counter() - started)
+
+    return {
+        'health_ms': percentiles(health_latency),
+        'query_ms': percentiles(query_latency),
+        'burst_ms': [round(s * 1000, 1) for s in burst_latency],
+        'errors': len(errors),
+    }
+
+
+def tail_difference(result: Dict, baseline: Dict) -> Dict[str, Dict[str, float]]:
+    """p95/p99 of result minus baseline, in milliseconds (negative is faster)."""
+    difference = {}
+    for name in ('health_ms', 'query_ms'):
+        ours, theirs = result[name], baseline[name]
+        if ours and theirs:
+            difference[name] = {q: round(ours[q] - theirs[q], 1) for q in ('p95', 'p99')}
+    return difference
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API tail latency under concurrent load")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL")
+    parser.add_argument("--baseline-url",
+                        help="Server to compare against (e.g. started with HEATMAP_QUERY_WORKERS=0)")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent query clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run")
+    parser.add_argument("--burst", type=int, default=32, help="Identical cold requests per burst")
+    args = parser.parse_args()
+
+    result = measure(args.url.rstrip("/"), args.clients, args.duration, args.burst)
+    if args.baseline_url:
+        baseline = measure(args.baseline_url.rstrip("/"), args.clients, args.duration, args.burst)
+        result = {
+            'pooled': result,
+            'baseline': baseline,
+            'difference_ms': tail_difference(result, baseline),
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -54,5 +54,6 @@ if __name__ == "__main__":
             host=host,
             port=port,
             reload=API_CONFIG['reload'],
+            workers=get_worker_count(),
             log_level=API_CONFIG['log_level']
         )
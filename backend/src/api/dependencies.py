@@ -0,0 +1,228 @@
+"""
+API Dependencies
+Shared request validation and content negotiation helpers for the data routes.
+"""
+
+import hmac
+import math
+from typing import List, Optional
+
+from fastapi import Header, HTTPException, Request
+
+from ..services.data_loader import RANGE_AGGREGATIONS, CacheNotReadyError, DataCache, get_cache
+from ..services.serialization import HEATMAP_BINARY_MEDIA_TYPE
+from ..services.pyramid import resolution_for_zoom
+from ..services.spatial import GridBox, grid_box_from_bbox
+from ..utils.config import LOADING_CONFIG, RELOAD_CONFIG
+
+# Client hosts accepted by admin endpoints when no admin token is configured
+LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def require_cache() -> DataCache:
+    """
+    Get the loaded data cache for a data route.
+
+    Raises:
+        HTTPException: 503 with Retry-After while the data is still loading
+    """
+    try:
+        return get_cache()
+    except CacheNotReadyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(LOADING_CONFIG['retry_after'])}
+        )
+
+
+def require_admin(
+    request: Request,
+    x_admin_token: Optional[str] = Header(None, description="Admin token (HEATMAP_ADMIN_TOKEN)")
+):
+    """
+    Authorize an admin request.
+
+    Admin endpoints are disabled unless HEATMAP_ADMIN_TOKEN or
+    HEATMAP_ADMIN_RELOAD is set. With a token, the X-Admin-Token header must
+    match it; otherwise only requests from the local machine are accepted.
+
+    Raises:
+        HTTPException: 403 if the endpoints are disabled or the request is
+            not authorized
+    """
+    token = RELOAD_CONFIG['admin_token']
+    if not token and not RELOAD_CONFIG['admin_reload']:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints are disabled (set HEATMAP_ADMIN_RELOAD=true or HEATMAP_ADMIN_TOKEN)"
+        )
+    if token:
+        if x_admin_token is None or not hmac.compare_digest(x_admin_token, token):
+            raise HTTPException(status_code=403, detail="Invalid admin token")
+    elif request.client is None or request.client.host not in LOCAL_HOSTS:
+        raise HTTPException(status_code=403, detail="Admin endpoints are only available locally")
+
+
+def wants_binary(request: Request) -> bool:
+    """Check whether the client asked for the binary heatmap format via Accept."""
+    accept = request.headers.get("accept", "")
+    return HEATMAP_BINARY_MEDIA_TYPE in accept or "application/octet-stream" in accept
+
+
+def validate_period_params(
+    cache: DataCache,
+    month: int,
+    hour: int,
+    metric: str,
+    day_type: str
+):
+    """
+    Validate query parameters against the options available in the live data.
+
+    Raises:
+        HTTPException: 400 if any parameter is not available
+    """
+    if month not in cache.available_months:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid month: {month}. Available: {cache.available_months}"
+        )
+    if hour not in cache.available_hours:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid hour: {hour}. Available: {cache.available_hours}"
+        )
+    if metric not in cache.metrics:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid metric: {metric}. Available: {cache.metrics}"
+        )
+    if day_type not in cache.available_day_types:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid day_type: {day_type}. Available: {cache.available_day_types}"
+        )
+
+
+def parse_months(cache: DataCache, month: int, months: Optional[str]) -> List[int]:
+    """
+    Parse the comma-separated months parameter of a range query.
+
+    Args:
+        cache: Loaded data cache
+        month: Single month parameter, used when months is not given
+        months: Comma-separated month identifiers (e.g. "202412,202502")
+
+    Returns:
+        Distinct months in request order
+
+    Raises:
+        HTTPException: 400 if a month is malformed or not available
+    """
+    if not months:
+        return [month]
+    try:
+        parsed = list(dict.fromkeys(int(m) for m in months.split(",") if m.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid months: {months}")
+    invalid = [m for m in parsed if m not in cache.available_months]
+    if not parsed or invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid months: {months}. Available: {cache.available_months}"
+        )
+    return parsed
+
+
+def validate_range_params(cache: DataCache, hour_end: int, agg: str):
+    """
+    Validate the extra parameters of an hour-range / multi-month query.
+
+    Raises:
+        HTTPException: 400 if any parameter is not available
+    """
+    if hour_end not in cache.available_hours:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid hour_end: {hour_end}. Available: {cache.available_hours}"
+        )
+    if agg not in RANGE_AGGREGATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid agg: {agg}. Available: {RANGE_AGGREGATIONS}"
+        )
+
+
+def _parse_numbers(value: str, name: str, convert) -> list:
+    """Parse four comma-separated numbers of a box parameter."""
+    try:
+        numbers = [convert(v) for v in value.split(",")]
+    except ValueError:
+        numbers = []
+    if len(numbers) != 4:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value}. Expected four comma-separated numbers")
+    return numbers
+
+
+def parse_bbox(bbox: Optional[str], grid_bbox: Optional[str]) -> Optional[GridBox]:
+    """
+    Parse the viewport parameters of a heatmap query into a grid box.
+
+    Args:
+        bbox: WGS84 extent "min_lng,min_lat,max_lng,max_lat" (the order of
+            an OpenLayers EPSG:4326 extent)
+        grid_bbox: Inclusive grid extent "gx_min,gy_min,gx_max,gy_max"
+
+    Returns:
+        Inclusive grid box, or None if neither parameter is given
+
+    Raises:
+        HTTPException: 400 if a parameter is malformed or both are given
+    """
+    if bbox and grid_bbox:
+        raise HTTPException(status_code=400, detail="Use either bbox or grid_bbox, not both")
+    if grid_bbox:
+        gx0, gy0, gx1, gy1 = _parse_numbers(grid_bbox, "grid_bbox", int)
+        if gx1 < gx0 or gy1 < gy0:
+            raise HTTPException(status_code=400, detail=f"Invalid grid_bbox: {grid_bbox}. Empty box")
+        return gx0, gy0, gx1, gy1
+    if bbox:
+        min_lng, min_lat, max_lng, max_lat = _parse_numbers(bbox, "bbox", float)
+        if not all(math.isfinite(v) for v in (min_lng, min_lat, max_lng, max_lat)):
+            raise HTTPException(status_code=400, detail=f"Invalid bbox: {bbox}")
+        box = grid_box_from_bbox(min_lng, min_lat, max_lng, max_lat)
+        if box is None:
+            raise HTTPException(status_code=400, detail=f"Invalid bbox: {bbox}. Empty box")
+        return box
+    return None
+
+
+def parse_resolution(cache: DataCache, resolution: Optional[int], zoom: Optional[float]) -> int:
+    """
+    Pick the grid resolution of a heatmap query.
+
+    Args:
+        cache: Loaded data cache
+        resolution: Requested cell size in meters
+        zoom: Web map zoom level; picks the coarsest pyramid level whose
+            cells stay a few pixels wide (see pyramid.resolution_for_zoom)
+
+    Returns:
+        Cell size in meters (the base grid if neither is given)
+
+    Raises:
+        HTTPException: 400 if the resolution is not available or both are given
+    """
+    if resolution is not None and zoom is not None:
+        raise HTTPException(status_code=400, detail="Use either resolution or zoom, not both")
+    if zoom is not None:
+        return resolution_for_zoom(zoom, cache.resolutions)
+    if resolution is None:
+        return cache.resolutions[0]
+    if resolution not in cache.resolutions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid resolution: {resolution}. Available: {cache.resolutions}"
+        )
+    return resolution
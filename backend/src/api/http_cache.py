@@ -0,0 +1,94 @@
+"""
+HTTP Caching Helpers
+Strong ETags and conditional GET handling for the data endpoints.
+
+Responses only change when the dataset changes, so ETags are derived from
+the dataset version fingerprint plus the query key. Clients and proxies can
+then revalidate with If-None-Match and receive 304 Not Modified without the
+response being recomputed or resent.
+
+While the data can be reloaded at runtime, responses are sent with no-cache
+(or a short max-age), so clients revalidate and pick up a reload instead of
+reusing a representation of the previous version until it expires.
+"""
+
+import hashlib
+from typing import Dict, Hashable, Optional
+
+from fastapi import Request, Response
+
+from ..utils.config import HTTP_CACHE_CONFIG, runtime_reload_enabled
+
+
+def make_etag(version: str, *key: Hashable) -> str:
+    """
+    Build a strong ETag for a dataset version and query key.
+
+    Args:
+        version: Dataset version fingerprint
+        key: Values identifying the representation (route, params, format)
+
+    Returns:
+        Quoted ETag value
+    """
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def max_age() -> int:
+    """Get the max-age of cacheable responses (shorter while the data can be reloaded)."""
+    if runtime_reload_enabled():
+        return HTTP_CACHE_CONFIG['reload_max_age']
+    return HTTP_CACHE_CONFIG['max_age']
+
+
+def cache_headers(etag: str, revalidate: bool = False) -> Dict[str, str]:
+    """
+    Get the ETag and Cache-Control headers for a cacheable response.
+
+    Args:
+        etag: ETag of the representation
+        revalidate: Always send no-cache (for responses naming the dataset
+            version, such as the metadata, which must reflect a reload)
+    """
+    age = 0 if revalidate else max_age()
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={age}" if age > 0 else "no-cache",
+    }
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Check whether the request's If-None-Match matches the current ETag.
+
+    Uses the weak comparison required for If-None-Match, so W/ prefixes added
+    by intermediaries (e.g. after compression) still match.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(
+        (tag[2:] if tag.startswith("W/") else tag) == etag
+        for tag in candidates
+    )
+
+
+def not_modified_response(
+    etag: str,
+    headers: Optional[Dict[str, str]] = None,
+    revalidate: bool = False
+) -> Response:
+    """
+    Build an empty 304 Not Modified response carrying the cache headers.
+
+    Args:
+        etag: Current ETag of the representation
+        headers: Extra headers the full response would carry (e.g. Vary)
+        revalidate: Same as for cache_headers()
+    """
+    return Response(status_code=304, headers={**cache_headers(etag, revalidate), **(headers or {})})
@@ -25,6 +25,11 @@ class HeatmapResponse(BaseModel):
     min_weight: float = Field(..., description="Minimum weight value in dataset")
     max_weight: float = Field(..., description="Maximum weight value in dataset")
     data: List[HeatmapDataPoint] = Field(..., description="Array of location data points")
+    hour_end: Optional[int] = Field(None, description="Last hour of an aggregated hour range", ge=0, le=23)
+    months: Optional[List[int]] = Field(None, description="Months aggregated by a range query")
+    agg: Optional[str] = Field(None, description="Range aggregation (sum or mean)")
+    resolution: Optional[int] = Field(None, description="Cell size in meters of a coarser pyramid level (omitted for the 50 m grid)")
+    tile: Optional[List[int]] = Field(None, description="Map tile [z, x, y] the points were clipped to")
 
     class Config:
         json_schema_extra = {
@@ -85,6 +90,8 @@ class DemographicResponse(BaseModel):
     """Response containing demographic statistics."""
     month: int = Field(..., description="Month identifier (YYYYMM)")
     hour: int = Field(..., description="Hour of day (0-23)", ge=0, le=23)
+    hour_end: Optional[int] = Field(None, description="Last hour of a pooled hour range", ge=0, le=23)
+    months: Optional[List[int]] = Field(None, description="Months pooled by a range query")
     metric: str = Field(..., description="Metric used for weighting")
     total_users: float = Field(..., description="Total user count across all locations for this time period")
     demographics: Demographics
@@ -118,6 +125,28 @@ class DemographicResponse(BaseModel):
         }
 
 
+class MultiMetricDemographicResponse(BaseModel):
+    """Response containing demographic statistics for every metric of one time period."""
+    month: int = Field(..., description="Month identifier (YYYYMM)")
+    hour: int = Field(..., description="Hour of day (0-23)", ge=0, le=23)
+    day_type: str = Field(..., description="Day type (平日 or 假日)")
+    metrics: Dict[str, DemographicResponse] = Field(..., description="Demographic statistics keyed by metric")
+
+
+class CellProfileResponse(BaseModel):
+    """Every month, day type, hour and metric of one grid cell."""
+    gx: int = Field(..., description="Grid X coordinate (Taiwan TWD97 TM2 system)")
+    gy: int = Field(..., description="Grid Y coordinate (Taiwan TWD97 TM2 system)")
+    lat: float = Field(..., description="WGS84 latitude of the cell center")
+    lng: float = Field(..., description="WGS84 longitude of the cell center")
+    months: List[int] = Field(..., description="Month axis of the values")
+    day_types: List[str] = Field(..., description="Day type axis of the values")
+    hours: List[int] = Field(..., description="Hour axis of the values")
+    values: Dict[str, List[List[List[Optional[float]]]]] = Field(
+        ..., description="Per metric: values[month][day_type][hour] (null where the cell has no data)"
+    )
+
+
 class MetricOption(BaseModel):
     """Metric option with key and label."""
     key: str = Field(..., description="Metric identifier")
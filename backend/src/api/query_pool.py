@@ -0,0 +1,91 @@
+"""
+Query Pool
+Runs CPU-bound query work off the event loop, coalescing identical queries.
+
+Route handlers are async, but building a heatmap payload, loading a
+partition or constructing response models is synchronous NumPy / Python
+work. Running it inline would block every other request on the event
+loop, including /health. run_query() hands the work to a bounded thread
+pool, and concurrent calls with the same key (e.g. many clients asking for
+the same cold period at once) await a single execution instead of each
+computing it.
+
+HEATMAP_QUERY_WORKERS=0 disables the pool and runs the work inline, which
+is only useful as a baseline when measuring the pool with load_test.py.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from ..utils.config import QUERY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# In-flight executions by (event loop, key); entries are removed when done
+_inflight: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Future] = {}
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the query thread pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=QUERY_CONFIG['workers'],
+                thread_name_prefix="query"
+            )
+            logger.info(f"Query pool started with {QUERY_CONFIG['workers']} threads")
+        return _executor
+
+
+def shutdown_executor():
+    """Stop the query thread pool (a later run_query() starts a new one)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+async def run_query(key: Optional[Hashable], fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run fn(*args) in the query pool and return its result.
+
+    Args:
+        key: Identifies the result (e.g. the response ETag, which covers the
+            dataset version and every query parameter); concurrent calls
+            with an equal key share one execution. None disables coalescing.
+        fn: Synchronous function to run
+        args: Positional arguments for fn
+
+    Returns:
+        The function's result (exceptions propagate to every waiter)
+    """
+    if QUERY_CONFIG['workers'] <= 0:
+        return fn(*args)
+
+    loop = asyncio.get_running_loop()
+    if key is None:
+        return await loop.run_in_executor(get_executor(), partial(fn, *args))
+
+    inflight_key = (loop, key)
+    future = _inflight.get(inflight_key)
+    if future is None:
+        future = loop.run_in_executor(get_executor(), partial(fn, *args))
+        _inflight[inflight_key] = future
+
+        def done(finished: asyncio.Future):
+            if _inflight.get(inflight_key) is finished:
+                del _inflight[inflight_key]
+
+        future.add_done_callback(done)
+
+    # A waiter that goes away (client disconnect) must not cancel the shared work
+    return await asyncio.shield(future)
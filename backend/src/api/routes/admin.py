@@ -0,0 +1,39 @@
+"""
+Admin API Routes
+Operational endpoints (data reload).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from typing import Optional
+
+from ...services.data_loader import (
+    CacheNotReadyError,
+    ReloadInProgressError,
+    get_load_status,
+    start_background_reload
+)
+from ..dependencies import require_admin
+
+router = APIRouter()
+
+
+@router.post("/admin/reload", status_code=202, dependencies=[Depends(require_admin)])
+async def reload_data(
+    force: Optional[bool] = Query(False, description="Rebuild even if data.csv is unchanged")
+):
+    """
+    Reload data.csv without restarting the server.
+
+    A new data cache is built in the background while the current one keeps
+    serving requests, then swapped in atomically. Progress is reported under
+    `reload` by `/ready`. Returns 409 if a load or reload is already running.
+    """
+    try:
+        start_background_reload(force)
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except CacheNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return JSONResponse(get_load_status(), status_code=202)
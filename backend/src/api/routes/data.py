@@ -3,13 +3,27 @@ Data API Routes
 Endpoints for heatmap data and metadata retrieval.
 """
 
-from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Iterator, Optional
 
-from ...services.data_loader import get_cache
+from ...services.data_loader import DataCache
+from ...services.serialization import (
+    HEATMAP_BINARY_MEDIA_TYPE,
+    HEATMAP_FRAMES_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    frame_binary,
+    frame_ndjson
+)
+from ..dependencies import (
+    require_cache, parse_bbox, parse_months, parse_resolution, validate_period_params, validate_range_params,
+    wants_binary
+)
+from ..http_cache import cache_headers, is_not_modified, make_etag, not_modified_response
+from ..query_pool import run_query
 from ..models.response import (
+    CellProfileResponse,
     HeatmapResponse,
-    HeatmapDataPoint,
     MetadataResponse,
     MetricOption,
     DataCoverage
@@ -18,12 +32,25 @@ from ..models.response import (
 router = APIRouter()
 
 
-@router.get("/heatmap", response_model=HeatmapResponse)
+@router.get(
+    "/heatmap",
+    response_model=HeatmapResponse,
+    responses={200: {"content": {HEATMAP_BINARY_MEDIA_TYPE: {}}}}
+)
 async def get_heatmap_data(
+    request: Request,
+    cache: DataCache = Depends(require_cache),
     month: Optional[int] = Query(202412, description="Month identifier in YYYYMM format"),
     hour: Optional[int] = Query(0, description="Hour of day (0-23)", ge=0, le=23),
     metric: Optional[str] = Query("avg_total_users", description="User duration metric to visualize"),
-    day_type: Optional[str] = Query("平日", description="Day type (平日 or 假日)")
+    day_type: Optional[str] = Query("平日", description="Day type (平日 or 假日)"),
+    hour_end: Optional[int] = Query(None, description="Last hour of an hour range (inclusive)", ge=0, le=23),
+    months: Optional[str] = Query(None, description="Comma-separated months to aggregate (YYYYMM)"),
+    agg: Optional[str] = Query("sum", description="Range aggregation (sum or mean)"),
+    bbox: Optional[str] = Query(None, description="Viewport min_lng,min_lat,max_lng,max_lat (WGS84)"),
+    grid_bbox: Optional[str] = Query(None, description="Viewport gx_min,gy_min,gx_max,gy_max (inclusive)"),
+    resolution: Optional[int] = Query(None, description="Grid cell size in meters (50, or a pyramid level)"),
+    zoom: Optional[float] = Query(None, description="Map zoom level; picks a pyramid level", ge=0, le=24)
 ):
     """
     Get heatmap data for specific time period.
@@ -36,79 +63,172 @@ async def get_heatmap_data(
     - **hour**: Hour of day (0-23, 24-hour format)
     - **metric**: User duration metric to visualize
     - **day_type**: Day type (平日 or 假日)
+    - **hour_end**: Aggregate hours `hour`..`hour_end` (wraps past midnight)
+    - **months**: Aggregate several months, e.g. `202412,202502`
+    - **agg**: `sum` of hourly weights, or `mean` over the periods with data
+    - **bbox**: Only return cells in the viewport `min_lng,min_lat,max_lng,max_lat`
+      (plus a one-cell margin)
+    - **grid_bbox**: Only return cells in the grid box `gx_min,gy_min,gx_max,gy_max`
+    - **resolution**: Aggregate to coarser cells (e.g. `200` for 200 m); gx/gy
+      are then coordinates on that grid
+    - **zoom**: Pick the resolution for a map zoom level instead
+
+    The chosen resolution is returned in the `X-Heatmap-Resolution` header.
+
+    Send `Accept: application/vnd.heatmap+octet-stream` to receive the compact
+    binary encoding (packed float32 lat/lng/weight and int16 gx/gy columns)
+    instead of JSON.
     """
     try:
-        cache = get_cache()
-        
-        # Get available options from cache for validation
-        metadata = cache.get_metadata()
-        available_months = metadata['months']
-        available_hours = metadata['hours']
-        available_day_types = metadata['day_types']
-        available_metrics = [m['key'] for m in metadata['metrics']]
-
         # Validate inputs against live data
-        if month not in available_months:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid month: {month}. Available: {available_months}"
-            )
-        if hour not in available_hours:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid hour: {hour}. Available: {available_hours}"
+        is_range = hour_end is not None or bool(months)
+        month_list = parse_months(cache, month, months)
+        if is_range:
+            hour_end = hour if hour_end is None else hour_end
+            validate_range_params(cache, hour_end, agg)
+        validate_period_params(cache, month_list[0], hour, metric, day_type)
+        box = parse_bbox(bbox, grid_bbox)
+        resolution = parse_resolution(cache, resolution, zoom)
+
+        # Pre-rendered body, built once per period/metric/format from the column
+        # arrays (an empty period yields 200 OK with an empty data list)
+        if wants_binary(request):
+            fmt, media_type = "binary", HEATMAP_BINARY_MEDIA_TYPE
+        else:
+            fmt, media_type = "json", "application/json"
+
+        if is_range:
+            etag = make_etag(
+                cache.version, "heatmap_range", tuple(month_list), hour, hour_end, metric, day_type, agg, fmt, box,
+                resolution
             )
-        if metric not in available_metrics:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid metric: {metric}. Available: {available_metrics}"
+        else:
+            etag = make_etag(cache.version, "heatmap", month, hour, metric, day_type, fmt, box, resolution)
+        headers = {"Vary": "Accept", "X-Heatmap-Resolution": str(resolution)}
+        if is_not_modified(request, etag):
+            return not_modified_response(etag, headers)
+
+        # Rendered in the query pool; identical concurrent requests share one render
+        if is_range:
+            # Served from hour-axis prefix sums, independent of range length
+            payload = await run_query(
+                etag, cache.get_heatmap_range_payload,
+                month_list, hour, hour_end, metric, day_type, agg, fmt, box, resolution
             )
-        if day_type not in available_day_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid day_type: {day_type}. Available: {available_day_types}"
+        else:
+            payload = await run_query(
+                etag, cache.get_heatmap_payload, month, hour, metric, day_type, fmt, box, resolution
             )
+        return Response(
+            content=payload,
+            media_type=media_type,
+            headers={**cache_headers(etag), **headers}
+        )
 
-        data = cache.get_heatmap_data(month, hour, metric, day_type)
-
-        if not data:
-            # Use 200 OK with empty data list instead of 404
-            # A lack of data for a valid time period is not a client error
-            return HeatmapResponse(
-                month=month,
-                hour=hour,
-                metric=metric,
-                count=0,
-                min_weight=0,
-                max_weight=0,
-                data=[]
-            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Catch-all for unexpected errors
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-        # Calculate min/max weights
-        weights = [point['weight'] for point in data]
-        min_weight = min(weights) if weights else 0
-        max_weight = max(weights) if weights else 0
 
-        # Convert to response model
-        data_points = [HeatmapDataPoint(**point) for point in data]
-
-        return HeatmapResponse(
-            month=month,
-            hour=hour,
-            metric=metric,
-            count=len(data_points),
-            min_weight=min_weight,
-            max_weight=max_weight,
-            data=data_points
+@router.get(
+    "/heatmap/pack",
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}, HEATMAP_FRAMES_MEDIA_TYPE: {}}}}
+)
+async def get_heatmap_pack(
+    request: Request,
+    cache: DataCache = Depends(require_cache),
+    month: Optional[int] = Query(202412, description="Month identifier in YYYYMM format"),
+    metric: Optional[str] = Query("avg_total_users", description="User duration metric to visualize"),
+    day_type: Optional[str] = Query("平日", description="Day type (平日 or 假日)"),
+    resolution: Optional[int] = Query(None, description="Grid cell size in meters (50, or a pyramid level)"),
+    zoom: Optional[float] = Query(None, description="Map zoom level; picks a pyramid level", ge=0, le=24)
+):
+    """
+    Stream heatmap data for every hour of a month in one response.
+
+    Frames are produced hour by hour from the payload cache, so the first
+    frame can be rendered before the last one is sent. Each frame is the
+    same body /api/heatmap returns for that hour.
+
+    - NDJSON (default): one HeatmapResponse JSON document per line
+    - `Accept: application/vnd.heatmap-frames+octet-stream`: binary heatmap
+      payloads, each prefixed with its uint32 little-endian byte length
+    """
+    try:
+        # Validate inputs against live data
+        validate_period_params(cache, month, cache.available_hours[0], metric, day_type)
+        resolution = parse_resolution(cache, resolution, zoom)
+
+        accept = request.headers.get("accept", "")
+        if HEATMAP_FRAMES_MEDIA_TYPE in accept or wants_binary(request):
+            fmt, media_type, frame = "binary", HEATMAP_FRAMES_MEDIA_TYPE, frame_binary
+        else:
+            fmt, media_type, frame = "json", NDJSON_MEDIA_TYPE, frame_ndjson
+
+        etag = make_etag(cache.version, "heatmap_pack", month, metric, day_type, fmt, resolution)
+        headers = {"Vary": "Accept", "X-Heatmap-Resolution": str(resolution)}
+        if is_not_modified(request, etag):
+            return not_modified_response(etag, headers)
+
+        def frames() -> Iterator[bytes]:
+            # Sync generator: Starlette iterates it in the threadpool
+            for hour in cache.available_hours:
+                yield frame(cache.get_heatmap_payload(month, hour, metric, day_type, fmt, resolution=resolution))
+
+        return StreamingResponse(
+            frames(),
+            media_type=media_type,
+            headers={**cache_headers(etag), **headers}
         )
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/cell/{gx}/{gy}/profile", response_model=CellProfileResponse)
+async def get_cell_profile(
+    request: Request,
+    response: Response,
+    gx: int,
+    gy: int,
+    cache: DataCache = Depends(require_cache)
+):
+    """
+    Get the time profile of one grid cell.
+
+    Returns the cell's values for every month, day type, hour and metric in
+    one response (e.g. for a sparkline in the map tooltip), looked up in a
+    cell-major index instead of every period slice.
+
+    - **gx**, **gy**: Grid coordinates of the cell (50 m grid)
+    """
+    try:
+        etag = make_etag(cache.version, "cell_profile", gx, gy)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
+        profile = await run_query(etag, cache.get_cell_profile, gx, gy)
+        if profile is None:
+            raise HTTPException(status_code=404, detail=f"No data for cell ({gx}, {gy})")
+        response.headers.update(cache_headers(etag))
+        return CellProfileResponse(**profile)
+
+    except HTTPException:
+        raise
     except Exception as e:
-        # Catch-all for unexpected errors, e.g., cache not initialized
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
 @router.get("/metadata", response_model=MetadataResponse)
-async def get_metadata():
+async def get_metadata(
+    request: Request,
+    response: Response,
+    cache: DataCache = Depends(require_cache)
+):
     """
     Get system metadata.
 
@@ -116,7 +236,11 @@ async def get_metadata():
     Used by frontend to populate dropdown options and validate selections.
     """
     try:
-        cache = get_cache()
+        etag = make_etag(cache.version, "metadata")
+        if is_not_modified(request, etag):
+            return not_modified_response(etag, revalidate=True)
+        response.headers.update(cache_headers(etag, revalidate=True))
+
         metadata = cache.get_metadata()
 
         # Convert to response model
@@ -128,5 +252,7 @@ async def get_metadata():
             data_coverage=DataCoverage(**metadata['data_coverage'])
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
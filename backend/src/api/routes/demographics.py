@@ -3,13 +3,16 @@ Demographics API Routes
 Endpoints for demographic statistics retrieval.
 """
 
-from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
-from functools import lru_cache
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
 
-from ...services.data_loader import get_cache
+from ...services.data_loader import DataCache
+from ..dependencies import require_cache, parse_months, validate_period_params, validate_range_params
+from ..http_cache import cache_headers, is_not_modified, make_etag, not_modified_response
+from ..query_pool import run_query
 from ..models.response import (
     DemographicResponse,
+    MultiMetricDemographicResponse,
     Demographics,
     GenderDistribution,
     AgeDistribution
@@ -18,23 +21,56 @@ from ..models.response import (
 router = APIRouter()
 
 
-@lru_cache(maxsize=128)
-def _get_demographics_cached(month: int, hour: int, metric: str, day_type: str) -> dict:
+def build_demographic_response(
+    month: int,
+    hour: int,
+    metric: str,
+    demo_data: dict,
+    hour_end: Optional[int] = None,
+    months: Optional[List[int]] = None
+) -> DemographicResponse:
     """
-    Cached demographic calculation.
+    Convert a DataCache demographics dictionary to the response model.
 
-    LRU cache improves performance for frequently accessed time periods.
+    Periods without users produce an all-zero but valid response.
     """
-    cache = get_cache()
-    return cache.get_demographics(month, hour, metric, day_type)
+    age = demo_data['age']
+    return DemographicResponse(
+        month=month,
+        hour=hour,
+        hour_end=hour_end,
+        months=months,
+        metric=metric,
+        total_users=demo_data['total_users'],
+        demographics=Demographics(
+            gender=GenderDistribution(**demo_data['gender']),
+            age=AgeDistribution(
+                under_19=age.get('age_1', 0),
+                age_20_24=age.get('age_2', 0),
+                age_25_29=age.get('age_3', 0),
+                age_30_34=age.get('age_4', 0),
+                age_35_39=age.get('age_5', 0),
+                age_40_44=age.get('age_6', 0),
+                age_45_49=age.get('age_7', 0),
+                age_50_54=age.get('age_8', 0),
+                age_55_59=age.get('age_9', 0),
+                age_60_plus=age.get('age_other', 0)
+            )
+        )
+    )
 
 
-@router.get("/demographics", response_model=DemographicResponse)
+@router.get("/demographics", response_model=DemographicResponse, response_model_exclude_none=True)
 async def get_demographics(
+    request: Request,
+    response: Response,
+    cache: DataCache = Depends(require_cache),
     month: Optional[int] = Query(202412, description="Month identifier in YYYYMM format"),
     hour: Optional[int] = Query(0, description="Hour of day (0-23)", ge=0, le=23),
     metric: Optional[str] = Query("avg_total_users", description="Metric to use for weighting"),
-    day_type: Optional[str] = Query("平日", description="Day type (平日 or 假日)")
+    day_type: Optional[str] = Query("平日", description="Day type (平日 or 假日)"),
+    hour_end: Optional[int] = Query(None, description="Last hour of an hour range (inclusive)", ge=0, le=23),
+    months: Optional[str] = Query(None, description="Comma-separated months to aggregate (YYYYMM)")
 ):
     """
     Get demographic statistics for specific time period.
@@ -47,77 +83,87 @@ async def get_demographics(
     - **hour**: Hour of day (0-23)
     - **metric**: Metric to use for weighting demographic calculations
     - **day_type**: Day type (平日 or 假日)
+    - **hour_end**: Pool hours `hour`..`hour_end` (wraps past midnight)
+    - **months**: Pool several months, e.g. `202412,202502`
     """
     try:
-        cache = get_cache()
-        
-        # Get available options from cache for validation
-        metadata = cache.get_metadata()
-        available_months = metadata['months']
-        available_hours = metadata['hours']
-        available_day_types = metadata['day_types']
-        available_metrics = [m['key'] for m in metadata['metrics']]
+        # Validate inputs against live data
+        is_range = hour_end is not None or bool(months)
+        month_list = parse_months(cache, month, months)
+        if is_range:
+            hour_end = hour if hour_end is None else hour_end
+            validate_range_params(cache, hour_end, "sum")
+        validate_period_params(cache, month_list[0], hour, metric, day_type)
+
+        if is_range:
+            etag = make_etag(cache.version, "demographics_range", tuple(month_list), hour, hour_end, metric, day_type)
+        else:
+            etag = make_etag(cache.version, "demographics", month, hour, metric, day_type)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        response.headers.update(cache_headers(etag))
+
+        if is_range:
+            def build() -> DemographicResponse:
+                demo_data = cache.get_demographics_range(month_list, hour, hour_end, metric, day_type)
+                return build_demographic_response(month_list[0], hour, metric, demo_data, hour_end, month_list)
+        else:
+            def build() -> DemographicResponse:
+                # Precomputed at load time, so this is direct array indexing
+                demo_data = cache.get_demographics(month, hour, metric, day_type)
+                return build_demographic_response(month, hour, metric, demo_data)
+
+        return await run_query(etag, build)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/demographics/all", response_model=MultiMetricDemographicResponse, response_model_exclude_none=True)
+async def get_demographics_all(
+    request: Request,
+    response: Response,
+    cache: DataCache = Depends(require_cache),
+    month: Optional[int] = Query(202412, description="Month identifier in YYYYMM format"),
+    hour: Optional[int] = Query(0, description="Hour of day (0-23)", ge=0, le=23),
+    day_type: Optional[str] = Query("平日", description="Day type (平日 or 假日)")
+):
+    """
+    Get demographic statistics for a time period under every metric at once.
 
+    Returns the same per-metric payload as /demographics, keyed by metric, so
+    switching metrics on the client does not need another round trip.
+
+    - **month**: Month identifier in YYYYMM format
+    - **hour**: Hour of day (0-23)
+    - **day_type**: Day type (平日 or 假日)
+    """
+    try:
         # Validate inputs against live data
-        if month not in available_months:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid month: {month}. Available: {available_months}"
-            )
-        if hour not in available_hours:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid hour: {hour}. Available: {available_hours}"
-            )
-        if metric not in available_metrics:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid metric: {metric}. Available: {available_metrics}"
-            )
-        if day_type not in available_day_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid day_type: {day_type}. Available: {available_day_types}"
-            )
-        
-        # Use cached calculation
-        demo_data = _get_demographics_cached(month, hour, metric, day_type)
+        validate_period_params(cache, month, hour, cache.metrics[0], day_type)
 
-        if demo_data['total_users'] == 0:
-            # Return empty but valid response instead of 404
-            return DemographicResponse(
+        etag = make_etag(cache.version, "demographics_all", month, hour, day_type)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        response.headers.update(cache_headers(etag))
+
+        def build() -> MultiMetricDemographicResponse:
+            all_data = cache.get_demographics_all(month, hour, day_type)
+            return MultiMetricDemographicResponse(
                 month=month,
                 hour=hour,
-                metric=metric,
-                total_users=0,
-                demographics=Demographics(
-                    gender=GenderDistribution(male=0, female=0),
-                    age=AgeDistribution()
-                )
+                day_type=day_type,
+                metrics={
+                    metric: build_demographic_response(month, hour, metric, demo_data)
+                    for metric, demo_data in all_data.items()
+                }
             )
 
-        # Convert to response model
-        return DemographicResponse(
-            month=month,
-            hour=hour,
-            metric=metric,
-            total_users=demo_data['total_users'],
-            demographics=Demographics(
-                gender=GenderDistribution(**demo_data['gender']),
-                age=AgeDistribution(
-                    under_19=demo_data['age'].get('age_1', 0),
-                    age_20_24=demo_data['age'].get('age_2', 0),
-                    age_25_29=demo_data['age'].get('age_3', 0),
-                    age_30_34=demo_data['age'].get('age_4', 0),
-                    age_35_39=demo_data['age'].get('age_5', 0),
-                    age_40_44=demo_data['age'].get('age_6', 0),
-                    age_45_49=demo_data['age'].get('age_7', 0),
-                    age_50_54=demo_data['age'].get('age_8', 0),
-                    age_55_59=demo_data['age'].get('age_9', 0),
-                    age_60_plus=demo_data['age'].get('age_other', 0)
-                )
-            )
-        )
+        return await run_query(etag, build)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
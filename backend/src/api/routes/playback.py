@@ -0,0 +1,125 @@
+"""
+Playback API Routes
+Server-push autoplay stream over Server-Sent Events.
+"""
+
+import asyncio
+import itertools
+import json
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ...services.data_loader import DataCache
+from ..dependencies import require_cache, validate_period_params
+from ..query_pool import run_query
+from .demographics import build_demographic_response
+
+router = APIRouter()
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+
+def build_frame_event(cache: DataCache, month: int, hour: int, metric: str, day_type: str) -> bytes:
+    """
+    Build one SSE "frame" event carrying an hour's heatmap and demographics.
+
+    The heatmap part is the pre-rendered /api/heatmap JSON body and the
+    demographics part is the /api/demographics body for the same period.
+    """
+    heatmap = cache.get_heatmap_payload(month, hour, metric, day_type)
+    demographics = build_demographic_response(
+        month, hour, metric, cache.get_demographics(month, hour, metric, day_type)
+    ).model_dump_json(exclude_none=True).encode("utf-8")
+
+    header = json.dumps({"month": month, "hour": hour, "metric": metric, "day_type": day_type},
+                        ensure_ascii=False)
+    data = (header[:-1].encode("utf-8") + b',"heatmap":' + heatmap
+            + b',"demographics":' + demographics + b'}')
+    return b"event: frame\ndata: " + data + b"\n\n"
+
+
+async def playback_events(
+    request: Request,
+    cache: DataCache,
+    month: int,
+    metric: str,
+    day_type: str,
+    start_hour: int,
+    interval: float,
+    loop: bool
+) -> AsyncIterator[bytes]:
+    """
+    Push hourly frames at a fixed rate until the client disconnects.
+
+    Pacing is driven by a monotonic deadline so frame build and send time do
+    not accumulate drift. Each yield completes only once the server has
+    handed the frame to the transport, which pauses while the client's
+    receive buffer is full; a client that falls behind is therefore re-paced
+    from the current time instead of being sent a burst of stale frames.
+    """
+    hours = cache.available_hours
+    position = hours.index(start_hour) if start_hour in hours else 0
+    event_loop = asyncio.get_running_loop()
+    deadline = event_loop.time()
+
+    # Let EventSource reconnect at roughly the playback rate
+    yield f"retry: {int(interval * 1000)}\n\n".encode("utf-8")
+
+    steps = itertools.count() if loop else range(len(hours))
+    for step in steps:
+        if await request.is_disconnected():
+            break
+
+        hour = hours[(position + step) % len(hours)]
+        # Viewers playing the same sequence share each frame's build
+        yield await run_query(
+            (cache.version, "frame", month, hour, metric, day_type),
+            build_frame_event, cache, month, hour, metric, day_type
+        )
+
+        deadline += interval
+        delay = deadline - event_loop.time()
+        if delay < 0:
+            deadline = event_loop.time()
+            delay = 0
+        await asyncio.sleep(delay)
+
+    yield b"event: end\ndata: {}\n\n"
+
+
+@router.get("/playback/stream", responses={200: {"content": {EVENT_STREAM_MEDIA_TYPE: {}}}})
+async def stream_playback(
+    request: Request,
+    cache: DataCache = Depends(require_cache),
+    month: Optional[int] = Query(202412, description="Month identifier in YYYYMM format"),
+    metric: Optional[str] = Query("avg_total_users", description="User duration metric to visualize"),
+    day_type: Optional[str] = Query("平日", description="Day type (平日 or 假日)"),
+    start_hour: Optional[int] = Query(0, description="First hour to push (0-23)", ge=0, le=23),
+    interval_ms: Optional[int] = Query(1000, description="Milliseconds between frames", ge=100, le=60000),
+    loop: Optional[bool] = Query(True, description="Keep cycling through the day until disconnected")
+):
+    """
+    Push autoplay frames over Server-Sent Events.
+
+    Each `frame` event carries `month`, `hour`, `metric`, `day_type`, the
+    `/api/heatmap` body as `heatmap` and the `/api/demographics` body as
+    `demographics`. Frames are paced on the server at `interval_ms`; an `end`
+    event is sent when `loop` is false and the day has been played once.
+    """
+    try:
+        # Validate inputs against live data
+        validate_period_params(cache, month, start_hour, metric, day_type)
+
+        return StreamingResponse(
+            playback_events(request, cache, month, metric, day_type, start_hour,
+                            interval_ms / 1000, loop),
+            media_type=EVENT_STREAM_MEDIA_TYPE,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -0,0 +1,165 @@
+"""
+Tile API Routes
+XYZ map tiles for tiled map layers: heatmap points and server-rendered
+heatmap PNGs.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
+from typing import Optional
+
+from ...services.data_loader import DataCache
+from ...utils.config import RASTER_CONFIG
+from ...services.raster import PNG_MEDIA_TYPE
+from ...services.serialization import HEATMAP_BINARY_MEDIA_TYPE
+from ...services.tiles import validate_tile
+from ..dependencies import require_cache, parse_resolution, validate_period_params, wants_binary
+from ..http_cache import cache_headers, is_not_modified, make_etag, not_modified_response
+from ..query_pool import run_query
+from ..models.response import HeatmapResponse
+
+router = APIRouter()
+
+# Largest radius / blur accepted for raster tiles (pixels); bounds render cost
+MAX_RASTER_KERNEL = 100
+
+
+def validate_tile_params(z: int, x: int, y: int):
+    """
+    Validate tile coordinates.
+
+    Raises:
+        HTTPException: 400 if the tile does not exist
+    """
+    try:
+        validate_tile(z, x, y)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Declared before /tiles/{z}/{x}/{y}, which would otherwise match "{y}.png"
+@router.get(
+    "/tiles/{z}/{x}/{y}.png",
+    response_class=Response,
+    responses={200: {"content": {PNG_MEDIA_TYPE: {}}}}
+)
+async def get_heatmap_raster_tile(
+    request: Request,
+    cache: DataCache = Depends(require_cache),
+    z: int = Path(..., description="Tile zoom"),
+    x: int = Path(..., description="Tile column"),
+    y: int = Path(..., description="Tile row (XYZ scheme, 0 at the north edge)"),
+    month: Optional[int] = Query(202412, description="Month identifier in YYYYMM format"),
+    hour: Optional[int] = Query(0, description="Hour of day (0-23)", ge=0, le=23),
+    metric: Optional[str] = Query("avg_total_users", description="User duration metric to visualize"),
+    day_type: Optional[str] = Query("平日", description="Day type (平日 or 假日)"),
+    resolution: Optional[int] = Query(None, description="Grid cell size in meters (default: picked from z)"),
+    radius: Optional[int] = Query(
+        RASTER_CONFIG['radius'], description="Point radius in pixels", ge=1, le=MAX_RASTER_KERNEL
+    ),
+    blur: Optional[int] = Query(
+        RASTER_CONFIG['blur'], description="Blur size in pixels", ge=0, le=MAX_RASTER_KERNEL
+    )
+):
+    """
+    Get a server-rendered heatmap PNG of one Web Mercator (XYZ) map tile.
+
+    Renders the map's heatmap layer (same gradient, radius and blur) on the
+    server, for clients too slow to draw it themselves; use it as the URL
+    of an XYZ tile layer. Weights are normalized to the period's range, and
+    points outside the tile blur into it, so tiles join without seams.
+
+    - **z**, **x**, **y**: Tile coordinates
+    - **resolution**: Cell size in meters; defaults to the pyramid level
+      picked for zoom `z` (returned in the `X-Heatmap-Resolution` header)
+    - **radius**, **blur**: Heatmap point radius and blur in pixels
+
+    Tiles are rendered once and cached in memory and on disk.
+    """
+    try:
+        validate_tile_params(z, x, y)
+        validate_period_params(cache, month, hour, metric, day_type)
+        resolution = parse_resolution(cache, resolution, None if resolution is not None else z)
+
+        etag = make_etag(cache.version, "raster", z, x, y, month, hour, metric, day_type, resolution, radius, blur)
+        headers = {"X-Heatmap-Resolution": str(resolution)}
+        if is_not_modified(request, etag):
+            return not_modified_response(etag, headers)
+
+        png = await run_query(
+            etag, cache.get_raster_tile, z, x, y, month, hour, metric, day_type, radius, blur, resolution
+        )
+        return Response(
+            content=png,
+            media_type=PNG_MEDIA_TYPE,
+            headers={**cache_headers(etag), **headers}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Catch-all for unexpected errors
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get(
+    "/tiles/{z}/{x}/{y}",
+    response_model=HeatmapResponse,
+    responses={200: {"content": {HEATMAP_BINARY_MEDIA_TYPE: {}}}}
+)
+async def get_heatmap_tile(
+    request: Request,
+    cache: DataCache = Depends(require_cache),
+    z: int = Path(..., description="Tile zoom"),
+    x: int = Path(..., description="Tile column"),
+    y: int = Path(..., description="Tile row (XYZ scheme, 0 at the north edge)"),
+    month: Optional[int] = Query(202412, description="Month identifier in YYYYMM format"),
+    hour: Optional[int] = Query(0, description="Hour of day (0-23)", ge=0, le=23),
+    metric: Optional[str] = Query("avg_total_users", description="User duration metric to visualize"),
+    day_type: Optional[str] = Query("平日", description="Day type (平日 or 假日)"),
+    resolution: Optional[int] = Query(None, description="Grid cell size in meters (default: picked from z)")
+):
+    """
+    Get the heatmap points of one Web Mercator (XYZ) map tile.
+
+    Returns the /api/heatmap body restricted to the cells whose centers lie
+    in the tile, plus `tile: [z, x, y]`. `min_weight` / `max_weight` hold the
+    weight range of the whole period, so tiles can be normalized alike.
+    Points on a tile edge belong to exactly one tile.
+
+    - **z**, **x**, **y**: Tile coordinates
+    - **resolution**: Cell size in meters; defaults to the pyramid level
+      picked for zoom `z` (returned in the `X-Heatmap-Resolution` header)
+
+    Send `Accept: application/vnd.heatmap+octet-stream` to receive the compact
+    binary encoding instead of JSON. Tiles are cached server side and carry
+    an ETag.
+    """
+    try:
+        validate_tile_params(z, x, y)
+        validate_period_params(cache, month, hour, metric, day_type)
+        resolution = parse_resolution(cache, resolution, None if resolution is not None else z)
+
+        if wants_binary(request):
+            fmt, media_type = "binary", HEATMAP_BINARY_MEDIA_TYPE
+        else:
+            fmt, media_type = "json", "application/json"
+
+        etag = make_etag(cache.version, "tile", z, x, y, month, hour, metric, day_type, fmt, resolution)
+        headers = {"Vary": "Accept", "X-Heatmap-Resolution": str(resolution)}
+        if is_not_modified(request, etag):
+            return not_modified_response(etag, headers)
+
+        payload = await run_query(
+            etag, cache.get_tile_payload, z, x, y, month, hour, metric, day_type, fmt, resolution
+        )
+        return Response(
+            content=payload,
+            media_type=media_type,
+            headers={**cache_headers(etag), **headers}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Catch-all for unexpected errors
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
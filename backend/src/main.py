@@ -3,16 +3,26 @@ FastAPI Application Entry Point
 Main application with CORS middleware and route registration.
 """
 
+import time
+
+# Measured before the heavy imports below (FastAPI, pandas, NumPy)
+_IMPORT_START = time.perf_counter()
+
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pathlib import Path
 
-from .utils.config import API_CONFIG, CORS_CONFIG, get_data_path
-from .services.data_loader import initialize_cache
-from .api.routes import data, demographics
+from .utils.config import (
+    API_CONFIG, CORS_CONFIG, LOADING_CONFIG, RELOAD_CONFIG, get_data_path, get_snapshot_dir
+)
+from .services.data_loader import get_load_status, initialize_cache, prepare_snapshots, start_background_load
+from .services.data_watcher import DataFileWatcher
+from .services.partitions import manifest_path
+from .api.query_pool import shutdown_executor
+from .api.routes import admin, data, demographics, playback, tiles
 
 # Configure logging
 logging.basicConfig(
@@ -37,22 +47,55 @@ app.add_middleware(
     allow_credentials=CORS_CONFIG['allow_credentials'],
     allow_methods=CORS_CONFIG['allow_methods'],
     allow_headers=CORS_CONFIG['allow_headers'],
+    expose_headers=CORS_CONFIG['expose_headers'],
 )
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize data cache on application startup."""
+    """
+    Initialize data cache on application startup.
+
+    By default the data loads in a background thread so the server accepts
+    connections immediately; /ready reports progress and data routes return
+    503 until loading finishes.
+    """
     try:
+        started = time.perf_counter()
         data_path = get_data_path()
         logger.info(f"Initializing data cache from {data_path}")
-        initialize_cache(str(data_path))
-        logger.info("Application startup complete")
+        if LOADING_CONFIG['background']:
+            start_background_load(str(data_path), get_snapshot_dir())
+            logger.info(
+                f"Application startup complete: imports {started - _IMPORT_START:.2f}s, "
+                f"data cache loading in background"
+            )
+        else:
+            initialize_cache(str(data_path), get_snapshot_dir())
+            logger.info(
+                f"Application startup complete: imports {started - _IMPORT_START:.2f}s, "
+                f"data cache {time.perf_counter() - started:.2f}s"
+            )
+
+        if RELOAD_CONFIG['watch']:
+            # Partitioned datasets change through their manifest
+            watch_path = manifest_path(data_path) if data_path.is_dir() else data_path
+            app.state.data_watcher = DataFileWatcher(str(watch_path), RELOAD_CONFIG['watch_interval'])
+            app.state.data_watcher.start()
     except Exception as e:
         logger.error(f"Startup failed: {e}")
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the data file watcher and the query pool."""
+    watcher = getattr(app.state, "data_watcher", None)
+    if watcher is not None:
+        watcher.stop()
+    shutdown_executor()
+
+
 @app.get("/health")
 async def health_check():
     """
@@ -68,9 +111,31 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint.
+
+    Returns 200 once the data cache is loaded, otherwise 503 with a
+    Retry-After header. The body reports the load status, the phase
+    currently running and the timings of completed phases.
+    """
+    status = get_load_status()
+    if status['status'] == 'ready':
+        return status
+    return JSONResponse(
+        status,
+        status_code=503,
+        headers={"Retry-After": str(LOADING_CONFIG['retry_after'])}
+    )
+
+
 # Register API routes
 app.include_router(data.router, prefix="/api", tags=["data"])
 app.include_router(demographics.router, prefix="/api", tags=["demographics"])
+app.include_router(playback.router, prefix="/api", tags=["playback"])
+app.include_router(tiles.router, prefix="/api", tags=["tiles"])
+app.include_router(admin.router, prefix="/api", tags=["admin"])
 
 
 # Serve frontend static files
@@ -124,6 +189,33 @@ def find_available_port(start_port=8000, end_port=8010):
     return None
 
 
+def get_worker_count():
+    """
+    Get the number of uvicorn worker processes to start (API_WORKERS).
+
+    With several workers the dataset snapshot is prepared once, here in the
+    parent process, before the workers start. Each worker then memory-maps
+    the same snapshot files read-only, so one copy of the data is shared
+    between workers instead of each loading its own.
+
+    Returns:
+        Number of workers (1 when auto-reload is enabled)
+    """
+    workers = API_CONFIG['workers']
+    if workers <= 1 or API_CONFIG['reload']:
+        return 1
+
+    snapshot_dir = get_snapshot_dir()
+    if snapshot_dir is None:
+        logger.warning("Snapshots are disabled: every worker will load its own copy of the data")
+        return workers
+
+    started = time.perf_counter()
+    prepare_snapshots(str(get_data_path()), snapshot_dir)
+    logger.info(f"Prepared shared snapshot for {workers} workers in {time.perf_counter() - started:.2f}s")
+    return workers
+
+
 def open_browser(url, delay=2.0):
     """
     Open browser after a delay to ensure server is ready.
@@ -184,5 +276,6 @@ if __name__ == "__main__":
             host=host,
             port=port,
             reload=API_CONFIG['reload'],
+            workers=get_worker_count(),
             log_level=API_CONFIG['log_level']
         )
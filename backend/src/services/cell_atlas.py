@@ -0,0 +1,165 @@
+"""
+Cell Atlas Service
+Deduplicated per-cell geometry shared by every time period.
+
+The same (gx, gy) grid cell repeats across every month, hour and day type,
+so coordinates are converted once per unique cell into an atlas indexed by
+an integer cell id. Row data references cells by id and gathers lat/lng
+from the atlas, which keeps conversion work and coordinate storage
+proportional to the number of cells instead of the number of rows.
+
+Cells are ordered by Morton (Z-order) key, so cell ids double as a spatial
+index: cells in a grid box occupy a few contiguous id ranges (see spatial.py).
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .coordinate_converter import batch_gxgy_to_latlon
+from .spatial import GridBox, cells_in_box, morton_keys
+
+# Atlas field names, in the order they are persisted and gathered
+ATLAS_FIELDS = ['gx', 'gy', 'lat', 'lng']
+
+
+def pack_cells(gx: np.ndarray, gy: np.ndarray) -> np.ndarray:
+    """Pack grid coordinates into unique int64 cell keys (for set operations)."""
+    return (np.asarray(gx, dtype=np.int64) << 16) | np.asarray(gy, dtype=np.int64)
+
+
+class CellAtlas:
+    """
+    Unique grid cells sorted by Morton key, with WGS84 centers.
+
+    Cell ids are positions in the atlas arrays.
+    """
+
+    def __init__(self, gx: np.ndarray, gy: np.ndarray, lat: np.ndarray, lng: np.ndarray):
+        """
+        Args:
+            gx: Grid X coordinate of each cell, sorted by Morton key
+            gy: Grid Y coordinate of each cell
+            lat: WGS84 latitude of each cell center
+            lng: WGS84 longitude of each cell center
+        """
+        self.gx = gx
+        self.gy = gy
+        self.lat = lat
+        self.lng = lng
+        self._keys = morton_keys(gx, gy)
+
+    @classmethod
+    def from_grid(
+        cls,
+        gx: np.ndarray,
+        gy: np.ndarray,
+        known: Optional["CellAtlas"] = None
+    ) -> Tuple["CellAtlas", np.ndarray]:
+        """
+        Build an atlas from per-row grid coordinates.
+
+        Coordinates are converted once per unique cell, and not at all for
+        cells already present in the known atlas.
+
+        Args:
+            gx: Grid X coordinate of every row
+            gy: Grid Y coordinate of every row
+            known: Atlas to take already converted cells from
+
+        Returns:
+            Tuple of (atlas, int32 cell id of every row)
+        """
+        keys, first, cell_ids = np.unique(morton_keys(gx, gy), return_index=True, return_inverse=True)
+        cell_gx = np.asarray(gx)[first].astype(np.int16)
+        cell_gy = np.asarray(gy)[first].astype(np.int16)
+
+        lat = np.empty(len(keys), dtype=np.float64)
+        lng = np.empty(len(keys), dtype=np.float64)
+        todo = np.ones(len(keys), dtype=bool)
+        if known is not None and len(known):
+            pos = np.minimum(np.searchsorted(known._keys, keys), len(known) - 1)
+            hit = known._keys[pos] == keys
+            lat[hit] = known.lat[pos[hit]]
+            lng[hit] = known.lng[pos[hit]]
+            todo = ~hit
+
+        if todo.any():
+            lat[todo], lng[todo] = batch_gxgy_to_latlon(cell_gx[todo], cell_gy[todo])
+
+        atlas = cls(cell_gx, cell_gy, lat, lng)
+        return atlas, cell_ids.astype(np.int32).reshape(-1)
+
+    @classmethod
+    def empty(cls) -> "CellAtlas":
+        """Create an atlas without cells."""
+        return cls(
+            np.empty(0, dtype=np.int16), np.empty(0, dtype=np.int16),
+            np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+        )
+
+    def extend(self, gx: np.ndarray, gy: np.ndarray) -> "CellAtlas":
+        """
+        Get an atlas that also holds the given cells.
+
+        Only cells not already in this atlas are converted.
+
+        Returns:
+            New atlas (cell ids of existing cells may shift, since cells stay
+            sorted by Morton key)
+        """
+        atlas, _ = CellAtlas.from_grid(
+            np.concatenate([self.gx, np.asarray(gx, dtype=np.int16)]),
+            np.concatenate([self.gy, np.asarray(gy, dtype=np.int16)]),
+            known=self
+        )
+        return atlas
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "CellAtlas":
+        """
+        Restore an atlas from the arrays returned by to_arrays().
+
+        Arrays stored in another cell order are re-sorted by Morton key.
+        """
+        atlas = cls(*(arrays[name] for name in ATLAS_FIELDS))
+        if len(atlas) > 1 and not (np.diff(atlas._keys) > 0).all():
+            order = np.argsort(atlas._keys, kind='stable')
+            atlas = cls(*(np.asarray(arrays[name])[order] for name in ATLAS_FIELDS))
+        return atlas
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Get the atlas arrays by field name (for persistence)."""
+        return {name: getattr(self, name) for name in ATLAS_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.gx)
+
+    def cell_index(self, gx: int, gy: int) -> Optional[int]:
+        """Get the id of a grid cell, or None if it is not in the atlas."""
+        key = int(morton_keys(gx, gy))
+        i = int(np.searchsorted(self._keys, key))
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return None
+
+    def cells_in_box(self, box: GridBox) -> np.ndarray:
+        """
+        Get the ids of the cells inside a grid box.
+
+        Args:
+            box: Inclusive (gx_min, gy_min, gx_max, gy_max)
+
+        Returns:
+            Sorted int64 cell ids
+        """
+        return cells_in_box(self._keys, self.gx, self.gy, box)
+
+    def gather(self, cell_ids: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Gather per-cell geometry for a sequence of cell ids.
+
+        Returns:
+            Dictionary of arrays with keys: gx, gy, lat, lng
+        """
+        return {name: getattr(self, name)[cell_ids] for name in ATLAS_FIELDS}
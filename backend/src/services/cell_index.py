@@ -0,0 +1,193 @@
+"""
+Cell Index Service
+Cell-major (CSR) index of the period-sorted rows.
+
+Rows are sorted by period, so the rows of one cell are spread over every
+period slice. The index lists row ids grouped by cell id (in period order
+within a cell) plus one offset per cell, so every row of a cell is one
+contiguous slice: a per-cell time profile is a single gather instead of a
+search in each of the period slices.
+
+CellProfileIndex persists the same runs for one partition together with
+their period and metric values, so a partitioned dataset can answer cell
+profiles of months that are not loaded.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .snapshot import load_snapshot, save_snapshot
+
+
+class CellIndex:
+    """
+    Row ids grouped by cell (compressed sparse rows).
+
+    The rows of cell c are rows[offsets[c]:offsets[c + 1]].
+    """
+
+    def __init__(self, rows: np.ndarray, offsets: np.ndarray):
+        """
+        Args:
+            rows: Row ids sorted by cell id, then by row (period) order
+            offsets: [cells + 1] start of each cell's run in rows
+        """
+        self.rows = rows
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, cell_column: np.ndarray, n_cells: int) -> "CellIndex":
+        """
+        Build the index of a row cell id column.
+
+        Args:
+            cell_column: Cell id of every row
+            n_cells: Number of cells in the atlas
+
+        Returns:
+            Index over every cell (cells without rows get empty runs)
+        """
+        dtype = np.int32 if len(cell_column) < np.iinfo(np.int32).max else np.int64
+        rows = np.argsort(cell_column, kind='stable').astype(dtype)
+        offsets = np.zeros(n_cells + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell_column, minlength=n_cells), out=offsets[1:])
+        return cls(rows, offsets)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "CellIndex":
+        """Restore an index from the arrays returned by to_arrays()."""
+        return cls(arrays['rows'], arrays['offsets'])
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Get the index arrays by name (for persistence)."""
+        return {'rows': self.rows, 'offsets': self.offsets}
+
+    def rows_of(self, cell: int) -> np.ndarray:
+        """Get the row ids of one cell, in period order (view)."""
+        return self.rows[self.offsets[cell]:self.offsets[cell + 1]]
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.offsets.nbytes
+
+
+class CellProfileIndex:
+    """
+    Every period and metric value of each cell of one partition, stored
+    cell-major (the rows of a CellIndex gathered into contiguous runs).
+
+    Only cells with rows are kept, sorted by key, so a lookup is one binary
+    search plus one slice; loaded indexes are memory-mapped and a lookup
+    reads a few pages instead of the partition.
+    """
+
+    def __init__(
+        self,
+        keys: np.ndarray,
+        offsets: np.ndarray,
+        day_type: np.ndarray,
+        hour: np.ndarray,
+        values: np.ndarray,
+        day_types: List[str],
+        metrics: List[str]
+    ):
+        """
+        Args:
+            keys: Sorted key of each cell with rows
+            offsets: [cells + 1] start of each cell's run
+            day_type: Day type code (into day_types) of each run row
+            hour: Hour of each run row
+            values: [rows, metrics] metric values of each run row
+            day_types: Day type of each code
+            metrics: Metric of each values column
+        """
+        self.keys = keys
+        self.offsets = offsets
+        self.day_type = day_type
+        self.hour = hour
+        self.values = values
+        self.day_types = day_types
+        self.metrics = metrics
+
+    @classmethod
+    def build(
+        cls,
+        index: CellIndex,
+        cell_keys: np.ndarray,
+        day_type: np.ndarray,
+        hour: np.ndarray,
+        values: np.ndarray,
+        day_types: List[str],
+        metrics: List[str]
+    ) -> "CellProfileIndex":
+        """
+        Gather the rows of a partition into cell-major runs.
+
+        Args:
+            index: Cell-major row index of the partition
+            cell_keys: Sorted key of every cell id of the index
+            day_type: Day type code of every row
+            hour: Hour of every row
+            values: [rows, metrics] metric values of every row
+            day_types: Day type of each code
+            metrics: Metric of each values column
+        """
+        counts = np.diff(index.offsets)
+        present = counts > 0
+        offsets = np.zeros(int(present.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[present], out=offsets[1:])
+        rows = index.rows
+        return cls(
+            np.asarray(cell_keys)[present], offsets, day_type[rows], hour[rows], values[rows],
+            list(day_types), list(metrics)
+        )
+
+    def save(self, path: Path, source: str):
+        """
+        Write the index as a snapshot directory.
+
+        Args:
+            path: Index directory
+            source: Fingerprint of the partition the index was built from
+        """
+        arrays = {
+            'keys': self.keys, 'offsets': self.offsets, 'day_type': self.day_type,
+            'hour': self.hour, 'values': self.values,
+        }
+        save_snapshot(path, arrays, {'day_types': self.day_types, 'metrics': self.metrics}, source)
+
+    @classmethod
+    def load(cls, path: Path, source: str) -> Optional["CellProfileIndex"]:
+        """
+        Open a saved index (memory-mapped).
+
+        Returns:
+            The index, or None if it is missing, stale or unreadable
+        """
+        snapshot = load_snapshot(path, source)
+        if snapshot is None:
+            return None
+        arrays, metadata = snapshot
+        try:
+            return cls(
+                arrays['keys'], arrays['offsets'], arrays['day_type'], arrays['hour'], arrays['values'],
+                metadata['day_types'], metadata['metrics']
+            )
+        except KeyError:
+            return None
+
+    def profile(self, key: int) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Get the run of one cell.
+
+        Returns:
+            Tuple of (day type codes, hours, [rows, metrics] values), or None
+            if the cell has no rows
+        """
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.day_type[start:end], self.hour[start:end], self.values[start:end]
@@ -3,15 +3,26 @@ Coordinate Conversion Service
 Converts between Taiwan TWD97 TM2 grid coordinates (gx, gy) and WGS84 latitude/longitude.
 
 Based on the inverse transformation formulas from data/gxgy_transfer.ipynb.
-Uses Numba JIT compilation for performance (~260,000 conversions/second).
+The footpoint latitude is solved in closed form by inverting the meridian arc
+series, so batches run as plain vectorized NumPy or, for very large batches,
+as a compiled parallel Numba kernel. Numba is imported lazily so that
+ordinary startups (and packaged builds) never pay for its import or for JIT
+compilation. The original bisection algorithm is kept as the reference
+implementation. The forward direction (lat/lng to grid cell) is used to turn
+map viewports into grid boxes.
 """
 
+import logging
 import math
+import os
 from functools import lru_cache
-from typing import Tuple
-from numba import jit
+from typing import Callable, Optional, Tuple
 import numpy as np
 
+from ..utils.config import COORDINATE_CONFIG, get_numba_cache_dir
+
+logger = logging.getLogger(__name__)
+
 
 # TWD97 TM2 Parameters
 A = 6378137  # WGS84 ellipsoid semi-major axis (meters)
@@ -30,13 +41,32 @@ GRID_SW_LAT_OFFSET = -32871.4054  # Used with gy to calculate TM2 X coordinate
 GRID_SW_LNG_OFFSET = 2422126.0017  # Used with gx to calculate TM2 Y coordinate
 GRID_CELL_SIZE = 50  # Grid cell size (meters)
 
+# Meridian arc series coefficient and the footpoint latitude series that inverts it
+E4 = E2 * E2
+E6 = E4 * E2
+M0 = 1 - E2 / 4 - 3 * E4 / 64 - 5 * E6 / 256
+E1 = (1 - math.sqrt(1 - E2)) / (1 + math.sqrt(1 - E2))
+FP2 = 3 * E1 / 2 - 27 * E1 ** 3 / 32
+FP4 = 21 * E1 ** 2 / 16 - 55 * E1 ** 4 / 32
+FP6 = 151 * E1 ** 3 / 96
+FP8 = 1097 * E1 ** 4 / 512
+
+# Meridian arc series coefficients (forward projection)
+M2 = 3 * E2 / 8 + 3 * E4 / 32 + 45 * E6 / 1024
+M4 = 15 * E4 / 256 + 45 * E6 / 1024
+M6 = 35 * E6 / 3072
+EP2 = E2 / (1 - E2)  # Second eccentricity squared
+
+# Batch engines for batch_gxgy_to_latlon
+ENGINES = ("auto", "numba", "numpy")
 
-@jit(nopython=True)
-def _tm2_to_latlon_jit(x: float, y: float) -> Tuple[float, float]:
+
+def _tm2_to_latlon_reference(x: float, y: float) -> Tuple[float, float]:
     """
-    Convert TM2 coordinates to lat/lon using Numba JIT compilation.
+    Convert TM2 coordinates to lat/lon (reference implementation).
 
-    Uses iterative binary search to find footpoint latitude.
+    Uses iterative binary search to find the footpoint latitude, exactly as
+    the original notebook; kept to validate the closed-form _tm2_to_latlon.
     Converges when |Z - yb| < 0.001 meters (typically ~20 iterations).
 
     Args:
@@ -107,6 +137,141 @@ def _tm2_to_latlon_jit(x: float, y: float) -> Tuple[float, float]:
     return (lat, lng)
 
 
+def _tm2_to_latlon(x, y):
+    """
+    Convert TM2 coordinates to lat/lon with a closed-form footpoint latitude.
+
+    The footpoint latitude comes from the series inversion of the meridian
+    arc (no iteration); the remaining terms are identical to
+    _tm2_to_latlon_reference. Written with NumPy ufuncs only, so the same code
+    runs vectorized on arrays and, compiled by Numba, on scalars.
+
+    Args:
+        x: TM2 X coordinate(s) (meters, easting)
+        y: TM2 Y coordinate(s) (meters, northing)
+
+    Returns:
+        Tuple of (latitude, longitude) in decimal degrees
+    """
+    xb = (x - FALSE_EASTING) / K
+    yb = y / K
+
+    # Footpoint latitude (rectifying latitude series)
+    mu = yb / (A * M0)
+    slat = (mu + FP2 * np.sin(2 * mu) + FP4 * np.sin(4 * mu)
+            + FP6 * np.sin(6 * mu) + FP8 * np.sin(8 * mu))
+
+    lS = np.sin(slat)
+    lT = np.tan(slat)
+    lSec = 1 / np.cos(slat)
+
+    w = 1 - E2 * lS * lS
+    R = A * (1 - E2) / (w * np.sqrt(w))
+    N = A / np.sqrt(w)
+
+    xb2 = xb * xb
+    lT2 = lT * lT
+    lat = slat - (xb2 * lT) / (2 * R * N) + \
+        xb2 * xb2 / (24 * R * N * N * N) * (5 + 3 * lT2) * lT
+
+    lng = xb * lSec / N - \
+        xb2 * xb / (6 * N * N * N) * lSec * (N / R + 2 * lT2) + \
+        xb2 * xb2 * xb / (120 * N ** 5) * lSec * (5 + 28 * lT2 + 24 * lT2 * lT2)
+
+    return lat * (180 / math.pi), lng * (180 / math.pi) + CLNG
+
+
+@lru_cache(maxsize=1)
+def _numba_kernel() -> Optional[Callable]:
+    """
+    Import the compiled parallel kernel on first use.
+
+    Returns:
+        The kernel, or None if numba is not available
+    """
+    cache_dir = get_numba_cache_dir()
+    if cache_dir is not None:
+        # Must be set before numba is imported
+        os.environ.setdefault('NUMBA_CACHE_DIR', str(cache_dir))
+    try:
+        from .tm2_kernels import tm2_to_latlon_parallel
+    except ImportError:
+        logger.warning("numba is not available, using the NumPy coordinate engine")
+        return None
+    return tm2_to_latlon_parallel
+
+
+def _select_engine(engine: str, n: int) -> str:
+    """Resolve the 'auto' engine for a batch of n cells."""
+    if engine == "auto":
+        engine = COORDINATE_CONFIG['engine']
+    if engine == "auto":
+        engine = "numba" if n >= COORDINATE_CONFIG['numba_min_batch'] else "numpy"
+    if engine == "numba" and _numba_kernel() is None:
+        engine = "numpy"
+    return engine
+
+
+def _grid_to_tm2(gx, gy):
+    """Get TM2 coordinates of grid cell centers."""
+    # Following original notebook: gx → TM2 Y (lng direction), gy → TM2 X (lat direction)
+    tm2_x = GRID_SW_LAT_OFFSET + (np.asarray(gy, dtype=np.float64) + 0.5) * GRID_CELL_SIZE
+    tm2_y = GRID_SW_LNG_OFFSET + (np.asarray(gx, dtype=np.float64) + 0.5) * GRID_CELL_SIZE
+    return tm2_x, tm2_y
+
+
+def _latlon_to_tm2(lat, lng):
+    """
+    Convert lat/lon to TM2 coordinates (Transverse Mercator forward series).
+
+    Args:
+        lat: Latitude(s) in decimal degrees
+        lng: Longitude(s) in decimal degrees
+
+    Returns:
+        Tuple of (TM2 X easting, TM2 Y northing) in meters
+    """
+    phi = np.radians(lat)
+    sin_phi = np.sin(phi)
+    cos_phi = np.cos(phi)
+    N = A / np.sqrt(1 - E2 * sin_phi * sin_phi)
+    T = np.tan(phi) ** 2
+    C = EP2 * cos_phi * cos_phi
+    a = cos_phi * np.radians(np.asarray(lng, dtype=np.float64) - CLNG)
+    M = A * (M0 * phi - M2 * np.sin(2 * phi) + M4 * np.sin(4 * phi) - M6 * np.sin(6 * phi))
+
+    a2 = a * a
+    x = FALSE_EASTING + K * N * (
+        a + (1 - T + C) * a2 * a / 6
+        + (5 - 18 * T + T * T + 72 * C - 58 * EP2) * a2 * a2 * a / 120
+    )
+    y = K * (M + N * np.tan(phi) * (
+        a2 / 2 + (5 - T + 9 * C + 4 * C * C) * a2 * a2 / 24
+        + (61 - 58 * T + T * T + 600 * C - 330 * EP2) * a2 * a2 * a2 / 720
+    ))
+    return x, y
+
+
+def latlon_to_gxgy(lat, lng) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the grid cells containing WGS84 points.
+
+    Inverse of batch_gxgy_to_latlon: the center of cell (gx, gy) maps back
+    to (gx, gy).
+
+    Args:
+        lat: Latitude(s) in decimal degrees
+        lng: Longitude(s) in decimal degrees
+
+    Returns:
+        Tuple of (gx, gy) int64 arrays
+    """
+    tm2_x, tm2_y = _latlon_to_tm2(lat, lng)
+    gx = np.floor((tm2_y - GRID_SW_LNG_OFFSET) / GRID_CELL_SIZE).astype(np.int64)
+    gy = np.floor((tm2_x - GRID_SW_LAT_OFFSET) / GRID_CELL_SIZE).astype(np.int64)
+    return gx, gy
+
+
 @lru_cache(maxsize=10000)
 def gxgy_to_latlon(gx: int, gy: int) -> Tuple[float, float]:
     """
@@ -127,39 +292,45 @@ def gxgy_to_latlon(gx: int, gy: int) -> Tuple[float, float]:
         >>> print(f"Lat: {lat:.6f}, Lon: {lon:.6f}")
         Lat: 25.068552, Lon: 121.591302
     """
-    # Calculate TM2 coordinates for grid center
-    # Following original notebook: gx → TM2 Y (lng direction), gy → TM2 X (lat direction)
-    tm2_x = GRID_SW_LAT_OFFSET + (gy + 0.5) * GRID_CELL_SIZE
-    tm2_y = GRID_SW_LNG_OFFSET + (gx + 0.5) * GRID_CELL_SIZE
-
-    return _tm2_to_latlon_jit(tm2_x, tm2_y)
+    tm2_x, tm2_y = _grid_to_tm2(gx, gy)
+    lat, lng = _tm2_to_latlon(tm2_x, tm2_y)
+    return (float(lat), float(lng))
 
 
-def batch_gxgy_to_latlon(gx_array: np.ndarray, gy_array: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+def batch_gxgy_to_latlon(
+    gx_array: np.ndarray,
+    gy_array: np.ndarray,
+    engine: str = "auto"
+) -> Tuple[np.ndarray, np.ndarray]:
     """
     Convert batch of grid coordinates to lat/lon.
 
-    Optimized for vectorized operations on large datasets.
+    Runs the closed-form inverse across the whole input at once instead of
+    converting point by point.
 
     Args:
         gx_array: NumPy array of grid X coordinates
         gy_array: NumPy array of grid Y coordinates
+        engine: "numpy" for plain vectorized NumPy, "numba" for the compiled
+            parallel kernel (same formulas), or "auto" to use the configured
+            engine (COORDINATE_CONFIG), picking numba only for large batches
 
     Returns:
-        Tuple of (latitude_array, longitude_array) as NumPy arrays
+        Tuple of (latitude_array, longitude_array) as float64 NumPy arrays
     """
-    # Calculate TM2 coordinates for grid centers
-    # Following original notebook: gx → TM2 Y (lng direction), gy → TM2 X (lat direction)
-    tm2_x_array = GRID_SW_LAT_OFFSET + (gy_array + 0.5) * GRID_CELL_SIZE
-    tm2_y_array = GRID_SW_LNG_OFFSET + (gx_array + 0.5) * GRID_CELL_SIZE
-
-    # Convert using JIT-compiled function
-    results = np.array([
-        _tm2_to_latlon_jit(x, y)
-        for x, y in zip(tm2_x_array, tm2_y_array)
-    ])
-
-    return results[:, 0], results[:, 1]
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}. Available: {ENGINES}")
+
+    tm2_x, tm2_y = _grid_to_tm2(gx_array, gy_array)
+    if _select_engine(engine, tm2_x.size) == "numpy":
+        return _tm2_to_latlon(tm2_x, tm2_y)
+
+    tm2_x = np.ascontiguousarray(tm2_x).reshape(-1)
+    tm2_y = np.ascontiguousarray(tm2_y).reshape(-1)
+    lat = np.empty_like(tm2_x)
+    lng = np.empty_like(tm2_x)
+    _numba_kernel()(tm2_x, tm2_y, lat, lng)
+    return lat, lng
 
 
 # Cache statistics for monitoring
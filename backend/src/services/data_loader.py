@@ -2,7 +2,11 @@
 Data Loader Service
 Loads and caches CSV data with coordinate conversion for the heatmap visualization.
 
-Implements eager coordinate conversion on startup and O(1) lookup via dictionary indexing.
+Converts coordinates once per unique grid cell into a shared cell atlas and
+provides O(1) lookup via a sorted partition index of contiguous offset ranges
+into shared column arrays. Within a period rows are ordered by cell id, which
+follows the atlas Morton order, so viewport (grid box) queries binary-search
+the period instead of scanning it.
 Memory footprint: ~5MB for ~2,881 rows with optimized data types.
 """
 
@@ -11,114 +15,599 @@ import numpy as np
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import logging
-from .coordinate_converter import batch_gxgy_to_latlon
+import threading
+import time
+from ..utils.config import CACHE_CONFIG, PYRAMID_CONFIG, RASTER_CONFIG, STORAGE_CONFIG, get_raster_cache_dir
+from ..utils.lru import LRUCache
+from ..utils.timing import PhaseTimer
+from .coordinate_converter import GRID_CELL_SIZE, clear_cache as clear_coordinate_cache
+from .cell_atlas import ATLAS_FIELDS, CellAtlas
+from .cell_index import CellIndex
+from .dense_store import DenseStore, prefix_range
+from .pyramid import GridLevel
+from .raster import RasterTileCache, kernel_extent, render_tile_png
+from .spatial import GridBox, expand_ranges
+from .tiles import clip_to_tile, tile_bounds, tile_grid_box
+from .serialization import render_heatmap_binary, render_heatmap_json
+from .snapshot import (
+    compute_file_hash, load_snapshot, prune_snapshots, save_snapshot, snapshot_build_lock, snapshot_path_for
+)
 
 logger = logging.getLogger(__name__)
 
+# Heatmap payload renderers by wire format
+PAYLOAD_RENDERERS = {
+    'json': render_heatmap_json,
+    'binary': render_heatmap_binary,
+}
+
+# User duration metric columns
+METRICS = [
+    "avg_total_users",
+    "avg_users_under_10min",
+    "avg_users_10_30min",
+    "avg_users_over_30min"
+]
+
+# Metric options reported by get_metadata()
+METRIC_OPTIONS = [
+    {'key': 'avg_total_users', 'label': '全部停留人數'},
+    {'key': 'avg_users_under_10min', 'label': '停留10分鐘以下'},
+    {'key': 'avg_users_10_30min', 'label': '停留10-30分鐘'},
+    {'key': 'avg_users_over_30min', 'label': '停留30分鐘以上'}
+]
+
+# Demographic columns carried over from the CSV (percentages per location)
+DEMOGRAPHIC_COLUMNS = ['sex_1', 'sex_2'] + [f'age_{i}' for i in range(1, 10)] + ['age_other']
+
+# Columns read from the CSV, with optimized data types (all others are skipped)
+CSV_DTYPES = {
+    'month': 'int32',
+    'gx': 'int16',
+    'gy': 'int16',
+    'hour': 'int8',
+    'day_type': 'category',
+    **{col: 'float32' for col in METRICS + DEMOGRAPHIC_COLUMNS},
+}
+
+# Prefix for snapshot entries holding the period index rather than data columns
+INDEX_PREFIX = 'index__'
+
+# Prefix for snapshot entries holding precomputed aggregates (DataCache attributes)
+DERIVED_PREFIX = 'derived__'
+DERIVED_ARRAYS = [
+    'demographic_sums', 'demographic_totals',
+    'demographic_sums_cumsum', 'demographic_totals_cumsum',
+]
+
+# Prefix for snapshot entries holding the cell atlas
+ATLAS_PREFIX = 'atlas__'
+
+# Prefix for snapshot entries holding the dense cell × time tensor
+DENSE_PREFIX = 'dense__'
+DENSE_ARRAYS = ['values', 'mask', 'hour_cumsum', 'count_cumsum']
+
+# Prefix for snapshot entries holding the cell-major row index
+CELL_INDEX_PREFIX = 'cell_index__'
+
+# Prefix for snapshot entries holding pyramid levels (followed by the cell size)
+LEVEL_PREFIX = 'level'
+
+# Aggregations supported for hour-range / multi-month heatmap queries
+RANGE_AGGREGATIONS = ['sum', 'mean']
+
 
 class DataCache:
     """
     In-memory cache for location data with pre-computed coordinates.
 
-    Loads CSV data once on initialization, converts all gx/gy to lat/lng,
-    and builds lookup dictionaries for O(1) query performance.
+    Loads CSV data once on initialization, converts each unique grid cell to
+    lat/lng once (rows reference cells by id), and sorts all rows by
+    (month, day_type, hour, cell) so every time period is a contiguous offset
+    range into shared column arrays. Lookups are O(1) and return zero-copy
+    views of those arrays; cell geometry is gathered from the atlas.
     """
 
-    def __init__(self, csv_path: str):
+    def __init__(
+        self,
+        csv_path: str,
+        snapshot_dir: Optional[Path] = None,
+        timer: Optional[PhaseTimer] = None,
+        known_cells: Optional[CellAtlas] = None
+    ):
         """
         Initialize the data cache from CSV file.
 
+        If snapshot_dir is given, a binary snapshot keyed by the CSV content
+        hash is loaded instead of parsing the CSV, and (re)generated whenever
+        it is missing or stale.
+
         Args:
             csv_path: Path to data.csv file
+            snapshot_dir: Directory for binary snapshots (None disables them)
+            timer: Phase timer to record load phases in (lets another thread
+                observe loading progress); a new one is created if None
+            known_cells: Atlas of already converted cells (e.g. the atlas of
+                a partitioned dataset); only cells missing from it are converted
 
         Raises:
             FileNotFoundError: If CSV file doesn't exist
             ValueError: If CSV is missing required columns
         """
-        self.df: Optional[pd.DataFrame] = None
-        self.lookup_dict: Dict[Tuple[int, int, str], pd.DataFrame] = {}
+        self.columns: Dict[str, np.ndarray] = {}
+        self.atlas: Optional[CellAtlas] = None
+        self.lookup_dict: Dict[Tuple[int, int, str], Tuple[int, int]] = {}
         self.available_months: List[int] = []
         self.available_hours: List[int] = []
         self.available_day_types: List[str] = []
-        self.metrics: List[str] = [
-            "avg_total_users",
-            "avg_users_under_10min",
-            "avg_users_10_30min",
-            "avg_users_over_30min"
-        ]
+        self.demographic_columns: List[str] = []
+        self.n_rows: int = 0
+        self.unique_locations: int = 0
+        # Dense period axes: [month, day_type, hour] index into the tensors below
+        self.demographic_totals: Optional[np.ndarray] = None  # [..., metric]
+        self.demographic_sums: Optional[np.ndarray] = None  # [..., metric, demographic]
+        # Prefix sums of the above along the hour axis (hours + 1 entries)
+        self.demographic_totals_cumsum: Optional[np.ndarray] = None
+        self.demographic_sums_cumsum: Optional[np.ndarray] = None
+        # Optional dense [cells, months, day_types, hours, metrics] storage
+        self.dense: Optional[DenseStore] = None
+        # Rows grouped by cell for per-cell profiles (only without the dense
+        # tensor, which is cell-major already)
+        self.cell_index: Optional[CellIndex] = None
+        # Coarser grid levels by cell size in meters (see pyramid.py)
+        self.levels: Dict[int, GridLevel] = {}
+        self.source_hash: Optional[str] = None
+        self.version: Optional[str] = None
+        self._payload_cache = LRUCache(CACHE_CONFIG['payload_cache_size'])
+        self._tile_cache = LRUCache(CACHE_CONFIG['tile_cache_size'])
+        # Created on first use, once the dataset version is known
+        self._raster_tiles: Optional[RasterTileCache] = None
+        self._raster_lock = threading.Lock()
+        # Wall-clock time of each load phase (logged at startup)
+        self.load_timings = timer if timer is not None else PhaseTimer()
+        self.metrics: List[str] = list(METRICS)
+        self._known_cells = known_cells
 
-        self._load_data(csv_path)
+        self._load_data(csv_path, snapshot_dir)
 
-    def _load_data(self, csv_path: str):
-        """Load CSV and perform all preprocessing."""
+    def _load_data(self, csv_path: str, snapshot_dir: Optional[Path] = None):
+        """Load data from a valid snapshot, falling back to the CSV."""
         csv_file = Path(csv_path)
         if not csv_file.exists():
             raise FileNotFoundError(f"Data file not found: {csv_path}")
 
+        with self.load_timings.phase('hash'):
+            self.source_hash = compute_file_hash(csv_path)
+        # Dataset version fingerprint (used for HTTP ETags)
+        self.version = self.source_hash[:16]
+
+        if snapshot_dir is None:
+            self._load_csv(csv_path)
+            logger.info(f"Load phases: {self.load_timings.summary()}")
+            return
+
+        snapshot_path = snapshot_path_for(csv_path, snapshot_dir, self.source_hash)
+        if not self._load_snapshot(snapshot_path):
+            # Processes sharing the snapshot directory (e.g. uvicorn workers)
+            # build a missing snapshot once; the others wait and attach to it
+            with snapshot_build_lock(snapshot_path):
+                if not self._load_snapshot(snapshot_path):
+                    self._load_csv(csv_path)
+                    with self.load_timings.phase('snapshot_save'):
+                        saved = self._save_snapshot(snapshot_path)
+                    prune_snapshots(csv_path, snapshot_dir, snapshot_path)
+                    # Serve from the memory-mapped files like every other
+                    # process, so the data pages are shared between them
+                    if not saved or not self._load_snapshot(snapshot_path):
+                        logger.info(f"Load phases: {self.load_timings.summary()}")
+                        return
+
+        logger.info(f"Data cache initialized from snapshot: {len(self.lookup_dict)} time periods")
+        logger.info(f"Load phases: {self.load_timings.summary()}")
+
+    def _load_csv(self, csv_path: str):
+        """Load CSV and perform all preprocessing."""
         logger.info(f"Loading data from {csv_path}...")
 
-        # Load CSV with optimized data types
-        dtype_mapping = {
-            'month': 'int32',
-            'gx': 'int16',
-            'gy': 'int16',
-            'hour': 'int8',
-            'day_type': 'category',
-            'avg_total_users': 'float32',
-            'avg_users_under_10min': 'float32',
-            'avg_users_10_30min': 'float32',
-            'avg_users_over_30min': 'float32',
-            'sex_1': 'float32',
-            'sex_2': 'float32',
-            'age_1': 'float32',
-            'age_2': 'float32',
-            'age_3': 'float32',
-            'age_4': 'float32',
-            'age_5': 'float32',
-            'age_6': 'float32',
-            'age_7': 'float32',
-            'age_8': 'float32',
-            'age_9': 'float32',
-            'age_other': 'float32',
-        }
+        # Load only the used columns (city_* and other extras are skipped),
+        # with optimized data types
+        with self.load_timings.phase('csv_parse'):
+            df = pd.read_csv(csv_path, usecols=lambda col: col in CSV_DTYPES, dtype=CSV_DTYPES)
 
-        self.df = pd.read_csv(csv_path, dtype=dtype_mapping)
-        
         # Validate required columns
         required_cols = ['month', 'gx', 'gy', 'hour', 'day_type'] + self.metrics
-        missing_cols = [col for col in required_cols if col not in self.df.columns]
+        missing_cols = [col for col in required_cols if col not in df.columns]
         if missing_cols:
             raise ValueError(f"CSV missing required columns: {missing_cols}")
 
-        logger.info(f"Loaded {len(self.df)} rows")
+        logger.info(f"Loaded {len(df)} rows")
+
+        # Encode day_type as small integer codes into the sorted category list
+        day_codes, day_types = pd.factorize(df['day_type'], sort=True)
+        self.available_day_types = [str(d) for d in day_types]
+        self.demographic_columns = [col for col in DEMOGRAPHIC_COLUMNS if col in df.columns]
 
-        # Convert coordinates (EAGER)
+        # Convert coordinates once per unique cell (EAGER); rows keep the cell id
         logger.info("Converting gx/gy to lat/lng...")
-        lat_array, lng_array = batch_gxgy_to_latlon(
-            self.df['gx'].values,
-            self.df['gy'].values
-        )
-        self.df['lat'] = lat_array.astype('float64')
-        self.df['lng'] = lng_array.astype('float64')
-        logger.info("Coordinate conversion complete")
+        with self.load_timings.phase('convert'):
+            self.atlas, cell_ids = CellAtlas.from_grid(
+                df['gx'].to_numpy(dtype=np.int16), df['gy'].to_numpy(dtype=np.int16),
+                known=self._known_cells
+            )
+        logger.info(f"Coordinate conversion complete: {len(self.atlas)} unique cells")
 
-        # Build metadata
-        self.available_months = sorted(self.df['month'].unique().tolist())
-        self.available_hours = sorted(self.df['hour'].unique().tolist())
-        self.available_day_types = sorted(self.df['day_type'].unique().tolist())
+        columns = {
+            'month': df['month'].to_numpy(dtype=np.int32),
+            'cell': cell_ids,
+            'hour': df['hour'].to_numpy(dtype=np.int8),
+            'day_type': day_codes.astype(np.int8),
+        }
+        for col in self.metrics + self.demographic_columns:
+            columns[col] = df[col].to_numpy(dtype=np.float32)
+        del df
 
-        # Build lookup dictionary for O(1) filtering
+        # Single sort pass: every (month, day_type, hour) becomes a contiguous
+        # range, with its rows in cell id (spatial) order
         logger.info("Building lookup index...")
-        for month in self.available_months:
-            for hour in self.available_hours:
-                for day_type in self.available_day_types:
-                    mask = (self.df['month'] == month) & (self.df['hour'] == hour) & (self.df['day_type'] == day_type)
-                    filtered_df = self.df[mask]
-                    if not filtered_df.empty:
-                        self.lookup_dict[(month, hour, day_type)] = filtered_df
+        with self.load_timings.phase('index'):
+            order = np.lexsort((columns['cell'], columns['hour'], columns['day_type'], columns['month']))
+            self.columns = {name: array[order] for name, array in columns.items()}
+
+            self.n_rows = len(order)
+            self.available_months = np.unique(self.columns['month']).tolist()
+            self.available_hours = np.unique(self.columns['hour']).tolist()
+            self.unique_locations = len(self.atlas)
+
+            starts, stops = self._period_bounds()
+            self._build_lookup(starts, stops)
+
+        with self.load_timings.phase('demographics'):
+            self._build_demographics(starts)
+            self._build_demographic_prefix_sums()
+        with self.load_timings.phase('dense'):
+            self._build_dense()
+        with self.load_timings.phase('cell_index'):
+            self._build_cell_index()
+        with self.load_timings.phase('pyramid'):
+            self._build_pyramid()
 
         logger.info(f"Data cache initialized: {len(self.lookup_dict)} time periods")
 
+    def _period_bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Find start/stop offsets of each period run in the sorted columns."""
+        month = self.columns['month']
+        hour = self.columns['hour']
+        day_type = self.columns['day_type']
+
+        changed = (np.diff(month) != 0) | (np.diff(hour) != 0) | (np.diff(day_type) != 0)
+        boundaries = np.flatnonzero(changed) + 1
+        starts = np.concatenate([[0], boundaries]) if self.n_rows else np.empty(0, dtype=np.int64)
+        stops = np.concatenate([boundaries, [self.n_rows]]) if self.n_rows else np.empty(0, dtype=np.int64)
+        return starts.astype(np.int64), stops.astype(np.int64)
+
+    def _build_lookup(self, starts: np.ndarray, stops: np.ndarray):
+        """Build the (month, hour, day_type) -> (start, stop) lookup dictionary."""
+        months = self.columns['month'][starts].tolist()
+        hours = self.columns['hour'][starts].tolist()
+        day_codes = self.columns['day_type'][starts].tolist()
+
+        self.lookup_dict = {
+            (month, hour, self.available_day_types[day_code]): (start, stop)
+            for month, hour, day_code, start, stop
+            in zip(months, hours, day_codes, starts.tolist(), stops.tolist())
+        }
+
+    def _period_axes(self, months: np.ndarray, hours: np.ndarray, day_codes: np.ndarray):
+        """Map period values to (month, day_type, hour) indices on the dense period axes."""
+        return (
+            np.searchsorted(self.available_months, months),
+            day_codes.astype(np.intp),
+            np.searchsorted(self.available_hours, hours),
+        )
+
+    def _period_index(self, month: int, hour: int, day_type: str) -> Optional[Tuple[int, int, int]]:
+        """Get the dense (month, day_type, hour) index of a period, or None if unavailable."""
+        try:
+            return (
+                self.available_months.index(month),
+                self.available_day_types.index(day_type),
+                self.available_hours.index(hour),
+            )
+        except ValueError:
+            return None
+
+    def _build_demographics(self, starts: np.ndarray):
+        """
+        Precompute metric-weighted demographic sums for every period and metric.
+
+        Rows are already grouped by period, so a segmented reduction of the
+        weighted (rows x demographics) matrix yields every period's sums at
+        once; this runs once per metric to bound the temporary to the size
+        of the demographic columns.
+        """
+        shape = (len(self.available_months), len(self.available_day_types), len(self.available_hours))
+        n_metrics = len(self.metrics)
+        n_demo = len(self.demographic_columns)
+
+        self.demographic_totals = np.zeros(shape + (n_metrics,), dtype=np.float64)
+        self.demographic_sums = np.zeros(shape + (n_metrics, n_demo), dtype=np.float64)
+        if self.n_rows == 0:
+            return
+
+        weights = np.stack([self.columns[m] for m in self.metrics], axis=1).astype(np.float64)
+        demographics = np.stack(
+            [self.columns[c] for c in self.demographic_columns], axis=1
+        ).astype(np.float64).reshape(self.n_rows, n_demo)
+
+        # [periods, metric] and [periods, metric, demographic]
+        totals = np.add.reduceat(weights, starts, axis=0)
+        sums = np.stack([
+            np.add.reduceat(demographics * weights[:, [m]], starts, axis=0)
+            for m in range(n_metrics)
+        ], axis=1)
+
+        idx = self._period_axes(
+            self.columns['month'][starts], self.columns['hour'][starts], self.columns['day_type'][starts]
+        )
+        self.demographic_totals[idx] = totals
+        self.demographic_sums[idx] = sums
+
+    def _build_demographic_prefix_sums(self):
+        """Build hour-axis prefix sums of the demographics tensors for range queries."""
+        def hour_prefix(tensor: np.ndarray) -> np.ndarray:
+            shape = list(tensor.shape)
+            shape[2] += 1
+            prefix = np.zeros(shape, dtype=np.float64)
+            np.cumsum(tensor, axis=2, out=prefix[:, :, 1:])
+            return prefix
+
+        self.demographic_totals_cumsum = hour_prefix(self.demographic_totals)
+        self.demographic_sums_cumsum = hour_prefix(self.demographic_sums)
+
+    def _period_shape(self) -> Tuple[int, int, int]:
+        """Sizes of the dense (month, day_type, hour) period axes."""
+        return (len(self.available_months), len(self.available_day_types), len(self.available_hours))
+
+    def _dense_enabled(self, n_cells: int) -> bool:
+        """Decide whether to keep the dense tensor for this dataset size."""
+        mode = STORAGE_CONFIG['dense_tensor']
+        if mode == 'off':
+            return False
+        nbytes = DenseStore.estimate_nbytes(n_cells, self._period_shape(), len(self.metrics))
+        if mode == 'auto' and nbytes > STORAGE_CONFIG['dense_max_bytes']:
+            logger.info(f"Skipping dense tensor: {nbytes / 1e6:.0f} MB exceeds the configured budget")
+            return False
+        return True
+
+    def _build_dense(self):
+        """Build the dense cell × time tensor if the storage mode allows it."""
+        if not self._dense_enabled(len(self.atlas)):
+            return
+
+        logger.info("Building dense cell × time tensor...")
+        self.dense = DenseStore.from_columns(
+            self.columns,
+            self.atlas,
+            self._period_axes(self.columns['month'], self.columns['hour'], self.columns['day_type']),
+            self._period_shape(),
+            self.metrics
+        )
+        logger.info(f"Dense tensor built: {self.dense.n_cells} cells, {self.dense.nbytes / 1e6:.1f} MB")
+
+    def _build_cell_index(self):
+        """Build the cell-major row index unless the dense tensor serves cell profiles."""
+        if self.dense is None:
+            self.cell_index = CellIndex.build(self.columns['cell'], len(self.atlas))
+
+    def _build_pyramid(self, stored: Optional[Dict[str, np.ndarray]] = None, stored_sizes: List[int] = ()):
+        """
+        Build the configured pyramid levels.
+
+        Args:
+            stored: Snapshot arrays holding previously built levels
+            stored_sizes: Cell sizes of the levels in stored (restored
+                instead of rebuilt)
+        """
+        period_keys = list(self.lookup_dict)
+        bounds = np.array(list(self.lookup_dict.values()), dtype=np.int64).reshape(-1, 2)
+        column_names = ['cell'] + self.metrics + self.demographic_columns
+
+        self.levels = {}
+        for size in sorted(set(PYRAMID_CONFIG['levels'])):
+            if size in stored_sizes:
+                prefix = f'{LEVEL_PREFIX}{size}__'
+                arrays = {name[len(prefix):]: array for name, array in stored.items() if name.startswith(prefix)}
+                self.levels[size] = GridLevel.from_arrays(size, arrays, column_names, period_keys)
+            else:
+                self.levels[size] = GridLevel.build(
+                    size, self.atlas, self.columns, period_keys, bounds, self.metrics, self.demographic_columns
+                )
+        if self.levels:
+            logger.info(
+                "Grid pyramid: " + ", ".join(f"{size} m: {len(level.atlas)} cells" for size, level in self.levels.items())
+            )
+
+    @property
+    def resolutions(self) -> List[int]:
+        """Available grid cell sizes in meters, finest first."""
+        return [GRID_CELL_SIZE] + sorted(self.levels)
+
+    def grid(self, resolution: Optional[int] = None):
+        """
+        Get the grid serving a resolution: this cache for the base grid, or
+        a pyramid level (both expose atlas, columns and lookup_dict).
+
+        Raises:
+            KeyError: If the resolution is not available
+        """
+        if resolution is None or resolution == GRID_CELL_SIZE:
+            return self
+        return self.levels[resolution]
+
+    def cells_in_box(self, box: GridBox, resolution: Optional[int] = None) -> np.ndarray:
+        """
+        Get the ids of the cells of a grid that touch a box.
+
+        Args:
+            box: Grid box in base grid coordinates
+            resolution: Cell size in meters of the grid (None for the base grid)
+
+        Returns:
+            Sorted cell ids into that grid's atlas
+        """
+        grid = self.grid(resolution)
+        if grid is not self:
+            box = grid.scale_box(box)
+        return grid.atlas.cells_in_box(box)
+
+    def _period_columns(
+        self,
+        month: int,
+        hour: int,
+        day_type: str,
+        names: List[str],
+        box: Optional[GridBox] = None,
+        resolution: Optional[int] = None
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Get zero-copy views of the requested columns for one time period.
+
+        Cell geometry names (gx, gy, lat, lng) are gathered from the atlas
+        through the period's cell ids rather than returned as views.
+
+        Args:
+            box: Grid box (base grid coordinates) to restrict the period to;
+                its cells are looked up by binary search in the period's
+                cell-sorted rows (copies instead of views are returned)
+            resolution: Cell size in meters of the grid to read (None for
+                the base grid)
+
+        Returns:
+            Column name to array mapping, or None if the period is empty
+        """
+        grid = self.grid(resolution)
+        bounds = grid.lookup_dict.get((month, hour, day_type))
+        if bounds is None:
+            return None
+        if box is None:
+            rows = slice(*bounds)
+        else:
+            rows = _period_rows(grid.columns['cell'], *bounds, self.cells_in_box(box, resolution))
+        cell_ids = grid.columns['cell'][rows]
+        return {
+            name: getattr(grid.atlas, name)[cell_ids] if name in ATLAS_FIELDS
+            else grid.columns[name][rows]
+            for name in names
+        }
+
+    def _load_snapshot(self, snapshot_path: Path) -> bool:
+        """
+        Restore the sorted columns and lookup index from a snapshot.
+
+        Returns:
+            True if the snapshot was valid and loaded, False otherwise
+        """
+        with self.load_timings.phase('snapshot_load'):
+            snapshot = load_snapshot(snapshot_path, self.source_hash)
+        if snapshot is None:
+            return False
+
+        columns, metadata = snapshot
+        logger.info(f"Loading data from snapshot {snapshot_path}...")
+
+        self.columns = {name: columns[name] for name in metadata['columns']}
+        self.available_months = metadata['available_months']
+        self.available_hours = metadata['available_hours']
+        self.available_day_types = metadata['available_day_types']
+        self.demographic_columns = metadata['demographic_columns']
+        self.n_rows = metadata['n_rows']
+        self.unique_locations = metadata['unique_locations']
+        self.atlas = CellAtlas.from_arrays(
+            {name: columns[ATLAS_PREFIX + name] for name in ATLAS_FIELDS}
+        )
+
+        with self.load_timings.phase('index'):
+            self._build_lookup(columns[INDEX_PREFIX + 'start'], columns[INDEX_PREFIX + 'stop'])
+        with self.load_timings.phase('demographics'):
+            for name in DERIVED_ARRAYS:
+                setattr(self, name, columns[DERIVED_PREFIX + name])
+
+        with self.load_timings.phase('dense'):
+            if DENSE_PREFIX + 'values' in columns and self._dense_enabled(len(self.atlas)):
+                dense = {name: columns[DENSE_PREFIX + name] for name in DENSE_ARRAYS}
+                self.dense = DenseStore(self.atlas, metrics=self.metrics, **dense)
+            elif DENSE_PREFIX + 'values' not in columns:
+                self._build_dense()
+        with self.load_timings.phase('cell_index'):
+            if self.dense is None and CELL_INDEX_PREFIX + 'rows' in columns:
+                self.cell_index = CellIndex.from_arrays(
+                    {name: columns[CELL_INDEX_PREFIX + name] for name in ('rows', 'offsets')}
+                )
+            else:
+                self._build_cell_index()
+        with self.load_timings.phase('pyramid'):
+            self._build_pyramid(columns, metadata.get('pyramid_levels', []))
+        return True
+
+    def _save_snapshot(self, snapshot_path: Path) -> bool:
+        """
+        Persist the sorted columns and period offsets as a snapshot.
+
+        Returns:
+            True if the snapshot was written
+        """
+        bounds = list(self.lookup_dict.values())
+        columns = dict(self.columns)
+        columns[INDEX_PREFIX + 'start'] = np.array([b[0] for b in bounds], dtype=np.int64)
+        columns[INDEX_PREFIX + 'stop'] = np.array([b[1] for b in bounds], dtype=np.int64)
+        for name, array in self.atlas.to_arrays().items():
+            columns[ATLAS_PREFIX + name] = array
+        for name in DERIVED_ARRAYS:
+            columns[DERIVED_PREFIX + name] = getattr(self, name)
+        if self.dense is not None:
+            for name in DENSE_ARRAYS:
+                columns[DENSE_PREFIX + name] = getattr(self.dense, name)
+        if self.cell_index is not None:
+            for name, array in self.cell_index.to_arrays().items():
+                columns[CELL_INDEX_PREFIX + name] = array
+        for size, level in self.levels.items():
+            for name, array in level.to_arrays(list(self.lookup_dict)).items():
+                columns[f'{LEVEL_PREFIX}{size}__{name}'] = array
+
+        metadata = {
+            'columns': list(self.columns.keys()),
+            'available_months': self.available_months,
+            'available_hours': self.available_hours,
+            'available_day_types': self.available_day_types,
+            'demographic_columns': self.demographic_columns,
+            'n_rows': self.n_rows,
+            'unique_locations': self.unique_locations,
+            'pyramid_levels': sorted(self.levels),
+        }
+
+        try:
+            save_snapshot(snapshot_path, columns, metadata, self.source_hash)
+            logger.info(f"Snapshot written to {snapshot_path}")
+            return True
+        except OSError as e:
+            # A snapshot is only an optimization; never fail startup over it
+            logger.warning(f"Failed to write snapshot to {snapshot_path}: {e}")
+            return False
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns, atlas, aggregates, dense tensor and pyramid."""
+        arrays = list(self.columns.values()) + list(self.atlas.to_arrays().values()) + [
+            self.demographic_totals, self.demographic_sums,
+            self.demographic_totals_cumsum, self.demographic_sums_cumsum,
+        ]
+        total = sum(a.nbytes for a in arrays if a is not None)
+        if self.dense is not None:
+            total += self.dense.nbytes
+        if self.cell_index is not None:
+            total += self.cell_index.nbytes
+        return total + sum(level.nbytes for level in self.levels.values())
+
     def get_heatmap_data(
         self,
         month: int,
@@ -139,22 +628,473 @@ class DataCache:
             List of dictionaries with keys: gx, gy, lat, lng, weight
         """
         # O(1) lookup
-        filtered_df = self.lookup_dict.get((month, hour, day_type))
-        if filtered_df is None or filtered_df.empty:
+        cols = self._period_columns(month, hour, day_type, ['gx', 'gy', 'lat', 'lng', metric])
+        if cols is None:
             return []
 
         # Build response
-        result = []
-        for _, row in filtered_df.iterrows():
-            result.append({
-                'gx': int(row['gx']),
-                'gy': int(row['gy']),
-                'lat': float(row['lat']),
-                'lng': float(row['lng']),
-                'weight': float(row[metric])
-            })
-
-        return result
+        return [
+            {'gx': gx, 'gy': gy, 'lat': lat, 'lng': lng, 'weight': weight}
+            for gx, gy, lat, lng, weight in zip(
+                cols['gx'].tolist(),
+                cols['gy'].tolist(),
+                cols['lat'].tolist(),
+                cols['lng'].tolist(),
+                cols[metric].tolist()
+            )
+        ]
+
+    def get_heatmap_columns(
+        self,
+        month: int,
+        hour: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        box: Optional[GridBox] = None,
+        resolution: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Get heatmap data for a time period as column arrays.
+
+        Args:
+            month: Month identifier (YYYYMM format)
+            hour: Hour of day (0-23)
+            metric: User duration metric column name
+            day_type: Day type ("平日" or "假日")
+            box: Only return cells inside this grid box (None for all)
+            resolution: Cell size in meters (a pyramid level; None for the
+                base grid); gx/gy are coordinates on that level's grid
+
+        Returns:
+            Dictionary of arrays with keys: gx, gy, lat, lng, weight
+            (empty arrays if the period has no data)
+        """
+        cols = self._period_columns(month, hour, day_type, ATLAS_FIELDS + [metric], box, resolution)
+        if cols is None:
+            cols = self.atlas.gather(np.empty(0, dtype=np.int32))
+            cols[metric] = self.columns[metric][:0]
+        cols['weight'] = cols.pop(metric)
+        return cols
+
+    def get_heatmap_payload(
+        self,
+        month: int,
+        hour: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        fmt: str = "json",
+        box: Optional[GridBox] = None,
+        resolution: Optional[int] = None
+    ) -> bytes:
+        """
+        Get the pre-rendered heatmap response body for a time period.
+
+        Payloads are rendered once per (month, hour, day_type, metric, fmt,
+        resolution) and served from the payload cache afterwards. Viewport
+        (box) queries are rendered on every call and not cached: boxes
+        rarely repeat, and they would evict the full-period payloads.
+
+        Args:
+            fmt: Wire format, "json" (HeatmapResponse) or "binary"
+                (see serialization.render_heatmap_binary)
+            box: Only include cells inside this grid box (None for all)
+            resolution: Cell size in meters of a pyramid level (None for the
+                base grid); reported in the JSON body
+
+        Returns:
+            Encoded response body
+        """
+        render = PAYLOAD_RENDERERS[fmt]
+        resolution = _level_resolution(resolution)
+        extra = {'resolution': resolution} if resolution else None
+        if box is not None:
+            return render(
+                month, hour, metric,
+                self.get_heatmap_columns(month, hour, metric, day_type, box, resolution), extra
+            )
+        return self._payload_cache.get_or_create(
+            (fmt, month, hour, day_type, metric, resolution),
+            lambda: render(
+                month, hour, metric,
+                self.get_heatmap_columns(month, hour, metric, day_type, resolution=resolution), extra
+            )
+        )
+
+    def get_tile_payload(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        month: int,
+        hour: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        fmt: str = "binary",
+        resolution: Optional[int] = None
+    ) -> bytes:
+        """
+        Get the rendered heatmap body of one XYZ map tile.
+
+        The tile's cells are found through the spatial index and clipped to
+        the tile bounds. min_weight / max_weight hold the weight range of the
+        whole period, so every tile of a period is normalized the same way.
+        Tiles are rendered once and served from the tile cache afterwards.
+
+        Args:
+            z: Tile zoom
+            x: Tile column
+            y: Tile row
+            fmt: Wire format, "binary" or "json"
+            resolution: Cell size in meters of a pyramid level (None for the
+                base grid)
+
+        Returns:
+            Encoded response body (HeatmapResponse fields plus tile)
+        """
+        render = PAYLOAD_RENDERERS[fmt]
+        resolution = _level_resolution(resolution)
+
+        def build() -> bytes:
+            bounds = tile_bounds(z, x, y)
+            columns = clip_to_tile(
+                self.get_heatmap_columns(month, hour, metric, day_type, tile_grid_box(bounds), resolution),
+                bounds
+            )
+            min_weight, max_weight = self.weight_range(month, hour, metric, day_type, resolution)
+            extra = {'tile': [z, x, y], 'min_weight': min_weight, 'max_weight': max_weight}
+            if resolution:
+                extra['resolution'] = resolution
+            return render(month, hour, metric, columns, extra)
+
+        return self._tile_cache.get_or_create(
+            (fmt, z, x, y, month, hour, day_type, metric, resolution), build
+        )
+
+    def weight_range(
+        self,
+        month: int,
+        hour: int,
+        metric: str,
+        day_type: str,
+        resolution: Optional[int] = None
+    ) -> Tuple[float, float]:
+        """Get the (min, max) finite weight of a period, (0, 0) if it has none."""
+        period = self._period_columns(month, hour, day_type, [metric], resolution=_level_resolution(resolution))
+        weights = period[metric] if period is not None else np.empty(0)
+        weights = weights[np.isfinite(weights)]
+        if len(weights) == 0:
+            return 0.0, 0.0
+        return float(weights.min()), float(weights.max())
+
+    @property
+    def raster_tiles(self) -> RasterTileCache:
+        """Rendered raster tiles of this dataset version (memory and disk)."""
+        with self._raster_lock:
+            if self._raster_tiles is None:
+                self._raster_tiles = RasterTileCache(
+                    RASTER_CONFIG['cache_size'], get_raster_cache_dir(), self.version or 'unversioned'
+                )
+            return self._raster_tiles
+
+    def render_raster_tile(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        month: int,
+        hour: int,
+        metric: str,
+        day_type: str,
+        radius: int,
+        blur: int,
+        resolution: Optional[int] = None
+    ) -> bytes:
+        """
+        Render the heatmap PNG of one XYZ tile (uncached, see get_raster_tile).
+
+        Points up to the kernel extent outside the tile are included, so
+        their blur continues seamlessly across tile edges.
+        """
+        resolution = _level_resolution(resolution)
+        bounds = tile_bounds(z, x, y, buffer=kernel_extent(radius, blur))
+        columns = self.get_heatmap_columns(month, hour, metric, day_type, tile_grid_box(bounds), resolution)
+        weight_range = self.weight_range(month, hour, metric, day_type, resolution)
+        return render_tile_png(columns, z, x, y, weight_range, radius, blur)
+
+    def get_raster_tile(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        month: int,
+        hour: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        radius: int = RASTER_CONFIG['radius'],
+        blur: int = RASTER_CONFIG['blur'],
+        resolution: Optional[int] = None
+    ) -> bytes:
+        """
+        Get the server-rendered heatmap PNG of one XYZ tile.
+
+        Tiles look like the map's heatmap layer with the same radius and
+        blur; weights are normalized to the period's weight range. Each tile
+        is rendered once and then served from the raster tile cache.
+
+        Args:
+            z: Tile zoom
+            x: Tile column
+            y: Tile row
+            radius: Point radius in pixels
+            blur: Blur size in pixels
+            resolution: Cell size in meters of a pyramid level (None for the
+                base grid)
+
+        Returns:
+            PNG bytes (256 x 256 RGBA)
+        """
+        resolution = _level_resolution(resolution)
+        return self.raster_tiles.get_or_render(
+            [month, hour, day_type, metric, resolution, radius, blur], z, x, y,
+            lambda: self.render_raster_tile(z, x, y, month, hour, metric, day_type, radius, blur, resolution)
+        )
+
+    def get_heatmap_range_columns(
+        self,
+        months: List[int],
+        hour_start: int,
+        hour_end: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        agg: str = "sum",
+        box: Optional[GridBox] = None,
+        resolution: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Aggregate heatmap weights per cell over an hour range and several months.
+
+        Served from hour-axis prefix sums of the dense tensor, so the cost
+        per cell does not depend on the number of hours in the range. Falls
+        back to combining period slices when the dense tensor is disabled.
+        With a box, only the prefix sums of the cells inside it are read.
+
+        Args:
+            months: Month identifiers (YYYYMM format) to include
+            hour_start: First hour of the range (inclusive)
+            hour_end: Last hour of the range (inclusive; a range such as
+                22-2 wraps around midnight)
+            metric: User duration metric column name
+            day_type: Day type ("平日" or "假日")
+            agg: "sum" of the hourly weights, or "mean" over the periods in
+                which the cell has data
+            box: Only return cells inside this grid box (None for all)
+            resolution: Cell size in meters of a pyramid level (None for the
+                base grid); levels combine their period rows
+
+        Returns:
+            Dictionary of arrays with keys: gx, gy, lat, lng, weight
+            (cells without data in the range are omitted)
+        """
+        grid = self.grid(resolution)
+        cells = None if box is None else self.cells_in_box(box, resolution)
+        weights, counts = self.range_sums(months, hour_start, hour_end, metric, day_type, cells, resolution)
+
+        present = np.flatnonzero(counts > 0)
+        weights, counts = weights[present], counts[present]
+        if agg == 'mean':
+            weights = weights / counts
+        cols = grid.atlas.gather(present if cells is None else cells[present])
+        cols['weight'] = weights.astype(np.float32)
+        return cols
+
+    def _hour_span(self, hour_start: int, hour_end: int) -> Optional[Tuple[int, int]]:
+        """
+        Map an inclusive hour range to (first, last) hour axis indices.
+
+        Hours missing from this dataset are skipped. The returned span wraps
+        (first > last) exactly when the hour range wraps past midnight.
+
+        Returns:
+            Axis index span, or None if no available hour is in the range
+        """
+        first = int(np.searchsorted(self.available_hours, hour_start, side='left'))
+        last = int(np.searchsorted(self.available_hours, hour_end, side='right')) - 1
+        if hour_start <= hour_end and last < first:
+            return None
+        return first, last
+
+    def range_sums(
+        self,
+        months: List[int],
+        hour_start: int,
+        hour_end: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        cells: Optional[np.ndarray] = None,
+        resolution: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sum one metric per cell over an hour range and several months.
+
+        Months, hours and day types missing from this dataset contribute
+        nothing, so partial datasets (e.g. one month partition) can be
+        combined by the caller.
+
+        Args:
+            cells: Atlas cell ids to sum (None for every cell)
+            resolution: Cell size in meters of a pyramid level (None for the
+                base grid); cell ids refer to that level's atlas
+
+        Returns:
+            Tuple of (weight sums, number of periods with data), both
+            indexed by atlas cell id, or aligned with cells if given
+        """
+        grid = self.grid(resolution)
+        n_cells = len(grid.atlas) if cells is None else len(cells)
+        months = [m for m in months if m in self.available_months]
+        span = self._hour_span(hour_start, hour_end)
+        if not months or span is None or day_type not in self.available_day_types:
+            return np.zeros(n_cells), np.zeros(n_cells, dtype=np.int64)
+
+        h0, h1 = span
+        if grid is self and self.dense is not None:
+            month_idx = [self.available_months.index(m) for m in months]
+            day_idx = self.available_day_types.index(day_type)
+            sums, counts = self.dense.range_sum(month_idx, day_idx, h0, h1, cells)
+            return sums[:, self.metrics.index(metric)], counts
+        return self._range_from_slices(months, h0, h1, metric, day_type, cells, grid)
+
+    def _range_from_slices(
+        self,
+        months: List[int],
+        h0: int,
+        h1: int,
+        metric: str,
+        day_type: str,
+        cells: Optional[np.ndarray] = None,
+        grid=None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Range aggregation without the dense tensor: per-cell sums and row counts."""
+        grid = self if grid is None else grid
+        n_hours = len(self.available_hours)
+        hour_idx = range(h0, h1 + 1) if h0 <= h1 else list(range(h0, n_hours)) + list(range(0, h1 + 1))
+        bounds = [
+            grid.lookup_dict[(m, self.available_hours[h], day_type)]
+            for m in months for h in hour_idx
+            if (m, self.available_hours[h], day_type) in grid.lookup_dict
+        ]
+        if cells is None:
+            runs = [np.arange(start, stop) for start, stop in bounds]
+        else:
+            runs = [_period_rows(grid.columns['cell'], start, stop, cells) for start, stop in bounds]
+        rows = np.concatenate(runs) if runs else np.empty(0, dtype=np.int64)
+
+        row_cells = grid.columns['cell'][rows]
+        sums = np.bincount(row_cells, weights=grid.columns[metric][rows], minlength=len(grid.atlas))
+        counts = np.bincount(row_cells, minlength=len(grid.atlas))
+        if cells is not None:
+            return sums[cells], counts[cells]
+        return sums, counts
+
+    def get_heatmap_range_payload(
+        self,
+        months: List[int],
+        hour_start: int,
+        hour_end: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        agg: str = "sum",
+        fmt: str = "json",
+        box: Optional[GridBox] = None,
+        resolution: Optional[int] = None
+    ) -> bytes:
+        """
+        Get the rendered response body for an hour-range / multi-month query.
+
+        The JSON body is a HeatmapResponse with month and hour set to the
+        first month and hour_start, plus months, hour_end and agg fields.
+        Viewport (box) queries are not cached (see get_heatmap_payload).
+        """
+        render = PAYLOAD_RENDERERS[fmt]
+        resolution = _level_resolution(resolution)
+        extra = {'months': list(months), 'hour_end': hour_end, 'agg': agg}
+        if resolution:
+            extra['resolution'] = resolution
+        if box is not None:
+            return render(
+                months[0], hour_start, metric,
+                self.get_heatmap_range_columns(
+                    months, hour_start, hour_end, metric, day_type, agg, box, resolution
+                ),
+                extra
+            )
+        return self._payload_cache.get_or_create(
+            ('range', fmt, tuple(months), hour_start, hour_end, day_type, metric, agg, resolution),
+            lambda: render(
+                months[0], hour_start, metric,
+                self.get_heatmap_range_columns(
+                    months, hour_start, hour_end, metric, day_type, agg, resolution=resolution
+                ),
+                extra
+            )
+        )
+
+    def get_demographics_range(
+        self,
+        months: List[int],
+        hour_start: int,
+        hour_end: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日"
+    ) -> Dict:
+        """
+        Get demographic statistics pooled over an hour range and several months.
+
+        Weighted sums come from hour-axis prefix sums of the precomputed
+        demographics tensor, so each month costs two lookups.
+
+        Returns:
+            Dictionary with gender and age distribution percentages
+        """
+        return self._format_demographics(
+            *self.demographic_range_sums(months, hour_start, hour_end, metric, day_type)
+        )
+
+    def demographic_range_sums(
+        self,
+        months: List[int],
+        hour_start: int,
+        hour_end: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日"
+    ) -> Tuple[float, np.ndarray]:
+        """
+        Get the weight total and weighted demographic sums over a range.
+
+        Months, hours and day types missing from this dataset contribute
+        nothing, so results of partial datasets can be added together.
+
+        Returns:
+            Tuple of (total weight, weighted sums per demographic column)
+        """
+        months = [m for m in months if m in self.available_months]
+        span = self._hour_span(hour_start, hour_end)
+        if not months or span is None or day_type not in self.available_day_types:
+            return 0.0, np.zeros(len(self.demographic_columns))
+
+        month_idx = [self.available_months.index(m) for m in months]
+        d = self.available_day_types.index(day_type)
+        m = self.metrics.index(metric)
+        h0, h1 = span
+        n_hours = len(self.available_hours)
+
+        total = prefix_range(
+            lambda h: self.demographic_totals_cumsum[month_idx, d, h, m], h0, h1, n_hours
+        ).sum()
+        sums = prefix_range(
+            lambda h: self.demographic_sums_cumsum[month_idx, d, h, m], h0, h1, n_hours
+        ).sum(axis=0)
+        return float(total), sums
 
     def get_demographics(
         self,
@@ -166,7 +1106,8 @@ class DataCache:
         """
         Get demographic statistics for specific time period.
 
-        Calculates weighted averages based on the selected metric.
+        Weighted averages are read from the demographics tensor precomputed
+        at load time, so this is direct array indexing.
 
         Args:
             month: Month identifier (YYYYMM format)
@@ -177,48 +1118,89 @@ class DataCache:
         Returns:
             Dictionary with gender and age distribution percentages
         """
-        # Get filtered data
-        filtered_df = self.lookup_dict.get((month, hour, day_type))
-        if filtered_df is None or filtered_df.empty:
-            return {
-                'total_users': 0.0,
-                'gender': {'male': 0.0, 'female': 0.0},
-                'age': {f'age_{i}': 0.0 for i in range(1, 10)} | {'age_other': 0.0}
-            }
+        idx = self._period_index(month, hour, day_type)
+        if idx is None or metric not in self.metrics:
+            return self._format_demographics(0.0, None)
 
-        # Calculate weighted demographics
-        weights = filtered_df[metric].values
-        total_users = float(weights.sum())
+        m = self.metrics.index(metric)
+        return self._format_demographics(
+            self.demographic_totals[idx + (m,)],
+            self.demographic_sums[idx + (m,)]
+        )
 
-        if total_users == 0:
-            return {
-                'total_users': 0.0,
-                'gender': {'male': 0.0, 'female': 0.0},
-                'age': {f'age_{i}': 0.0 for i in range(1, 10)} | {'age_other': 0.0}
-            }
+    def get_demographics_all(
+        self,
+        month: int,
+        hour: int,
+        day_type: str = "平日"
+    ) -> Dict[str, Dict]:
+        """
+        Get demographic statistics for one time period under every metric.
 
-        # Weighted gender percentages
-        male_pct = float((filtered_df['sex_1'] * weights).sum() / total_users)
-        female_pct = float((filtered_df['sex_2'] * weights).sum() / total_users)
+        Returns:
+            Dictionary mapping metric name to the get_demographics() result
+        """
+        return {
+            metric: self.get_demographics(month, hour, metric, day_type)
+            for metric in self.metrics
+        }
 
-        # Weighted age percentages
-        age_dist = {}
-        for i in range(1, 10):
-            col = f'age_{i}'
-            if col in filtered_df.columns:
-                age_dist[col] = float((filtered_df[col] * weights).sum() / total_users)
+    def _format_demographics(self, total: float, sums: Optional[np.ndarray]) -> Dict:
+        """Turn a weight total and weighted demographic sums into percentages."""
+        return format_demographics(self.demographic_columns, total, sums)
 
-        if 'age_other' in filtered_df.columns:
-            age_dist['age_other'] = float((filtered_df['age_other'] * weights).sum() / total_users)
+    def cell_profile_arrays(self, gx: int, gy: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Get every period and metric of one grid cell.
 
-        return {
-            'total_users': total_users,
-            'gender': {
-                'male': male_pct,
-                'female': female_pct
-            },
-            'age': age_dist
-        }
+        Served from the dense tensor if present, otherwise from the
+        cell-major row index; both cost one gather per cell.
+
+        Args:
+            gx: Grid X coordinate
+            gy: Grid Y coordinate
+
+        Returns:
+            Tuple of (values [months, day_types, hours, metrics], mask
+            [months, day_types, hours]) on the available_* axes, or None if
+            the cell has no data
+        """
+        cell = self.atlas.cell_index(gx, gy)
+        if cell is None:
+            return None
+        if self.dense is not None:
+            return self.dense.cell_profile(cell)
+
+        rows = self.cell_index.rows_of(cell)
+        slots = self._period_axes(
+            self.columns['month'][rows], self.columns['hour'][rows], self.columns['day_type'][rows]
+        )
+        shape = self._period_shape()
+        values = np.zeros(shape + (len(self.metrics),), dtype=np.float32)
+        mask = np.zeros(shape, dtype=bool)
+        values[slots] = np.stack([self.columns[m][rows] for m in self.metrics], axis=1)
+        mask[slots] = True
+        return values, mask
+
+    def get_cell_profile(self, gx: int, gy: int) -> Optional[Dict]:
+        """
+        Get the time profile of one grid cell: every month, day type, hour
+        and metric.
+
+        Returns:
+            Dictionary with gx, gy, lat, lng, the months/day_types/hours
+            axes and per-metric [month][day_type][hour] values (None where
+            the cell has no data), or None if the cell is not in the data
+        """
+        profile = self.cell_profile_arrays(gx, gy)
+        if profile is None:
+            return None
+        cell = self.atlas.cell_index(gx, gy)
+        return format_cell_profile(
+            gx, gy, float(self.atlas.lat[cell]), float(self.atlas.lng[cell]),
+            self.available_months, self.available_day_types, self.available_hours,
+            self.metrics, *profile
+        )
 
     def get_metadata(self) -> Dict:
         """
@@ -231,34 +1213,368 @@ class DataCache:
             'months': self.available_months,
             'hours': self.available_hours,
             'day_types': self.available_day_types,
-            'metrics': [
-                {'key': 'avg_total_users', 'label': '全部停留人數'},
-                {'key': 'avg_users_under_10min', 'label': '停留10分鐘以下'},
-                {'key': 'avg_users_10_30min', 'label': '停留10-30分鐘'},
-                {'key': 'avg_users_over_30min', 'label': '停留30分鐘以上'}
-            ],
-            'total_locations': len(self.df),
+            'metrics': METRIC_OPTIONS,
+            'total_locations': self.n_rows,
             'data_coverage': {
-                'total_data_points': len(self.df),
-                'unique_locations': len(self.df.groupby(['gx', 'gy'])),
+                'total_data_points': self.n_rows,
+                'unique_locations': self.unique_locations,
                 'time_periods': len(self.lookup_dict)
             }
         }
 
 
-# Global cache instance (initialized on app startup)
+def _period_rows(cell_column: np.ndarray, start: int, stop: int, cells: np.ndarray) -> np.ndarray:
+    """
+    Get the rows of a period run that belong to the given cells.
+
+    Rows of a period are sorted by cell id, so each cell is found by binary
+    search.
+
+    Args:
+        cell_column: Cell id of every row
+        start: First row of the period
+        stop: End of the period (exclusive)
+        cells: Sorted cell ids
+
+    Returns:
+        Row offsets into the columns, in cell order
+    """
+    period_cells = cell_column[start:stop]
+    return start + expand_ranges(
+        np.searchsorted(period_cells, cells, side='left'),
+        np.searchsorted(period_cells, cells, side='right')
+    )
+
+
+def format_cell_profile(
+    gx: int,
+    gy: int,
+    lat: float,
+    lng: float,
+    months: List[int],
+    day_types: List[str],
+    hours: List[int],
+    metrics: List[str],
+    values: np.ndarray,
+    mask: np.ndarray
+) -> Dict:
+    """Build the cell profile dictionary (missing periods become None)."""
+    profile = {
+        'gx': gx, 'gy': gy, 'lat': lat, 'lng': lng,
+        'months': months, 'day_types': day_types, 'hours': hours,
+        'values': {},
+    }
+    for i, metric in enumerate(metrics):
+        cube = values[..., i].astype(object)
+        cube[~mask] = None
+        profile['values'][metric] = cube.tolist()
+    return profile
+
+
+def _level_resolution(resolution: Optional[int]) -> Optional[int]:
+    """Normalize a resolution to a pyramid level cell size (None for the base grid)."""
+    return None if resolution == GRID_CELL_SIZE else resolution
+
+
+def format_demographics(demographic_columns: List[str], total: float, sums: Optional[np.ndarray]) -> Dict:
+    """
+    Turn a weight total and weighted demographic sums into percentages.
+
+    Args:
+        demographic_columns: Demographic column of each entry in sums
+        total: Total weight
+        sums: Weighted sum per demographic column (None if no data)
+
+    Returns:
+        Dictionary with gender and age distribution percentages
+    """
+    total_users = float(total)
+    if sums is None or total_users == 0:
+        return {
+            'total_users': 0.0,
+            'gender': {'male': 0.0, 'female': 0.0},
+            'age': {f'age_{i}': 0.0 for i in range(1, 10)} | {'age_other': 0.0}
+        }
+
+    values = dict(zip(demographic_columns, (sums / total_users).tolist()))
+
+    return {
+        'total_users': total_users,
+        'gender': {
+            'male': values.get('sex_1', 0.0),
+            'female': values.get('sex_2', 0.0)
+        },
+        'age': {col: v for col, v in values.items() if col.startswith('age_')}
+    }
+
+
+class CacheNotReadyError(RuntimeError):
+    """Raised by get_cache() while the data cache is loading or failed to load."""
+
+
+class ReloadInProgressError(RuntimeError):
+    """Raised when a reload is requested while a load or reload is running."""
+
+
+def create_cache(data_path: str, snapshot_dir: Optional[Path] = None, timer: Optional[PhaseTimer] = None):
+    """
+    Create the cache for a data path.
+
+    Args:
+        data_path: A CSV file, or a directory of per-month partitions with a
+            manifest.json (see partitioned_cache)
+        snapshot_dir: Directory for binary snapshots (None disables them)
+        timer: Phase timer to record load phases in
+
+    Returns:
+        DataCache for a file, PartitionedDataCache for a directory (both
+        expose the same query interface)
+    """
+    if Path(data_path).is_dir():
+        from .partitioned_cache import PartitionedDataCache
+        return PartitionedDataCache(data_path, snapshot_dir, timer)
+    return DataCache(data_path, snapshot_dir, timer)
+
+
+def compute_source_hash(data_path: str) -> str:
+    """Content hash identifying a data path's version (the manifest for partitioned data)."""
+    if Path(data_path).is_dir():
+        from .partitions import manifest_path
+        return compute_file_hash(str(manifest_path(data_path)))
+    return compute_file_hash(data_path)
+
+
+def prepare_snapshots(data_path: str, snapshot_dir: Path):
+    """
+    Build the snapshots of a data path ahead of serving.
+
+    Used before starting several worker processes: each worker then
+    memory-maps the prepared snapshot read-only instead of parsing the data
+    itself, and the operating system shares those pages between workers.
+
+    Args:
+        data_path: A CSV file or a partitioned dataset directory (every
+            partition is prepared, one at a time)
+        snapshot_dir: Directory for binary snapshots
+    """
+    cache = create_cache(data_path, snapshot_dir)
+    if hasattr(cache, 'prepare_snapshots'):
+        cache.prepare_snapshots()
+
+
+# Global cache instance (initialized on app startup, replaced by reloads)
 _data_cache: Optional[DataCache] = None
 
+# Progress of the initial load and of the latest reload, reported by get_load_status()
+_load_lock = threading.Lock()
+_load_state: Dict = {'status': 'idle', 'error': None, 'started': None, 'finished': None}
+_load_timer: Optional[PhaseTimer] = None
+_reload_state: Dict = {'status': 'idle', 'error': None, 'started': None, 'finished': None}
+_reload_timer: Optional[PhaseTimer] = None
 
-def initialize_cache(csv_path: str):
-    """Initialize the global data cache."""
-    global _data_cache
-    _data_cache = DataCache(csv_path)
+# Source of the global cache (csv_path, snapshot_dir), reused by reloads
+_source: Optional[Tuple[str, Optional[Path]]] = None
+
+# Held for the whole duration of a reload, so at most one runs at a time
+_reload_lock = threading.Lock()
+
+
+def initialize_cache(csv_path: str, snapshot_dir: Optional[Path] = None):
+    """
+    Initialize the global data cache.
+
+    Args:
+        csv_path: Path to data.csv file
+        snapshot_dir: Directory for binary snapshots (None disables them)
+    """
+    global _data_cache, _load_timer, _source
+    timer = PhaseTimer()
+    with _load_lock:
+        _source = (csv_path, snapshot_dir)
+        _load_timer = timer
+        _load_state.update(status='loading', error=None, started=time.monotonic(), finished=None)
+
+    try:
+        cache = create_cache(csv_path, snapshot_dir, timer)
+    except Exception as e:
+        with _load_lock:
+            _load_state.update(status='failed', error=str(e), finished=time.monotonic())
+        raise
+
+    with _load_lock:
+        _data_cache = cache
+        _load_state.update(status='ready', finished=time.monotonic())
     logger.info("Data cache initialized successfully")
 
 
+def start_background_load(csv_path: str, snapshot_dir: Optional[Path] = None) -> threading.Thread:
+    """
+    Initialize the global data cache in a daemon thread.
+
+    Returns immediately; get_cache() raises CacheNotReadyError until loading
+    finishes and get_load_status() reports progress meanwhile.
+
+    Args:
+        csv_path: Path to data.csv file
+        snapshot_dir: Directory for binary snapshots (None disables them)
+
+    Returns:
+        The loader thread
+    """
+    def load():
+        try:
+            initialize_cache(csv_path, snapshot_dir)
+        except Exception as e:
+            logger.error(f"Background data load failed: {e}")
+
+    with _load_lock:
+        _load_state.update(status='loading', error=None, started=time.monotonic(), finished=None)
+    thread = threading.Thread(target=load, name="data-cache-loader", daemon=True)
+    thread.start()
+    return thread
+
+
+def _begin_reload():
+    """Claim the reload slot, or raise if a load or reload is already running."""
+    if not _reload_lock.acquire(blocking=False):
+        raise ReloadInProgressError("A data reload is already in progress")
+    with _load_lock:
+        loading = _load_state['status'] == 'loading'
+        source = _source
+    if loading or source is None:
+        _reload_lock.release()
+        if loading:
+            raise ReloadInProgressError("The initial data load is still in progress")
+        raise CacheNotReadyError("Data cache not initialized. Call initialize_cache() first.")
+
+    global _reload_timer
+    with _load_lock:
+        _reload_timer = PhaseTimer()
+        _reload_state.update(status='loading', error=None, started=time.monotonic(), finished=None)
+
+
+def _run_reload(force: bool) -> bool:
+    """Rebuild and swap in the global cache; releases the slot claimed by _begin_reload()."""
+    global _data_cache
+    try:
+        with _load_lock:
+            csv_path, snapshot_dir = _source
+            current = _data_cache
+            timer = _reload_timer
+
+        if not force and current is not None and compute_source_hash(csv_path) == current.source_hash:
+            logger.info("Data file unchanged, skipping reload")
+            with _load_lock:
+                _reload_state.update(status='ready', finished=time.monotonic())
+            return False
+
+        try:
+            cache = create_cache(csv_path, snapshot_dir, timer)
+        except Exception as e:
+            with _load_lock:
+                _reload_state.update(status='failed', error=str(e), finished=time.monotonic())
+            raise
+
+        # Atomic swap: requests that already hold the old instance finish on it,
+        # and its payload caches and ETags go away with it
+        with _load_lock:
+            _data_cache = cache
+            _reload_state.update(status='ready', finished=time.monotonic())
+            if _load_state['status'] != 'ready':
+                _load_state.update(status='ready', error=None, finished=time.monotonic())
+        clear_coordinate_cache()
+
+        old_version = current.version if current is not None else None
+        logger.info(f"Data cache reloaded: version {old_version} -> {cache.version}")
+        return True
+    finally:
+        _reload_lock.release()
+
+
+def reload_cache(force: bool = False) -> bool:
+    """
+    Rebuild the global data cache from its source CSV and swap it in.
+
+    The new DataCache is built while the current one keeps serving; the swap
+    is a single reference assignment, so in-flight requests keep the instance
+    they started with. Caches derived from the data are invalidated with it.
+
+    Args:
+        force: Rebuild even if the CSV content hash is unchanged
+
+    Returns:
+        True if a new cache was swapped in, False if the data was unchanged
+
+    Raises:
+        ReloadInProgressError: If a load or reload is already running
+        CacheNotReadyError: If the cache was never initialized
+    """
+    _begin_reload()
+    return _run_reload(force)
+
+
+def start_background_reload(force: bool = False) -> threading.Thread:
+    """
+    Run reload_cache() in a daemon thread.
+
+    Raises:
+        ReloadInProgressError: If a load or reload is already running
+        CacheNotReadyError: If the cache was never initialized
+    """
+    _begin_reload()
+
+    def reload():
+        try:
+            _run_reload(force)
+        except Exception as e:
+            logger.error(f"Data reload failed: {e}")
+
+    thread = threading.Thread(target=reload, name="data-cache-reloader", daemon=True)
+    thread.start()
+    return thread
+
+
+def _format_progress(state: Dict, timer: Optional[PhaseTimer]) -> Dict:
+    """Format a load state and its phase timer for status reporting."""
+    elapsed = None
+    if state['started'] is not None:
+        elapsed = (state['finished'] or time.monotonic()) - state['started']
+    return {
+        'status': state['status'],
+        'phase': timer.current if timer is not None else None,
+        'phases': {name: round(seconds, 3) for name, seconds in timer.phases.items()} if timer else {},
+        'elapsed_seconds': round(elapsed, 3) if elapsed is not None else None,
+        'error': state['error'],
+    }
+
+
+def get_load_status() -> Dict:
+    """
+    Get the progress of the data cache load.
+
+    Returns:
+        Dictionary with status ("idle", "loading", "ready" or "failed"), the
+        phase currently running, completed phase timings in seconds, elapsed
+        seconds and the error message if loading failed; plus the version of
+        the live dataset and the same progress fields for the latest reload
+    """
+    with _load_lock:
+        status = _format_progress(dict(_load_state), _load_timer)
+        status['version'] = _data_cache.version if _data_cache is not None else None
+        status['reload'] = _format_progress(dict(_reload_state), _reload_timer)
+    return status
+
+
 def get_cache() -> DataCache:
-    """Get the global data cache instance."""
+    """
+    Get the global data cache instance.
+
+    Raises:
+        CacheNotReadyError: If the cache is still loading or failed to load
+    """
     if _data_cache is None:
-        raise RuntimeError("Data cache not initialized. Call initialize_cache() first.")
+        status = _load_state['status']
+        if status == 'idle':
+            raise CacheNotReadyError("Data cache not initialized. Call initialize_cache() first.")
+        raise CacheNotReadyError(f"Data cache is not ready (status: {status})")
     return _data_cache
@@ -0,0 +1,93 @@
+"""
+Data File Watcher
+Polls the data CSV and reloads the data cache when it changes.
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, Optional, Tuple
+
+from .data_loader import ReloadInProgressError, reload_cache
+
+logger = logging.getLogger(__name__)
+
+
+class DataFileWatcher:
+    """
+    Background thread that triggers a cache reload when a file changes.
+
+    Changes are detected by (mtime, size) polling, which needs no platform
+    specific APIs. A reload starts only once the file looked the same on two
+    consecutive polls, so a data drop that is still being copied is not
+    picked up half-written.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = 5.0,
+        on_change: Callable[[], object] = reload_cache
+    ):
+        """
+        Args:
+            path: File to watch
+            interval: Seconds between polls
+            on_change: Called when the file changed (defaults to reload_cache)
+        """
+        self.path = path
+        self.interval = interval
+        self.on_change = on_change
+        self._loaded = self._stat()
+        self._pending: Optional[Tuple[float, int]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime, st.st_size)
+
+    def start(self):
+        """Start polling in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-file-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.path} for changes every {self.interval:g}s")
+
+    def stop(self):
+        """Stop polling and wait for the thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def poll(self):
+        """Check the file once and reload if it changed and has settled."""
+        current = self._stat()
+        if current is None or current == self._loaded:
+            self._pending = None
+            return
+        if current != self._pending:
+            # Changed since the last poll: wait until it stops changing
+            self._pending = current
+            return
+
+        logger.info(f"Data file changed: {self.path}")
+        try:
+            self.on_change()
+        except ReloadInProgressError:
+            # Try again on the next poll
+            return
+        except Exception as e:
+            logger.error(f"Reload after data file change failed: {e}")
+        self._loaded = current
+        self._pending = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
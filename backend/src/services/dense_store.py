@@ -0,0 +1,222 @@
+"""
+Dense Store Service
+Cell × time tensor storage for location metrics.
+
+Uses the cell atlas ids as the dense cell index and holds all metrics in
+one NumPy array shaped [cells, months, day_types, hours, metrics]
+with a validity mask shaped [cells, months, day_types, hours]. Cross-period
+operations (comparisons, ranges, per-cell profiles) become array slicing
+instead of joins between per-period slices.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cell_atlas import CellAtlas
+
+logger = logging.getLogger(__name__)
+
+
+def prefix_range(at: Callable[[int], np.ndarray], start: int, end: int, n: int) -> np.ndarray:
+    """
+    Sum an inclusive index range from a prefix-sum accessor.
+
+    Args:
+        at: Returns the prefix sum before index i (at(0) is zero, at(n) the total)
+        start: First index of the range
+        end: Last index of the range; if end < start the range wraps around
+            (e.g. hours 22-02)
+        n: Length of the summed axis
+
+    Returns:
+        Range sum with O(1) prefix lookups
+    """
+    if start <= end:
+        return at(end + 1) - at(start)
+    return (at(n) - at(start)) + (at(end + 1) - at(0))
+
+
+class DenseStore:
+    """
+    Dense cell × time tensor of metric values.
+
+    Periods without a row for a cell are zero in `values` and False in
+    `mask`, so sums can ignore the mask while averages and comparisons use it.
+    """
+
+    def __init__(
+        self,
+        atlas: CellAtlas,
+        values: np.ndarray,
+        mask: np.ndarray,
+        metrics: List[str],
+        hour_cumsum: Optional[np.ndarray] = None,
+        count_cumsum: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            atlas: Cell atlas; cell ids index the first values axis
+            values: Metric tensor [cells, months, day_types, hours, metrics]
+            mask: Validity mask [cells, months, day_types, hours]
+            metrics: Metric names in the order of the last values axis
+            hour_cumsum: Prefix sums of values along the hour axis
+                [cells, months, day_types, hours + 1, metrics] (built if None)
+            count_cumsum: Prefix counts of mask along the hour axis
+                [cells, months, day_types, hours + 1] (built if None)
+        """
+        self.atlas = atlas
+        self.values = values
+        self.mask = mask
+        self.metrics = metrics
+
+        if hour_cumsum is None or count_cumsum is None:
+            hour_cumsum, count_cumsum = self._build_prefix_sums()
+        self.hour_cumsum = hour_cumsum
+        self.count_cumsum = count_cumsum
+
+    @staticmethod
+    def estimate_nbytes(n_cells: int, period_shape: Tuple[int, int, int], n_metrics: int) -> int:
+        """Estimate the memory needed for values, mask and hour prefix sums."""
+        n_months, n_day_types, n_hours = period_shape
+        n_slots = n_cells * n_months * n_day_types * n_hours
+        n_prefix = n_cells * n_months * n_day_types * (n_hours + 1)
+        return (
+            n_slots * (n_metrics * np.dtype(np.float32).itemsize + 1)
+            + n_prefix * (n_metrics * np.dtype(np.float64).itemsize + np.dtype(np.int16).itemsize)
+        )
+
+    def _build_prefix_sums(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Build cumulative sums of values and valid counts along the hour axis."""
+        n_cells, n_months, n_day_types, n_hours, n_metrics = self.values.shape
+
+        hour_cumsum = np.zeros((n_cells, n_months, n_day_types, n_hours + 1, n_metrics), dtype=np.float64)
+        np.cumsum(self.values, axis=3, dtype=np.float64, out=hour_cumsum[:, :, :, 1:])
+
+        count_cumsum = np.zeros((n_cells, n_months, n_day_types, n_hours + 1), dtype=np.int16)
+        np.cumsum(self.mask, axis=3, dtype=np.int16, out=count_cumsum[:, :, :, 1:])
+
+        return hour_cumsum, count_cumsum
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: Dict[str, np.ndarray],
+        atlas: CellAtlas,
+        period_idx: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        period_shape: Tuple[int, int, int],
+        metrics: List[str]
+    ) -> "DenseStore":
+        """
+        Scatter row-oriented columns into the dense tensor.
+
+        Args:
+            columns: Row columns holding the cell id and every metric
+            atlas: Cell atlas the row cell ids refer to
+            period_idx: (month, day_type, hour) index arrays of every row
+            period_shape: Sizes of the month, day_type and hour axes
+            metrics: Metric column names
+
+        Returns:
+            DenseStore holding one slot per (cell, period)
+        """
+        n_cells = len(atlas)
+        values = np.zeros((n_cells,) + tuple(period_shape) + (len(metrics),), dtype=np.float32)
+        mask = np.zeros((n_cells,) + tuple(period_shape), dtype=bool)
+
+        slots = (columns['cell'],) + tuple(period_idx)
+        values[slots] = np.stack([columns[m] for m in metrics], axis=1)
+        mask[slots] = True
+
+        return cls(atlas, values, mask, metrics)
+
+    @property
+    def n_cells(self) -> int:
+        return len(self.atlas)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.values.nbytes + self.mask.nbytes
+                + self.hour_cumsum.nbytes + self.count_cumsum.nbytes)
+
+    def period_values(self, period: Tuple[int, int, int], metric: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get one metric for every cell in a period.
+
+        Args:
+            period: (month, day_type, hour) index
+            metric: Metric name
+
+        Returns:
+            Tuple of (values, mask) arrays of length n_cells (views)
+        """
+        m, d, h = period
+        return self.values[:, m, d, h, self.metrics.index(metric)], self.mask[:, m, d, h]
+
+    def compare_periods(
+        self,
+        base: Tuple[int, int, int],
+        other: Tuple[int, int, int],
+        metric: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compare a metric between two periods for every cell.
+
+        Returns:
+            Tuple of (other - base differences, mask of cells present in both)
+        """
+        base_values, base_mask = self.period_values(base, metric)
+        other_values, other_mask = self.period_values(other, metric)
+        return other_values - base_values, base_mask & other_mask
+
+    def cell_profile(self, cell: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get every period and metric of one cell.
+
+        Returns:
+            Tuple of (values [months, day_types, hours, metrics],
+            mask [months, day_types, hours]) views
+        """
+        return self.values[cell], self.mask[cell]
+
+    def range_sum(
+        self,
+        month_indices: List[int],
+        day_type: int,
+        hour_start: int,
+        hour_end: int,
+        cells: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sum every metric over an hour range and a set of months, per cell.
+
+        Each (cell, month) costs two prefix-sum lookups regardless of the
+        range length.
+
+        Args:
+            month_indices: Month axis indices to include
+            day_type: Day type axis index
+            hour_start: First hour axis index (inclusive)
+            hour_end: Last hour axis index (inclusive; wraps if < hour_start)
+            cells: Cell ids to sum (None for every cell)
+
+        Returns:
+            Tuple of (sums [cells, metrics], number of valid periods [cells]),
+            aligned with cells if given
+        """
+        n_hours = self.values.shape[3]
+        months = list(month_indices)
+        if cells is None:
+            index = (slice(None), months, day_type)
+        else:
+            index = (np.asarray(cells)[:, None], np.asarray(months, dtype=np.intp)[None, :], day_type)
+
+        sums = prefix_range(
+            lambda h: self.hour_cumsum[index + (h,)], hour_start, hour_end, n_hours
+        ).sum(axis=1)
+        counts = prefix_range(
+            lambda h: self.count_cumsum[index + (h,)].astype(np.int64), hour_start, hour_end, n_hours
+        ).sum(axis=1)
+
+        return sums, counts
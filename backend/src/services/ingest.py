@@ -0,0 +1,320 @@
+"""
+Ingestion Service
+Streams a CSV export of any size into a partitioned dataset directory.
+
+The input is parsed in fixed-size chunks restricted to the used columns
+(city_* and other extras are never materialized). Each chunk converts only
+the grid cells not seen in earlier chunks and appends its rows to per-month
+partition files, so peak memory depends on the chunk size and the number of
+cells, not on the size of the input (plus the key and metric columns of one
+month, read back to build each finished partition's cell profile index).
+The manifest and cell atlas are written last, once every partition is
+complete.
+
+New months are appended to an existing dataset the same way: only cells
+missing from the dataset's atlas are converted, the new partitions are
+written next to the existing ones, and the manifest is updated in place.
+The cost of an append depends on the new data only.
+
+Usage (from the backend directory):
+    python -m src.services.ingest export.csv ../data/months [--chunk-rows N]
+    python -m src.services.ingest 202509.csv ../data/months --append
+"""
+
+import argparse
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..utils.config import INGEST_CONFIG
+from .cell_atlas import CellAtlas, pack_cells
+from .data_loader import CSV_DTYPES, DEMOGRAPHIC_COLUMNS, METRICS
+from .partitions import (
+    build_manifest, load_manifest, manifest_path, partition_file_name,
+    read_atlas, write_atlas, write_manifest, write_profile_index
+)
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ['month', 'gx', 'gy', 'hour', 'day_type'] + METRICS
+
+PARTIAL_SUFFIX = ".partial"
+
+
+class _PartitionStats:
+    """Running statistics of one month partition while it is being written."""
+
+    def __init__(self):
+        self.rows = 0
+        self.cell_keys = np.empty(0, dtype=np.int64)
+        self.periods: Set[Tuple[int, str]] = set()
+
+    def add(self, rows: pd.DataFrame):
+        self.rows += len(rows)
+        keys = pack_cells(rows['gx'].to_numpy(), rows['gy'].to_numpy())
+        self.cell_keys = np.union1d(self.cell_keys, keys)
+        self.periods.update(zip(rows['hour'].tolist(), rows['day_type'].astype(str).tolist()))
+
+    def entry(self, file_name: str) -> Dict:
+        """Manifest entry of the partition."""
+        return {
+            "file": file_name,
+            "rows": int(self.rows),
+            "cells": int(len(self.cell_keys)),
+            "time_periods": len(self.periods),
+            "hours": sorted({hour for hour, _ in self.periods}),
+            "day_types": sorted({day_type for _, day_type in self.periods}),
+        }
+
+
+def read_chunks(csv_path: str, chunk_rows: int):
+    """
+    Iterate over a CSV in chunks of the used columns, validating the header.
+
+    Raises:
+        ValueError: If the CSV is missing required columns
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing_cols:
+        raise ValueError(f"CSV missing required columns: {missing_cols}")
+
+    return pd.read_csv(
+        csv_path,
+        usecols=lambda col: col in CSV_DTYPES,
+        dtype=CSV_DTYPES,
+        chunksize=chunk_rows
+    )
+
+
+def write_chunk(
+    chunk: pd.DataFrame,
+    dataset_dir: Path,
+    stats: Dict[int, _PartitionStats],
+    suffix: str = ""
+):
+    """
+    Append the rows of a chunk to their month partition files.
+
+    Args:
+        chunk: Rows of any number of months
+        dataset_dir: Dataset directory
+        stats: Running statistics by month, updated in place
+        suffix: Suffix of the partition files being written
+    """
+    for month, rows in chunk.groupby('month', sort=False, observed=True):
+        month = int(month)
+        path = dataset_dir / (partition_file_name(month) + suffix)
+        new_file = month not in stats
+        if new_file:
+            stats[month] = _PartitionStats()
+        rows.to_csv(path, mode='w' if new_file else 'a', header=new_file, index=False)
+        stats[month].add(rows)
+
+
+def _stream_partitions(
+    csv_path: str,
+    dataset_dir: Path,
+    atlas: CellAtlas,
+    chunk_rows: int,
+    existing_months=()
+) -> Tuple[CellAtlas, Dict[int, _PartitionStats], list, int]:
+    """
+    Stream a CSV into partial partition files and extend the atlas with its cells.
+
+    Partial files are removed if anything fails.
+
+    Returns:
+        Tuple of (extended atlas, statistics by month, demographic columns,
+        number of rows)
+
+    Raises:
+        ValueError: If the CSV is missing required columns or holds a month
+            listed in existing_months
+    """
+    stats: Dict[int, _PartitionStats] = {}
+    demographic_columns = []
+    n_rows = 0
+
+    try:
+        for chunk in read_chunks(csv_path, chunk_rows):
+            duplicates = sorted(set(chunk['month'].unique().tolist()) & set(existing_months))
+            if duplicates:
+                raise ValueError(f"Months already in the dataset: {duplicates}")
+            if not demographic_columns:
+                demographic_columns = [col for col in DEMOGRAPHIC_COLUMNS if col in chunk.columns]
+            # Only cells not seen before are converted
+            atlas = atlas.extend(chunk['gx'].to_numpy(), chunk['gy'].to_numpy())
+            write_chunk(chunk, dataset_dir, stats, PARTIAL_SUFFIX)
+            n_rows += len(chunk)
+            logger.info(f"Ingested {n_rows} rows ({len(atlas)} cells, {len(stats)} months)")
+    except Exception:
+        for month in stats:
+            (dataset_dir / (partition_file_name(month) + PARTIAL_SUFFIX)).unlink(missing_ok=True)
+        raise
+
+    return atlas, stats, demographic_columns, n_rows
+
+
+def _publish_partitions(dataset_dir: Path, stats: Dict[int, _PartitionStats]) -> Dict[int, Dict]:
+    """
+    Move complete partial files into place, write their cell profile indexes
+    and get their manifest entries.
+
+    Each index is built from its finished partition (one partition in memory
+    at a time), so serving the dataset never has to build it.
+    """
+    partitions = {}
+    for month, month_stats in stats.items():
+        file_name = partition_file_name(month)
+        os.replace(dataset_dir / (file_name + PARTIAL_SUFFIX), dataset_dir / file_name)
+        partitions[month] = month_stats.entry(file_name)
+        write_profile_index(str(dataset_dir), partitions[month])
+    return partitions
+
+
+def _dataset_atlas(dataset_dir: Path, manifest: Dict) -> CellAtlas:
+    """
+    Get the atlas of every cell in a dataset.
+
+    Datasets created without the ingestion tools have no atlas yet; it is
+    built once from the grid columns of their partitions.
+    """
+    atlas = read_atlas(str(dataset_dir))
+    if atlas is not None:
+        return atlas
+
+    logger.info(f"No cell atlas in {dataset_dir}, building it from the existing partitions...")
+    atlas = CellAtlas.empty()
+    for entry in manifest['partitions'].values():
+        for chunk in pd.read_csv(dataset_dir / entry['file'], usecols=['gx', 'gy'], chunksize=INGEST_CONFIG['chunk_rows']):
+            atlas = atlas.extend(chunk['gx'].to_numpy(), chunk['gy'].to_numpy())
+    return atlas
+
+
+def ingest_csv(csv_path: str, dataset_dir: str, chunk_rows: Optional[int] = None) -> Dict:
+    """
+    Stream a CSV into a new partitioned dataset.
+
+    Args:
+        csv_path: Input CSV (any size, any row order)
+        dataset_dir: Output directory (created if needed; must not already
+            hold a dataset)
+        chunk_rows: Rows parsed per chunk (defaults to INGEST_CONFIG)
+
+    Returns:
+        The written manifest
+
+    Raises:
+        FileNotFoundError: If the CSV doesn't exist
+        FileExistsError: If the directory already holds a dataset
+        ValueError: If the CSV is missing required columns
+    """
+    if not Path(csv_path).exists():
+        raise FileNotFoundError(f"Data file not found: {csv_path}")
+    dataset_dir = Path(dataset_dir)
+    if manifest_path(str(dataset_dir)).exists():
+        raise FileExistsError(f"{dataset_dir} already holds a dataset")
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    chunk_rows = chunk_rows or INGEST_CONFIG['chunk_rows']
+
+    started = time.perf_counter()
+    atlas, stats, demographic_columns, n_rows = _stream_partitions(
+        csv_path, dataset_dir, CellAtlas.empty(), chunk_rows
+    )
+    partitions = _publish_partitions(dataset_dir, stats)
+
+    manifest = build_manifest(partitions, pack_cells(atlas.gx, atlas.gy), demographic_columns)
+    write_atlas(str(dataset_dir), atlas)
+    # The manifest goes last: it is what makes the dataset visible
+    write_manifest(str(dataset_dir), manifest)
+
+    logger.info(
+        f"Ingested {n_rows} rows into {len(partitions)} partitions in {dataset_dir} "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return manifest
+
+
+def append_csv(csv_path: str, dataset_dir: str, chunk_rows: Optional[int] = None) -> Dict:
+    """
+    Append the months of a CSV to an existing partitioned dataset.
+
+    Existing partitions are neither read nor rewritten: only grid cells
+    missing from the dataset's atlas are converted, and the available
+    months and coverage statistics are updated in the manifest. Replacing
+    the manifest is what publishes the new months, so a server watching
+    the dataset (HEATMAP_WATCH_DATA) picks them up with a cheap reload.
+
+    Args:
+        csv_path: CSV holding one or more months not yet in the dataset
+        dataset_dir: Existing dataset directory
+        chunk_rows: Rows parsed per chunk (defaults to INGEST_CONFIG)
+
+    Returns:
+        The updated manifest
+
+    Raises:
+        FileNotFoundError: If the CSV or the dataset doesn't exist
+        ValueError: If the CSV is missing required columns, holds a month
+            already in the dataset, or has different demographic columns
+    """
+    if not Path(csv_path).exists():
+        raise FileNotFoundError(f"Data file not found: {csv_path}")
+    dataset_dir = Path(dataset_dir)
+    if not dataset_dir.is_dir():
+        raise FileNotFoundError(f"Dataset directory not found: {dataset_dir}")
+    chunk_rows = chunk_rows or INGEST_CONFIG['chunk_rows']
+
+    started = time.perf_counter()
+    manifest = load_manifest(str(dataset_dir))
+    known = _dataset_atlas(dataset_dir, manifest)
+    n_known = len(known)
+
+    atlas, stats, demographic_columns, n_rows = _stream_partitions(
+        csv_path, dataset_dir, known, chunk_rows, existing_months=manifest['months']
+    )
+    if stats and demographic_columns != manifest['demographic_columns']:
+        for month in stats:
+            (dataset_dir / (partition_file_name(month) + PARTIAL_SUFFIX)).unlink(missing_ok=True)
+        raise ValueError(
+            f"Demographic columns {demographic_columns} differ from the dataset's "
+            f"{manifest['demographic_columns']}"
+        )
+
+    partitions = {int(month): entry for month, entry in manifest['partitions'].items()}
+    partitions.update(_publish_partitions(dataset_dir, stats))
+
+    manifest = build_manifest(partitions, pack_cells(atlas.gx, atlas.gy), manifest['demographic_columns'])
+    write_atlas(str(dataset_dir), atlas)
+    write_manifest(str(dataset_dir), manifest)
+
+    logger.info(
+        f"Appended {n_rows} rows ({sorted(stats)}, {len(atlas) - n_known} new cells) to "
+        f"{dataset_dir} in {time.perf_counter() - started:.2f}s"
+    )
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a CSV export into a partitioned dataset directory")
+    parser.add_argument("csv_path", help="Input CSV file")
+    parser.add_argument("dataset_dir", help="Output dataset directory")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="Rows parsed per chunk")
+    parser.add_argument("--append", action="store_true", help="Append new months to an existing dataset")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.append:
+        append_csv(args.csv_path, args.dataset_dir, args.chunk_rows)
+    else:
+        ingest_csv(args.csv_path, args.dataset_dir, args.chunk_rows)
+
+
+if __name__ == "__main__":
+    main()
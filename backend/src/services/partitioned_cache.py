@@ -0,0 +1,511 @@
+"""
+Partitioned Data Cache
+Serves a directory of per-month CSV partitions with lazy loading and eviction.
+
+Metadata comes from the dataset manifest (see partitions.py), so startup
+reads no partition at all. Each month is loaded into its own DataCache on
+first access (using the same binary snapshots as a single-file dataset)
+and kept in an LRU under a memory budget, which keeps years of history
+available without holding all of it resident.
+
+Cell profiles span every month, so they are not answered by loading the
+partitions: every partition has a cell-major profile index (written by the
+ingestion tools, or built when the cache is created), and profiles are read
+from those memory-mapped indexes.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.config import CACHE_CONFIG, PARTITION_CONFIG, PYRAMID_CONFIG, RASTER_CONFIG, get_raster_cache_dir
+from ..utils.lru import LRUCache
+from ..utils.timing import PhaseTimer
+from .cell_atlas import ATLAS_FIELDS
+from .cell_index import CellProfileIndex
+from .coordinate_converter import GRID_CELL_SIZE, gxgy_to_latlon
+from .data_loader import (
+    METRIC_OPTIONS, METRICS, PAYLOAD_RENDERERS, DataCache, format_cell_profile, format_demographics
+)
+from .raster import RasterTileCache, empty_tile_png
+from .partitions import load_manifest, load_profile_index, manifest_path, read_atlas
+from .snapshot import compute_file_hash
+from .spatial import GridBox, morton_keys
+
+logger = logging.getLogger(__name__)
+
+
+def _empty_columns() -> Dict[str, np.ndarray]:
+    """Heatmap columns of a period without data."""
+    return {
+        'gx': np.empty(0, dtype=np.int16),
+        'gy': np.empty(0, dtype=np.int16),
+        'lat': np.empty(0, dtype=np.float64),
+        'lng': np.empty(0, dtype=np.float64),
+        'weight': np.empty(0, dtype=np.float32),
+    }
+
+
+class PartitionedDataCache:
+    """
+    Data cache over per-month partitions, loaded on demand.
+
+    Exposes the same query interface as DataCache. Single-period queries are
+    answered by the month's partition; hour-range / multi-month queries
+    combine per-partition range sums cell by cell.
+    """
+
+    def __init__(
+        self,
+        dataset_dir: str,
+        snapshot_dir: Optional[Path] = None,
+        timer: Optional[PhaseTimer] = None,
+        memory_budget: Optional[int] = None
+    ):
+        """
+        Initialize the cache from the dataset manifest.
+
+        Args:
+            dataset_dir: Directory holding one CSV per month and manifest.json
+                (created by scanning the partitions if missing)
+            snapshot_dir: Directory for per-partition binary snapshots (None
+                disables them)
+            timer: Phase timer to record load phases in
+            memory_budget: Bytes of loaded partitions to keep resident
+                (defaults to PARTITION_CONFIG['memory_budget_bytes']); the
+                most recently used partition is always kept
+
+        Raises:
+            FileNotFoundError: If the dataset directory doesn't exist
+            ValueError: If the manifest or a partition is invalid
+        """
+        self.dataset_dir = Path(dataset_dir)
+        if not self.dataset_dir.is_dir():
+            raise FileNotFoundError(f"Dataset directory not found: {dataset_dir}")
+
+        self.snapshot_dir = snapshot_dir
+        self.memory_budget = memory_budget if memory_budget is not None else PARTITION_CONFIG['memory_budget_bytes']
+        self.load_timings = timer if timer is not None else PhaseTimer()
+
+        with self.load_timings.phase('manifest'):
+            self.manifest = load_manifest(str(self.dataset_dir))
+        with self.load_timings.phase('hash'):
+            self.source_hash = compute_file_hash(str(manifest_path(str(self.dataset_dir))))
+        # Dataset version fingerprint (used for HTTP ETags)
+        self.version = self.source_hash[:16]
+        # Converted coordinates shared by all partitions (if the dataset has them)
+        with self.load_timings.phase('atlas'):
+            self.cell_atlas = read_atlas(str(self.dataset_dir))
+        # Cell profile index of every partition (memory-mapped, outside the
+        # memory budget); partitions without a stored index are read once here
+        with self.load_timings.phase('profiles'):
+            self._profile_indexes: Dict[int, CellProfileIndex] = {
+                int(month): load_profile_index(str(self.dataset_dir), entry)
+                for month, entry in self.manifest['partitions'].items()
+            }
+
+        self.available_months: List[int] = list(self.manifest['months'])
+        self.available_hours: List[int] = list(self.manifest['hours'])
+        self.available_day_types: List[str] = list(self.manifest['day_types'])
+        self.demographic_columns: List[str] = list(self.manifest['demographic_columns'])
+        self.n_rows: int = self.manifest['n_rows']
+        self.unique_locations: int = self.manifest['unique_locations']
+        self.metrics: List[str] = list(METRICS)
+        # Every partition builds the configured pyramid levels
+        self.resolutions: List[int] = [GRID_CELL_SIZE] + sorted(set(PYRAMID_CONFIG['levels']))
+
+        # Loaded partitions, least recently used first
+        self._partitions: "OrderedDict[int, DataCache]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per month so concurrent first accesses load a partition once
+        self._month_locks = {month: threading.Lock() for month in self.available_months}
+        self._payload_cache = LRUCache(CACHE_CONFIG['payload_cache_size'])
+        # Survives partition eviction, so evicted months keep their tiles
+        self.raster_tiles = RasterTileCache(RASTER_CONFIG['cache_size'], get_raster_cache_dir(), self.version)
+
+        logger.info(
+            f"Partitioned dataset: {len(self.available_months)} months in {self.dataset_dir} "
+            f"(loaded on demand, budget {self.memory_budget / 1024 / 1024:.0f} MB)"
+        )
+        logger.info(f"Load phases: {self.load_timings.summary()}")
+
+    @property
+    def loaded_months(self) -> List[int]:
+        """Months currently resident, least recently used first."""
+        with self._lock:
+            return list(self._partitions)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the loaded partitions."""
+        with self._lock:
+            return sum(cache.nbytes for cache in self._partitions.values())
+
+    def partition(self, month: int) -> Optional[DataCache]:
+        """
+        Get the DataCache of a month, loading it on first access.
+
+        Loading a partition may evict the least recently used ones. Evicted
+        instances stay valid for callers that still hold them.
+
+        Returns:
+            The month's DataCache, or None if the month is not in the dataset
+        """
+        month_lock = self._month_locks.get(month)
+        if month_lock is None:
+            return None
+
+        with self._lock:
+            cache = self._partitions.get(month)
+            if cache is not None:
+                self._partitions.move_to_end(month)
+                return cache
+
+        with month_lock:
+            with self._lock:
+                cache = self._partitions.get(month)
+                if cache is not None:
+                    self._partitions.move_to_end(month)
+                    return cache
+
+            entry = self.manifest['partitions'][str(month)]
+            started = time.perf_counter()
+            cache = DataCache(
+                str(self.dataset_dir / entry['file']), self.snapshot_dir, known_cells=self.cell_atlas
+            )
+            logger.info(f"Loaded partition {month} in {time.perf_counter() - started:.2f}s")
+
+            with self._lock:
+                self._partitions[month] = cache
+                self._evict()
+        return cache
+
+    def prepare_snapshots(self):
+        """
+        Build the snapshot of every partition, one at a time.
+
+        Partitions are not kept resident, so memory stays bounded by the
+        largest partition.
+        """
+        if self.snapshot_dir is None:
+            return
+        for month in self.available_months:
+            entry = self.manifest['partitions'][str(month)]
+            DataCache(str(self.dataset_dir / entry['file']), self.snapshot_dir, known_cells=self.cell_atlas)
+
+    def _evict(self):
+        """Drop least recently used partitions until within budget (lock held)."""
+        resident = sum(cache.nbytes for cache in self._partitions.values())
+        while len(self._partitions) > 1 and resident > self.memory_budget:
+            month, cache = self._partitions.popitem(last=False)
+            resident -= cache.nbytes
+            logger.info(f"Evicted partition {month} ({cache.nbytes / 1024 / 1024:.1f} MB)")
+
+    def get_heatmap_data(
+        self,
+        month: int,
+        hour: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日"
+    ) -> List[Dict]:
+        """Get heatmap data for a time period (see DataCache.get_heatmap_data)."""
+        cache = self.partition(month)
+        if cache is None:
+            return []
+        return cache.get_heatmap_data(month, hour, metric, day_type)
+
+    def get_heatmap_columns(
+        self,
+        month: int,
+        hour: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        box: Optional[GridBox] = None,
+        resolution: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """Get heatmap column arrays for a time period (see DataCache.get_heatmap_columns)."""
+        cache = self.partition(month)
+        if cache is None:
+            return _empty_columns()
+        return cache.get_heatmap_columns(month, hour, metric, day_type, box, resolution)
+
+    def get_heatmap_payload(
+        self,
+        month: int,
+        hour: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        fmt: str = "json",
+        box: Optional[GridBox] = None,
+        resolution: Optional[int] = None
+    ) -> bytes:
+        """Get the rendered heatmap body for a time period (see DataCache.get_heatmap_payload)."""
+        cache = self.partition(month)
+        if cache is None:
+            extra = {'resolution': resolution} if resolution not in (None, GRID_CELL_SIZE) else None
+            return PAYLOAD_RENDERERS[fmt](month, hour, metric, _empty_columns(), extra)
+        return cache.get_heatmap_payload(month, hour, metric, day_type, fmt, box, resolution)
+
+    def get_tile_payload(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        month: int,
+        hour: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        fmt: str = "binary",
+        resolution: Optional[int] = None
+    ) -> bytes:
+        """Get the rendered heatmap body of one map tile (see DataCache.get_tile_payload)."""
+        cache = self.partition(month)
+        if cache is None:
+            return PAYLOAD_RENDERERS[fmt](month, hour, metric, _empty_columns(), {'tile': [z, x, y]})
+        return cache.get_tile_payload(z, x, y, month, hour, metric, day_type, fmt, resolution)
+
+    def get_raster_tile(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        month: int,
+        hour: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        radius: int = RASTER_CONFIG['radius'],
+        blur: int = RASTER_CONFIG['blur'],
+        resolution: Optional[int] = None
+    ) -> bytes:
+        """Get the server-rendered heatmap PNG of one tile (see DataCache.get_raster_tile)."""
+        resolution = None if resolution == GRID_CELL_SIZE else resolution
+
+        def render() -> bytes:
+            cache = self.partition(month)
+            if cache is None:
+                return empty_tile_png()
+            return cache.render_raster_tile(z, x, y, month, hour, metric, day_type, radius, blur, resolution)
+
+        return self.raster_tiles.get_or_render(
+            [month, hour, day_type, metric, resolution, radius, blur], z, x, y, render
+        )
+
+    def get_heatmap_range_columns(
+        self,
+        months: List[int],
+        hour_start: int,
+        hour_end: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        agg: str = "sum",
+        box: Optional[GridBox] = None,
+        resolution: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Aggregate heatmap weights per cell over an hour range and several months.
+
+        Each month's partition computes its range sums from its own prefix
+        sums (restricted to the box's cells if given); the results are
+        merged by Morton cell key, one partition at a time, so a range over
+        many months never needs them all resident.
+
+        Returns:
+            Dictionary of arrays with keys: gx, gy, lat, lng, weight, sorted
+            by cell like DataCache (cells without data are omitted)
+        """
+        parts: Dict[str, List[np.ndarray]] = {name: [] for name in ATLAS_FIELDS + ['weight', 'count']}
+        for month in months:
+            cache = self.partition(month)
+            if cache is None:
+                continue
+            cells = None if box is None else cache.cells_in_box(box, resolution)
+            weights, counts = cache.range_sums([month], hour_start, hour_end, metric, day_type, cells, resolution)
+            present = np.flatnonzero(counts > 0)
+            atlas = cache.grid(resolution).atlas
+            for name, values in atlas.gather(present if cells is None else cells[present]).items():
+                parts[name].append(values)
+            parts['weight'].append(weights[present])
+            parts['count'].append(counts[present])
+
+        if not parts['gx']:
+            return _empty_columns()
+
+        merged = {name: np.concatenate(values) for name, values in parts.items()}
+        _, first, inverse = np.unique(
+            morton_keys(merged['gx'], merged['gy']), return_index=True, return_inverse=True
+        )
+        inverse = inverse.reshape(-1)
+        weights = np.bincount(inverse, weights=merged['weight'])
+        if agg == 'mean':
+            weights = weights / np.bincount(inverse, weights=merged['count'])
+
+        cols = {name: merged[name][first] for name in ATLAS_FIELDS}
+        cols['weight'] = weights.astype(np.float32)
+        return cols
+
+    def get_heatmap_range_payload(
+        self,
+        months: List[int],
+        hour_start: int,
+        hour_end: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日",
+        agg: str = "sum",
+        fmt: str = "json",
+        box: Optional[GridBox] = None,
+        resolution: Optional[int] = None
+    ) -> bytes:
+        """Get the rendered body for an hour-range / multi-month query (see DataCache)."""
+        render = PAYLOAD_RENDERERS[fmt]
+        if resolution == GRID_CELL_SIZE:
+            resolution = None
+        extra = {'months': list(months), 'hour_end': hour_end, 'agg': agg}
+        if resolution:
+            extra['resolution'] = resolution
+        if box is not None:
+            return render(
+                months[0], hour_start, metric,
+                self.get_heatmap_range_columns(
+                    months, hour_start, hour_end, metric, day_type, agg, box, resolution
+                ),
+                extra
+            )
+        return self._payload_cache.get_or_create(
+            ('range', fmt, tuple(months), hour_start, hour_end, day_type, metric, agg, resolution),
+            lambda: render(
+                months[0], hour_start, metric,
+                self.get_heatmap_range_columns(
+                    months, hour_start, hour_end, metric, day_type, agg, resolution=resolution
+                ),
+                extra
+            )
+        )
+
+    def get_demographics(
+        self,
+        month: int,
+        hour: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日"
+    ) -> Dict:
+        """Get demographic statistics for a time period (see DataCache.get_demographics)."""
+        cache = self.partition(month)
+        if cache is None:
+            return format_demographics(self.demographic_columns, 0.0, None)
+        return cache.get_demographics(month, hour, metric, day_type)
+
+    def get_demographics_all(
+        self,
+        month: int,
+        hour: int,
+        day_type: str = "平日"
+    ) -> Dict[str, Dict]:
+        """Get demographic statistics for a time period under every metric."""
+        return {
+            metric: self.get_demographics(month, hour, metric, day_type)
+            for metric in self.metrics
+        }
+
+    def get_demographics_range(
+        self,
+        months: List[int],
+        hour_start: int,
+        hour_end: int,
+        metric: str = "avg_total_users",
+        day_type: str = "平日"
+    ) -> Dict:
+        """
+        Get demographic statistics pooled over an hour range and several months.
+
+        Returns:
+            Dictionary with gender and age distribution percentages
+        """
+        total, sums = self._demographic_range_sums(months, hour_start, hour_end, metric, day_type)
+        return format_demographics(self.demographic_columns, total, sums)
+
+    def _demographic_range_sums(
+        self,
+        months: List[int],
+        hour_start: int,
+        hour_end: int,
+        metric: str,
+        day_type: str
+    ) -> Tuple[float, np.ndarray]:
+        """Add up the per-partition weight totals and weighted demographic sums."""
+        total = 0.0
+        sums = np.zeros(len(self.demographic_columns))
+        for month in months:
+            cache = self.partition(month)
+            if cache is None:
+                continue
+            month_total, month_sums = cache.demographic_range_sums([month], hour_start, hour_end, metric, day_type)
+            total += month_total
+            sums += month_sums
+        return total, sums
+
+    def get_cell_profile(self, gx: int, gy: int) -> Optional[Dict]:
+        """
+        Get the time profile of one grid cell across every month partition.
+
+        Read from the cell profile index of each partition (one binary search
+        and one slice per month); no partition is loaded.
+
+        Returns:
+            Same dictionary as DataCache.get_cell_profile, or None if the
+            cell is not in the data
+        """
+        if self.cell_atlas is not None and self.cell_atlas.cell_index(gx, gy) is None:
+            return None
+
+        shape = (len(self.available_months), len(self.available_day_types), len(self.available_hours))
+        values = np.zeros(shape + (len(self.metrics),), dtype=np.float32)
+        mask = np.zeros(shape, dtype=bool)
+        key = int(morton_keys(gx, gy))
+        for m, month in enumerate(self.available_months):
+            index = self._profile_indexes[month]
+            run = index.profile(key)
+            if run is None:
+                continue
+            # Map the index's day type codes and hours onto the dataset's axes
+            day_codes, hours, run_values = run
+            days = np.array([self.available_day_types.index(d) for d in index.day_types])[day_codes]
+            slots = (days, np.searchsorted(self.available_hours, hours))
+            values[m][slots] = run_values[:, [index.metrics.index(metric) for metric in self.metrics]]
+            mask[m][slots] = True
+
+        if not mask.any():
+            return None
+        if self.cell_atlas is not None:
+            cell = self.cell_atlas.cell_index(gx, gy)
+            lat, lng = float(self.cell_atlas.lat[cell]), float(self.cell_atlas.lng[cell])
+        else:
+            lat, lng = gxgy_to_latlon(gx, gy)
+        return format_cell_profile(
+            gx, gy, lat, lng, self.available_months, self.available_day_types, self.available_hours,
+            self.metrics, values, mask
+        )
+
+    def get_metadata(self) -> Dict:
+        """
+        Get available months, hours, metrics, and day types (from the manifest).
+
+        Returns:
+            Dictionary with months, hours, metrics, day_types lists
+        """
+        return {
+            'months': self.available_months,
+            'hours': self.available_hours,
+            'day_types': self.available_day_types,
+            'metrics': METRIC_OPTIONS,
+            'total_locations': self.n_rows,
+            'data_coverage': {
+                'total_data_points': self.n_rows,
+                'unique_locations': self.unique_locations,
+                'time_periods': self.manifest['time_periods']
+            }
+        }
@@ -0,0 +1,310 @@
+"""
+Partition Manifest Service
+Describes a dataset stored as a directory of per-month CSV partitions.
+
+The manifest (manifest.json in the dataset directory) holds everything the
+API reports as metadata — available months, hours, day types and coverage
+statistics — so a partitioned dataset can start serving without reading
+any partition. Partitions are then loaded on first access.
+
+Datasets written by the ingestion tools (see ingest.py) also hold
+atlas.npz, the converted coordinates of every cell in the dataset, so
+loading a partition converts no coordinates.
+
+profiles/ holds one cell profile index per partition (see
+cell_index.CellProfileIndex): every period and metric of each cell, stored
+cell-major, so the time profile of a cell across all months is answered
+without loading any partition. Indexes are keyed by the size and
+modification time of their partition file; missing or stale ones are
+rebuilt from the partition (only its key and metric columns are read).
+
+Manifest layout:
+    {
+        "format": 1,
+        "months": [202412, ...],
+        "hours": [0, ..., 23],
+        "day_types": ["假日", "平日"],
+        "demographic_columns": ["sex_1", ...],
+        "n_rows": 2881,
+        "unique_locations": 547,
+        "time_periods": 192,
+        "partitions": {"202412": {"file": "202412.csv", "rows": 720,
+                                  "cells": 412, "time_periods": 48}, ...}
+    }
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .cell_atlas import CellAtlas, pack_cells
+from .cell_index import CellIndex, CellProfileIndex
+from .spatial import morton_keys
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FORMAT = 1
+ATLAS_FILE = "atlas.npz"
+PROFILES_DIR = "profiles"
+
+# Columns read when scanning partitions for the manifest
+SCAN_COLUMNS = ['month', 'gx', 'gy', 'hour', 'day_type']
+
+
+def manifest_path(dataset_dir: str) -> Path:
+    """Get the manifest file of a partitioned dataset directory."""
+    return Path(dataset_dir) / MANIFEST_FILE
+
+
+def partition_file_name(month: int) -> str:
+    """Get the file name used for a month partition."""
+    return f"{month}.csv"
+
+
+def read_manifest(dataset_dir: str) -> Dict:
+    """
+    Read a dataset manifest.
+
+    Raises:
+        FileNotFoundError: If the directory has no manifest
+        ValueError: If the manifest format is not supported
+    """
+    with open(manifest_path(dataset_dir), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ValueError(f"Unsupported manifest format: {manifest.get('format')}")
+    return manifest
+
+
+def write_manifest(dataset_dir: str, manifest: Dict):
+    """Write a dataset manifest atomically (readers never see a partial file)."""
+    path = manifest_path(dataset_dir)
+    tmp_path = path.with_name(path.name + f".tmp-{os.getpid()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_atlas(dataset_dir: str) -> Optional[CellAtlas]:
+    """
+    Read the cell atlas of a dataset.
+
+    Returns:
+        The atlas, or None if the dataset has none or it is unreadable
+        (coordinates are then converted when partitions load)
+    """
+    path = Path(dataset_dir) / ATLAS_FILE
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as arrays:
+            return CellAtlas.from_arrays({name: arrays[name] for name in arrays.files})
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Failed to read cell atlas {path}: {e}")
+        return None
+
+
+def write_atlas(dataset_dir: str, atlas: CellAtlas):
+    """Write the cell atlas of a dataset atomically."""
+    path = Path(dataset_dir) / ATLAS_FILE
+    tmp_path = path.with_name(f"atlas.tmp-{os.getpid()}.npz")
+    np.savez(tmp_path, **atlas.to_arrays())
+    os.replace(tmp_path, path)
+
+
+def build_manifest(partitions: Dict[int, Dict], cell_keys: np.ndarray, demographic_columns: List[str]) -> Dict:
+    """
+    Assemble a manifest from per-partition statistics.
+
+    Args:
+        partitions: Month to partition entry (file, rows, cells, time_periods,
+            hours, day_types)
+        cell_keys: Packed keys of every cell in the dataset (see pack_cells)
+        demographic_columns: Demographic columns present in the partitions
+
+    Returns:
+        Manifest dictionary
+    """
+    months = sorted(partitions)
+    hours = sorted({h for p in partitions.values() for h in p['hours']})
+    day_types = sorted({d for p in partitions.values() for d in p['day_types']})
+    return {
+        "format": MANIFEST_FORMAT,
+        "months": months,
+        "hours": hours,
+        "day_types": day_types,
+        "demographic_columns": demographic_columns,
+        "n_rows": int(sum(p['rows'] for p in partitions.values())),
+        "unique_locations": int(len(np.unique(cell_keys))),
+        "time_periods": int(sum(p['time_periods'] for p in partitions.values())),
+        "partitions": {str(month): partitions[month] for month in months},
+    }
+
+
+def scan_partitions(dataset_dir: str) -> Dict:
+    """
+    Build a manifest by scanning the partition CSVs of a dataset directory.
+
+    Only the key columns of each partition are read. Every CSV file must
+    hold exactly one month.
+
+    Raises:
+        ValueError: If the directory has no partitions or a file holds
+            several months
+    """
+    partitions: Dict[int, Dict] = {}
+    cell_keys = []
+    demographic_columns: List[str] = []
+
+    for csv_file in sorted(Path(dataset_dir).glob("*.csv")):
+        df = pd.read_csv(csv_file, usecols=SCAN_COLUMNS)
+        months = df['month'].unique()
+        if len(months) != 1:
+            raise ValueError(f"Partition {csv_file.name} must hold exactly one month, found {len(months)}")
+
+        keys = pack_cells(df['gx'].to_numpy(), df['gy'].to_numpy())
+        cell_keys.append(np.unique(keys))
+        partitions[int(months[0])] = {
+            "file": csv_file.name,
+            "rows": int(len(df)),
+            "cells": int(len(cell_keys[-1])),
+            "time_periods": int(len(df.groupby(['hour', 'day_type']))),
+            "hours": sorted(int(h) for h in df['hour'].unique()),
+            "day_types": sorted(str(d) for d in df['day_type'].unique()),
+        }
+        if not demographic_columns:
+            from .data_loader import DEMOGRAPHIC_COLUMNS
+            header = pd.read_csv(csv_file, nrows=0).columns
+            demographic_columns = [col for col in DEMOGRAPHIC_COLUMNS if col in header]
+
+    if not partitions:
+        raise ValueError(f"No CSV partitions found in {dataset_dir}")
+
+    return build_manifest(
+        partitions,
+        np.concatenate(cell_keys),
+        demographic_columns
+    )
+
+
+def load_manifest(dataset_dir: str) -> Dict:
+    """
+    Read the manifest of a dataset, creating it by a scan if it is missing.
+
+    The manifest is authoritative once written: tools that add or replace
+    partitions update it (delete it to force a rescan).
+    """
+    if manifest_path(dataset_dir).exists():
+        return read_manifest(dataset_dir)
+
+    logger.info(f"No manifest in {dataset_dir}, scanning partitions...")
+    manifest = scan_partitions(dataset_dir)
+    # The manifest file is also the dataset version (its hash), so it must exist
+    write_manifest(dataset_dir, manifest)
+    return manifest
+
+
+def profile_index_path(dataset_dir: str, entry: Dict) -> Tuple[Path, str]:
+    """
+    Get the cell profile index directory of a partition and its source fingerprint.
+
+    Partitions are never rewritten in place (see ingest.py), so the file
+    size and modification time identify a partition without hashing it.
+
+    Args:
+        dataset_dir: Dataset directory
+        entry: Manifest entry of the partition
+
+    Returns:
+        Tuple of (index directory, fingerprint)
+
+    Raises:
+        OSError: If the partition file is missing
+    """
+    partition_file = Path(dataset_dir) / entry['file']
+    stat = partition_file.stat()
+    source = f"{stat.st_size}-{stat.st_mtime_ns}"
+    digest = hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+    return Path(dataset_dir) / PROFILES_DIR / f"{partition_file.stem}.{digest}.profile", source
+
+
+def build_profile_index(dataset_dir: str, entry: Dict) -> CellProfileIndex:
+    """
+    Build the cell profile index of a partition from its CSV file.
+
+    Only the key and metric columns are read; no coordinates are converted.
+    """
+    from .data_loader import CSV_DTYPES, METRICS
+    columns = ['gx', 'gy', 'hour', 'day_type'] + METRICS
+    df = pd.read_csv(Path(dataset_dir) / entry['file'], usecols=columns,
+                     dtype={col: CSV_DTYPES[col] for col in columns})
+
+    keys = morton_keys(df['gx'].to_numpy(), df['gy'].to_numpy())
+    cell_keys, cells = np.unique(keys, return_inverse=True)
+    day_codes, day_types = pd.factorize(df['day_type'], sort=True)
+    return CellProfileIndex.build(
+        CellIndex.build(cells, len(cell_keys)),
+        cell_keys,
+        day_codes.astype(np.int8),
+        df['hour'].to_numpy(dtype=np.int8),
+        np.stack([df[m].to_numpy(dtype=np.float32) for m in METRICS], axis=1),
+        [str(d) for d in day_types],
+        METRICS
+    )
+
+
+def write_profile_index(dataset_dir: str, entry: Dict) -> Path:
+    """
+    Build and store the cell profile index of a partition, replacing older ones.
+
+    Returns:
+        The index directory
+    """
+    path, source = profile_index_path(dataset_dir, entry)
+    path.parent.mkdir(exist_ok=True)
+    build_profile_index(dataset_dir, entry).save(path, source)
+    for old in path.parent.glob(f"{Path(entry['file']).stem}.*.profile"):
+        if old != path:
+            shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+def read_profile_index(dataset_dir: str, entry: Dict) -> Optional[CellProfileIndex]:
+    """
+    Open the stored cell profile index of a partition (memory-mapped).
+
+    Returns:
+        The index, or None if it is missing or stale
+    """
+    try:
+        path, source = profile_index_path(dataset_dir, entry)
+    except OSError:
+        return None
+    return CellProfileIndex.load(path, source)
+
+
+def load_profile_index(dataset_dir: str, entry: Dict) -> CellProfileIndex:
+    """
+    Get the cell profile index of a partition, building it if needed.
+
+    A rebuilt index is stored for later starts; if the dataset directory is
+    not writable it is kept in memory only.
+    """
+    index = read_profile_index(dataset_dir, entry)
+    if index is not None:
+        return index
+    try:
+        write_profile_index(dataset_dir, entry)
+    except OSError as e:
+        logger.warning(f"Could not store the cell profile index of {entry['file']}: {e}")
+        return build_profile_index(dataset_dir, entry)
+    index = read_profile_index(dataset_dir, entry)
+    return index if index is not None else build_profile_index(dataset_dir, entry)
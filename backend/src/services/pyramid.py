@@ -0,0 +1,224 @@
+"""
+Grid Pyramid Service
+Coarser aggregations of the 50 m grid for zoomed-out views.
+
+Each level merges square blocks of factor x factor base cells (factor a
+power of two) into one cell. Metric weights are summed; demographic
+percentages are averaged weighted by total users, so a merged cell reports
+the percentages of its merged population.
+
+Levels keep the layout of the base grid (rows sorted by period, then by a
+Morton-ordered cell id), so the same period offsets, viewport search and
+range aggregation apply to every level. Because Morton keys nest, a base
+cell's coarse key is its own key shifted right, so coarse cell ids are
+non-decreasing along the base rows of a period and each level is built
+with one segmented reduction, without sorting.
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.config import PYRAMID_CONFIG
+from .cell_atlas import ATLAS_FIELDS, CellAtlas
+from .coordinate_converter import GRID_CELL_SIZE, batch_gxgy_to_latlon
+from .spatial import GridBox, morton_keys
+
+# Metric whose weights re-weight demographic percentages in coarse cells
+POPULATION_METRIC = 'avg_total_users'
+
+# Latitude used to turn a web map zoom into meters per pixel (Taiwan)
+REFERENCE_LATITUDE = 23.7
+
+# Meters per pixel at zoom 0 on the equator (256 px Web Mercator tiles)
+ZOOM0_METERS_PER_PIXEL = 156543.03392
+
+PeriodKey = Tuple[int, int, str]
+
+
+def level_factor(cell_size: int) -> int:
+    """
+    Get the number of base cells per side of a level's cells.
+
+    Raises:
+        ValueError: If the cell size is not the base cell size times a power
+            of two (greater than one)
+    """
+    factor, remainder = divmod(cell_size, GRID_CELL_SIZE)
+    if remainder or factor < 2 or factor & (factor - 1):
+        raise ValueError(
+            f"Invalid pyramid cell size: {cell_size} m "
+            f"(must be {GRID_CELL_SIZE} m times a power of two)"
+        )
+    return factor
+
+
+def resolution_for_zoom(zoom: float, resolutions: List[int]) -> int:
+    """
+    Pick the grid resolution for a web map zoom level.
+
+    Args:
+        zoom: Web Mercator zoom (OpenLayers / XYZ tiles)
+        resolutions: Available cell sizes in meters (including the base)
+
+    Returns:
+        The coarsest cell size spanning at most PYRAMID_CONFIG['cell_pixels']
+        pixels, or the finest available one
+    """
+    meters_per_pixel = ZOOM0_METERS_PER_PIXEL * math.cos(math.radians(REFERENCE_LATITUDE)) / 2 ** zoom
+    limit = meters_per_pixel * PYRAMID_CONFIG['cell_pixels']
+    fitting = [size for size in resolutions if size <= limit]
+    return max(fitting) if fitting else min(resolutions)
+
+
+class GridLevel:
+    """
+    One coarse level of the grid pyramid.
+
+    Mirrors the attributes DataCache queries read (atlas, columns,
+    lookup_dict), so period and range queries run on a level unchanged.
+    Atlas gx/gy are coarse grid coordinates (base coordinate // factor).
+    """
+
+    def __init__(
+        self,
+        cell_size: int,
+        atlas: CellAtlas,
+        columns: Dict[str, np.ndarray],
+        lookup_dict: Dict[PeriodKey, Tuple[int, int]]
+    ):
+        """
+        Args:
+            cell_size: Cell size in meters
+            atlas: Coarse cells, sorted by Morton key
+            columns: Row columns: cell (coarse id), metrics and demographics
+            lookup_dict: (month, hour, day_type) -> (start, stop) row offsets
+        """
+        self.cell_size = cell_size
+        self.factor = level_factor(cell_size)
+        self.atlas = atlas
+        self.columns = columns
+        self.lookup_dict = lookup_dict
+
+    @classmethod
+    def build(
+        cls,
+        cell_size: int,
+        base_atlas: CellAtlas,
+        base_columns: Dict[str, np.ndarray],
+        period_keys: List[PeriodKey],
+        period_bounds: np.ndarray,
+        metrics: List[str],
+        demographic_columns: List[str]
+    ) -> "GridLevel":
+        """
+        Aggregate the base rows into a coarse level.
+
+        Args:
+            cell_size: Cell size in meters
+            base_atlas: Base cell atlas
+            base_columns: Base row columns, sorted by period then cell id
+            period_keys: Key of every period, in row order
+            period_bounds: [periods, 2] start/stop offsets of the periods
+            metrics: Metric column names
+            demographic_columns: Demographic column names
+
+        Returns:
+            The level
+        """
+        factor = level_factor(cell_size)
+        coarse_gx = base_atlas.gx.astype(np.int32) // factor
+        coarse_gy = base_atlas.gy.astype(np.int32) // factor
+        keys, first, coarse_of_cell = np.unique(
+            morton_keys(coarse_gx, coarse_gy), return_index=True, return_inverse=True
+        )
+        gx, gy = coarse_gx[first], coarse_gy[first]
+        # Centers of the coarse cells, in (fractional) base grid coordinates
+        offset = (factor - 1) / 2
+        lat, lng = batch_gxgy_to_latlon(gx * factor + offset, gy * factor + offset, engine="numpy")
+        atlas = CellAtlas(gx.astype(np.int16), gy.astype(np.int16), lat, lng)
+
+        # Group rows by (period, coarse cell); groups are contiguous runs
+        n_rows = len(base_columns['cell'])
+        starts, stops = period_bounds[:, 0], period_bounds[:, 1]
+        row_period = np.repeat(np.arange(len(starts), dtype=np.int64), stops - starts)
+        row_cell = coarse_of_cell.reshape(-1)[base_columns['cell']]
+        group_starts = np.flatnonzero(np.diff(row_period * len(keys) + row_cell, prepend=-1))
+
+        columns = {'cell': row_cell[group_starts].astype(np.int32)}
+        for metric in metrics:
+            columns[metric] = _segment_sum(base_columns[metric], group_starts).astype(np.float32)
+
+        if demographic_columns:
+            weights = base_columns[POPULATION_METRIC].astype(np.float64)
+            total = _segment_sum(weights, group_starts)
+            counts = np.diff(np.append(group_starts, n_rows))
+            weighted = total > 0
+            for col in demographic_columns:
+                values = base_columns[col].astype(np.float64)
+                # Cells without users fall back to the plain average
+                mean = _segment_sum(values, group_starts) / np.maximum(counts, 1)
+                columns[col] = np.where(
+                    weighted, _segment_sum(values * weights, group_starts) / np.where(weighted, total, 1), mean
+                ).astype(np.float32)
+
+        group_period = row_period[group_starts]
+        level_starts = np.searchsorted(group_period, np.arange(len(starts)), side='left')
+        level_stops = np.searchsorted(group_period, np.arange(len(starts)), side='right')
+        lookup_dict = {
+            key: (start, stop)
+            for key, start, stop in zip(period_keys, level_starts.tolist(), level_stops.tolist())
+        }
+        return cls(cell_size, atlas, columns, lookup_dict)
+
+    def to_arrays(self, period_keys: List[PeriodKey]) -> Dict[str, np.ndarray]:
+        """
+        Get the arrays persisted in a snapshot.
+
+        Args:
+            period_keys: Period keys the index arrays are aligned with
+        """
+        arrays = {f'atlas_{name}': array for name, array in self.atlas.to_arrays().items()}
+        arrays.update({f'column_{name}': array for name, array in self.columns.items()})
+        bounds = np.array([self.lookup_dict[key] for key in period_keys], dtype=np.int64).reshape(-1, 2)
+        arrays['index_start'], arrays['index_stop'] = bounds[:, 0], bounds[:, 1]
+        return arrays
+
+    @classmethod
+    def from_arrays(
+        cls,
+        cell_size: int,
+        arrays: Dict[str, np.ndarray],
+        column_names: List[str],
+        period_keys: List[PeriodKey]
+    ) -> "GridLevel":
+        """Restore a level from the arrays returned by to_arrays()."""
+        atlas = CellAtlas.from_arrays({name: arrays[f'atlas_{name}'] for name in ATLAS_FIELDS})
+        columns = {name: arrays[f'column_{name}'] for name in column_names}
+        lookup_dict = {
+            key: (start, stop)
+            for key, start, stop in zip(
+                period_keys, arrays['index_start'].tolist(), arrays['index_stop'].tolist()
+            )
+        }
+        return cls(cell_size, atlas, columns, lookup_dict)
+
+    def scale_box(self, box: Optional[GridBox]) -> Optional[GridBox]:
+        """Map a base grid box to the level cells it touches."""
+        if box is None:
+            return None
+        f = self.factor
+        return (box[0] // f, box[1] // f, box[2] // f, box[3] // f)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = list(self.columns.values()) + list(self.atlas.to_arrays().values())
+        return sum(a.nbytes for a in arrays)
+
+
+def _segment_sum(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Sum contiguous row runs beginning at starts (float64)."""
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.float64)
+    return np.add.reduceat(values.astype(np.float64, copy=False), starts)
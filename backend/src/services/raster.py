@@ -0,0 +1,350 @@
+"""
+Raster Tile Service
+Server-side rendering of heatmap PNG tiles.
+
+Renders what the OpenLayers Heatmap layer in HeatmapMap.vue draws on the
+client: every point is a disc of `radius` pixels softened by a Gaussian
+`blur`, weighted by its normalized weight; the accumulated alpha is mapped
+through the same five-color gradient.
+
+Points are splatted into a pixel grid with np.bincount and convolved with
+the point kernel in one FFT, so the cost of a tile does not depend on the
+number of points. The map composites overlapping points with "over"
+blending (alpha = 1 - prod(1 - w * k)); the renderer sums w * -log(1 - k)
+instead and returns 1 - exp(-sum), which is linear in the weights (one
+convolution) and exact for points of full weight.
+
+Rendered tiles are kept in memory and, optionally, on disk, so a tile is
+rendered once per dataset version rather than once per client and frame.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import struct
+import tempfile
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.lru import LRUCache
+from .tiles import TILE_SIZE, tile_pixels
+
+logger = logging.getLogger(__name__)
+
+# Gradient of the HeatmapMap.vue heatmap layer (low to high)
+HEATMAP_GRADIENT = ['#00f', '#0ff', '#0f0', '#ff0', '#f00']
+
+PNG_MEDIA_TYPE = "image/png"
+
+# Largest kernel value used in -log(1 - k) (keeps full-alpha centers finite)
+MAX_KERNEL_ALPHA = 0.999
+
+# Namespace of the disk cache inside the configured directory, and the marker
+# file that proves the namespace was created by RasterTileCache
+TILE_NAMESPACE = "raster-tiles"
+NAMESPACE_MARKER = ".raster-tiles"
+
+# Names of version directories (dataset version fingerprints); only these
+# are ever pruned
+VERSION_PATTERN = re.compile(r"[0-9a-f]{16}|unversioned")
+
+
+def kernel_extent(radius: int, blur: int) -> int:
+    """Get how far in pixels a point's kernel reaches (OpenLayers uses radius + blur)."""
+    return radius + blur
+
+
+def _parse_color(color: str) -> Tuple[int, int, int]:
+    """Parse #rgb or #rrggbb into an RGB tuple."""
+    value = color.lstrip('#')
+    if len(value) == 3:
+        value = ''.join(c * 2 for c in value)
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+
+
+@lru_cache(maxsize=None)
+def gradient_palette(colors: Tuple[str, ...] = tuple(HEATMAP_GRADIENT)) -> np.ndarray:
+    """
+    Get the 256-entry RGB palette of a gradient.
+
+    Colors are evenly spaced stops, like the 256 x 1 canvas gradient the
+    OpenLayers Heatmap layer samples by alpha.
+
+    Returns:
+        uint8 array [256, 3]
+    """
+    stops = np.array([_parse_color(c) for c in colors], dtype=np.float64)
+    positions = np.linspace(0.0, 1.0, len(stops))
+    samples = np.linspace(0.0, 1.0, 256)
+    palette = np.stack([np.interp(samples, positions, stops[:, i]) for i in range(3)], axis=1)
+    return np.rint(palette).astype(np.uint8)
+
+
+@lru_cache(maxsize=32)
+def point_kernel(radius: int, blur: int) -> np.ndarray:
+    """
+    Get the alpha footprint of one full-weight point.
+
+    A disc of the given radius convolved with a Gaussian of sigma blur / 2
+    (the canvas shadowBlur OpenLayers draws points with).
+
+    Returns:
+        float64 array [2 * extent + 1, 2 * extent + 1], values in [0, 1)
+    """
+    extent = kernel_extent(radius, blur)
+    offsets = np.arange(-extent, extent + 1, dtype=np.float64)
+    kernel = (offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius ** 2).astype(np.float64)
+    if blur > 0:
+        sigma = blur / 2.0
+        gauss = np.exp(-0.5 * (offsets / sigma) ** 2)
+        gauss /= gauss.sum()
+        kernel = np.apply_along_axis(np.convolve, 0, kernel, gauss, mode='same')
+        kernel = np.apply_along_axis(np.convolve, 1, kernel, gauss, mode='same')
+    return np.clip(kernel, 0.0, MAX_KERNEL_ALPHA)
+
+
+@lru_cache(maxsize=None)
+def _fft_size(n: int) -> int:
+    """Get the smallest size >= n with no prime factor above 5 (fast FFT lengths)."""
+    size = n
+    while True:
+        m = size
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return size
+        size += 1
+
+
+@lru_cache(maxsize=32)
+def _kernel_spectrum(radius: int, blur: int, size: int) -> np.ndarray:
+    """Get the FFT of the -log(1 - k) kernel for an FFT size (see module docstring)."""
+    return np.fft.rfft2(-np.log1p(-point_kernel(radius, blur)), s=(size, size))
+
+
+def render_density(px: np.ndarray, py: np.ndarray, weights: np.ndarray, radius: int, blur: int) -> np.ndarray:
+    """
+    Render the heatmap alpha of one tile.
+
+    Args:
+        px: Point columns in tile pixels (may lie outside the tile)
+        py: Point rows in tile pixels
+        weights: Point weights normalized to [0, 1]
+        radius: Point radius in pixels
+        blur: Blur size in pixels
+
+    Returns:
+        float64 alpha [TILE_SIZE, TILE_SIZE] in [0, 1]
+    """
+    extent = kernel_extent(radius, blur)
+    canvas = TILE_SIZE + 2 * extent
+
+    # Splat points onto a canvas padded by the kernel extent, so points just
+    # outside the tile still bleed into it
+    ix = np.floor(px).astype(np.int64) + extent
+    iy = np.floor(py).astype(np.int64) + extent
+    inside = (ix >= 0) & (ix < canvas) & (iy >= 0) & (iy < canvas)
+    splat = np.bincount(
+        iy[inside] * canvas + ix[inside], weights=weights[inside], minlength=canvas * canvas
+    ).reshape(canvas, canvas)
+
+    # Linear convolution of the canvas with the (2 * extent + 1) kernel; the
+    # tile starts 2 * extent pixels into the full convolution
+    size = _fft_size(canvas + 2 * extent)
+    density = np.fft.irfft2(np.fft.rfft2(splat, s=(size, size)) * _kernel_spectrum(radius, blur, size),
+                            s=(size, size))
+    tile = density[2 * extent:2 * extent + TILE_SIZE, 2 * extent:2 * extent + TILE_SIZE]
+    return 1.0 - np.exp(-np.maximum(tile, 0.0))
+
+
+def colorize(alpha: np.ndarray, colors: Tuple[str, ...] = tuple(HEATMAP_GRADIENT)) -> np.ndarray:
+    """
+    Map alpha values to RGBA pixels through the heatmap gradient.
+
+    Returns:
+        uint8 array [height, width, 4]; alpha is kept as the pixel alpha
+    """
+    level = np.rint(np.clip(alpha, 0.0, 1.0) * 255).astype(np.uint8)
+    rgba = np.empty(alpha.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = gradient_palette(colors)[level]
+    rgba[..., 3] = level
+    return rgba
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """
+    Encode an RGBA image as PNG (8-bit, no filtering).
+
+    Args:
+        rgba: uint8 array [height, width, 4]
+    """
+    height, width = rgba.shape[:2]
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    rows = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(rows.tobytes(), 6))
+        + chunk(b'IEND', b'')
+    )
+
+
+@lru_cache(maxsize=1)
+def empty_tile_png() -> bytes:
+    """Get a fully transparent tile."""
+    return encode_png(colorize(np.zeros((TILE_SIZE, TILE_SIZE))))
+
+
+def render_tile_png(
+    columns: Dict[str, np.ndarray],
+    z: int,
+    x: int,
+    y: int,
+    weight_range: Tuple[float, float],
+    radius: int,
+    blur: int
+) -> bytes:
+    """
+    Render the heatmap PNG of one XYZ tile.
+
+    Args:
+        columns: Arrays keyed by lat, lng and weight; should include points
+            up to kernel_extent(radius, blur) pixels outside the tile (points
+            with non-finite values are skipped)
+        z: Tile zoom
+        x: Tile column
+        y: Tile row
+        weight_range: (min, max) weight normalized to 0..1, the range of the
+            whole period as on the map
+        radius: Point radius in pixels
+        blur: Blur size in pixels
+
+    Returns:
+        PNG bytes
+    """
+    finite = np.isfinite(columns['weight']) & np.isfinite(columns['lat']) & np.isfinite(columns['lng'])
+    if not finite.any():
+        return empty_tile_png()
+    if not finite.all():
+        columns = {name: columns[name][finite] for name in ('lat', 'lng', 'weight')}
+    min_weight, max_weight = weight_range
+    weights = (columns['weight'].astype(np.float64) - min_weight) / ((max_weight - min_weight) or 1.0)
+    px, py = tile_pixels(columns['lat'], columns['lng'], z, x, y)
+    alpha = render_density(px, py, np.clip(weights, 0.0, 1.0), radius, blur)
+    return encode_png(colorize(alpha))
+
+
+class RasterTileCache:
+    """
+    Two-level cache of rendered raster tiles: a bounded in-memory LRU in
+    front of an optional directory of PNG files.
+
+    Disk tiles live under <directory>/raster-tiles/<version>/<params>/<z>/<x>/<y>.png,
+    so a new dataset version never serves stale tiles and processes sharing
+    the directory (uvicorn workers) render each tile once. Old versions are
+    pruned only inside the marked raster-tiles namespace, so a configured
+    directory that holds other files is never touched.
+    """
+
+    def __init__(self, maxsize: int, directory: Optional[Path], version: str):
+        """
+        Args:
+            maxsize: Tiles kept in memory
+            directory: Disk cache root (None keeps tiles in memory only)
+            version: Dataset version fingerprint
+        """
+        self.memory = LRUCache(maxsize)
+        self.directory = Path(directory) / TILE_NAMESPACE / version if directory is not None else None
+        if self.directory is not None and self._claim_namespace():
+            self._prune_other_versions()
+
+    def _claim_namespace(self) -> bool:
+        """
+        Create the raster-tiles namespace with its marker (best effort).
+
+        Returns:
+            True if the namespace carries the marker, i.e. it is safe to prune
+        """
+        root = self.directory.parent
+        marker = root / NAMESPACE_MARKER
+        try:
+            if not root.exists():
+                root.mkdir(parents=True)
+                marker.touch()
+        except OSError as e:
+            logger.debug(f"Could not create the raster tile cache {root}: {e}")
+        if marker.exists():
+            return True
+        logger.warning(f"{root} was not created by the raster tile cache, old tiles will not be pruned")
+        return False
+
+    def _prune_other_versions(self):
+        """Remove tiles of other dataset versions (best effort)."""
+        try:
+            siblings = [
+                p for p in self.directory.parent.iterdir()
+                if p.is_dir() and p != self.directory and VERSION_PATTERN.fullmatch(p.name)
+            ]
+        except OSError:
+            return
+        for path in siblings:
+            try:
+                shutil.rmtree(path)
+                logger.info(f"Removed raster tiles of old dataset version {path.name}")
+            except OSError as e:
+                logger.debug(f"Could not remove raster tiles {path}: {e}")
+
+    def _path(self, params: List[Hashable], z: int, x: int, y: int) -> Path:
+        digest = hashlib.sha1(repr(params).encode('utf-8')).hexdigest()[:16]
+        return self.directory / digest / str(z) / str(x) / f"{y}.png"
+
+    def _store(self, path: Path, png: bytes):
+        """Write a tile file atomically, so readers never see a partial tile (best effort)."""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        except OSError as e:
+            logger.debug(f"Could not store raster tile {path}: {e}")
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(png)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug(f"Could not store raster tile {path}: {e}")
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def get_or_render(self, params: List[Hashable], z: int, x: int, y: int, render: Callable[[], bytes]) -> bytes:
+        """
+        Get a tile, rendering and storing it on a miss.
+
+        Args:
+            params: Everything besides z/x/y the tile depends on
+            render: Builds the PNG bytes
+        """
+        def load() -> bytes:
+            if self.directory is None:
+                return render()
+            path = self._path(params, z, x, y)
+            try:
+                return path.read_bytes()
+            except OSError:
+                pass
+            png = render()
+            self._store(path, png)
+            return png
+
+        return self.memory.get_or_create(tuple(params) + (z, x, y), load)
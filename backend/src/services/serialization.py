@@ -0,0 +1,179 @@
+"""
+Serialization Service
+Renders API response bodies directly from NumPy column arrays.
+
+Bypasses per-point dicts and Pydantic models on the hot path: each heatmap
+period is rendered once to JSON bytes and then served as a raw response.
+The JSON output matches the HeatmapResponse schema field for field.
+
+Binary heatmap format (little-endian, version 1):
+
+    offset  type        field
+    0       char[4]     magic "HMAP"
+    4       uint16      format version
+    6       uint8       hour
+    7       uint8       reserved (0)
+    8       uint32      point count N
+    12      uint32      month (YYYYMM)
+    16      float32     min_weight
+    20      float32     max_weight
+    24      float32[N]  lat
+    ..      float32[N]  lng
+    ..      float32[N]  weight
+    ..      int16[N]    gx
+    ..      int16[N]    gy
+
+Columns are stored back to back with the 4-byte types first, so every
+column starts at an offset aligned for a typed-array view.
+
+Multi-frame streams (e.g. a full-month animation pack) are either NDJSON,
+one JSON payload per line, or a sequence of binary payloads each prefixed
+with its uint32 little-endian byte length.
+"""
+
+import json
+import struct
+from typing import Dict, Optional
+
+import numpy as np
+
+HEATMAP_BINARY_MEDIA_TYPE = "application/vnd.heatmap+octet-stream"
+HEATMAP_FRAMES_MEDIA_TYPE = "application/vnd.heatmap-frames+octet-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+HEATMAP_BINARY_VERSION = 1
+HEATMAP_BINARY_MAGIC = b"HMAP"
+
+_BINARY_HEADER = struct.Struct("<4sHBBIIff")
+_FRAME_LENGTH = struct.Struct("<I")
+
+_POINT_TEMPLATE = '{"gx":%d,"gy":%d,"lat":%r,"lng":%r,"weight":%r}'
+
+
+def _finite_points(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Drop points with a NaN or infinite weight or coordinate.
+
+    Such points cannot be drawn, and %r would render them as bare nan/inf,
+    which is not valid JSON.
+    """
+    finite = np.isfinite(columns['weight']) & np.isfinite(columns['lat']) & np.isfinite(columns['lng'])
+    if finite.all():
+        return columns
+    return {name: values[finite] for name, values in columns.items()}
+
+
+def render_heatmap_json(
+    month: int,
+    hour: int,
+    metric: str,
+    columns: Dict[str, np.ndarray],
+    extra: Optional[Dict] = None
+) -> bytes:
+    """
+    Render a HeatmapResponse body as JSON bytes.
+
+    Args:
+        month: Month identifier (YYYYMM)
+        hour: Hour of day (0-23)
+        metric: Metric the weights were taken from
+        columns: Arrays keyed by gx, gy, lat, lng and weight (may be empty);
+            points with non-finite values are left out
+        extra: Additional top-level fields (e.g. aggregation parameters)
+
+    Returns:
+        UTF-8 encoded JSON document
+    """
+    columns = _finite_points(columns)
+    weights = columns['weight']
+    count = len(weights)
+
+    if count:
+        min_weight = float(np.min(weights))
+        max_weight = float(np.max(weights))
+    else:
+        min_weight = max_weight = 0.0
+
+    points = ','.join([
+        _POINT_TEMPLATE % row
+        for row in zip(
+            columns['gx'].tolist(),
+            columns['gy'].tolist(),
+            columns['lat'].tolist(),
+            columns['lng'].tolist(),
+            weights.tolist()
+        )
+    ])
+
+    header = json.dumps({
+        'month': month,
+        'hour': hour,
+        'metric': metric,
+        'count': count,
+        'min_weight': min_weight,
+        'max_weight': max_weight,
+        **(extra or {}),
+    }, ensure_ascii=False)
+
+    return (header[:-1] + ',"data":[' + points + ']}').encode('utf-8')
+
+
+def render_heatmap_binary(
+    month: int,
+    hour: int,
+    metric: str,
+    columns: Dict[str, np.ndarray],
+    extra: Optional[Dict] = None
+) -> bytes:
+    """
+    Render heatmap data in the compact binary format described above.
+
+    Args:
+        month: Month identifier (YYYYMM)
+        hour: Hour of day (0-23)
+        metric: Metric the weights were taken from (not encoded; the client
+            already knows what it asked for)
+        columns: Arrays keyed by gx, gy, lat, lng and weight (may be empty);
+            points with non-finite values are left out, as in the JSON body
+        extra: Only min_weight / max_weight are encoded (overriding the range
+            of the columns, e.g. with the range of the whole period for a
+            tile); the header has no room for other fields
+
+    Returns:
+        Encoded binary payload
+    """
+    columns = _finite_points(columns)
+    weights = columns['weight']
+    count = len(weights)
+
+    if count:
+        min_weight = float(np.min(weights))
+        max_weight = float(np.max(weights))
+    else:
+        min_weight = max_weight = 0.0
+    if extra:
+        min_weight = float(extra.get('min_weight', min_weight))
+        max_weight = float(extra.get('max_weight', max_weight))
+
+    header = _BINARY_HEADER.pack(
+        HEATMAP_BINARY_MAGIC, HEATMAP_BINARY_VERSION, hour, 0,
+        count, month, min_weight, max_weight
+    )
+
+    return b''.join([
+        header,
+        columns['lat'].astype('<f4').tobytes(),
+        columns['lng'].astype('<f4').tobytes(),
+        weights.astype('<f4').tobytes(),
+        columns['gx'].astype('<i2').tobytes(),
+        columns['gy'].astype('<i2').tobytes(),
+    ])
+
+
+def frame_ndjson(payload: bytes) -> bytes:
+    """Frame a JSON payload as one NDJSON line."""
+    return payload + b'\n'
+
+
+def frame_binary(payload: bytes) -> bytes:
+    """Frame a binary payload with its uint32 little-endian length prefix."""
+    return _FRAME_LENGTH.pack(len(payload)) + payload
@@ -0,0 +1,198 @@
+"""
+Snapshot Service
+Persists the preprocessed DataCache as a binary columnar snapshot.
+
+A snapshot is a directory holding one .npy file per column plus a
+manifest.json describing the source CSV it was built from. Columns are
+loaded with memory mapping, so a valid snapshot makes startup cost
+proportional to the pages actually touched instead of re-parsing the CSV.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the snapshot layout or the preprocessing that feeds it changes
+SNAPSHOT_VERSION = 9
+
+MANIFEST_FILE = "manifest.json"
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def compute_file_hash(path: str) -> str:
+    """
+    Compute the SHA-256 content hash of a file.
+
+    Args:
+        path: Path to the file to hash
+
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path_for(csv_path: str, snapshot_dir: Path, source_hash: str) -> Path:
+    """
+    Get the snapshot directory used for a given CSV file and content hash.
+
+    Each CSV version gets its own directory, so writing the snapshot for new
+    data never replaces files a running cache still has memory-mapped.
+    """
+    return Path(snapshot_dir) / f"{Path(csv_path).stem}.{source_hash[:16]}.snapshot"
+
+
+def prune_snapshots(csv_path: str, snapshot_dir: Path, keep: Path):
+    """
+    Remove snapshots of other versions of a CSV file (best effort).
+
+    Snapshots still memory-mapped by a live cache may not be removable on
+    some platforms; those are skipped and pruned on a later call.
+
+    Args:
+        csv_path: CSV file the snapshots were built from
+        snapshot_dir: Directory holding the snapshots
+        keep: Snapshot directory to keep
+    """
+    for path in Path(snapshot_dir).glob(f"{Path(csv_path).stem}.*snapshot"):
+        if path.is_dir() and path != Path(keep):
+            try:
+                shutil.rmtree(path)
+                logger.info(f"Removed old snapshot {path}")
+            except OSError as e:
+                logger.debug(f"Could not remove old snapshot {path}: {e}")
+    for path in Path(snapshot_dir).glob(f"{Path(csv_path).stem}.*snapshot.lock"):
+        if path != _lock_path(keep):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def _lock_path(path: Path) -> Path:
+    return Path(path).with_name(Path(path).name + ".lock")
+
+
+@contextmanager
+def snapshot_build_lock(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive inter-process lock for building a snapshot.
+
+    Processes that start together (e.g. uvicorn workers) would otherwise all
+    parse the CSV and write the same snapshot. Callers re-check for the
+    snapshot once they hold the lock. Uses flock where available; elsewhere
+    this is a no-op and concurrent builders fall back to last-writer-wins.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    lock_path = _lock_path(path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_snapshot(
+    path: Path,
+    source_hash: str
+) -> Optional[Tuple[Dict[str, np.ndarray], Dict]]:
+    """
+    Load a snapshot if it exists and matches the source content hash.
+
+    Args:
+        path: Snapshot directory
+        source_hash: Content hash of the CSV the caller is about to load
+
+    Returns:
+        Tuple of (columns, metadata), or None if the snapshot is missing,
+        stale or unreadable. Columns are read-only memory-mapped arrays.
+    """
+    manifest_file = Path(path) / MANIFEST_FILE
+    if not manifest_file.exists():
+        return None
+
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            logger.info("Snapshot version mismatch, ignoring snapshot")
+            return None
+        if manifest.get("source_hash") != source_hash:
+            logger.info("Snapshot is stale (source CSV changed), ignoring snapshot")
+            return None
+
+        columns = {
+            name: np.load(Path(path) / f"{name}.npy", mmap_mode="r")
+            for name in manifest["columns"]
+        }
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Failed to read snapshot at {path}: {e}")
+        return None
+
+    return columns, manifest["metadata"]
+
+
+def save_snapshot(
+    path: Path,
+    columns: Dict[str, np.ndarray],
+    metadata: Dict,
+    source_hash: str
+):
+    """
+    Write a snapshot, replacing any previous one at the same location.
+
+    The snapshot is written to a temporary sibling directory first and then
+    moved into place, so readers never observe a partially written snapshot.
+
+    Args:
+        path: Snapshot directory
+        columns: Column name to NumPy array mapping
+        metadata: JSON-serializable metadata stored alongside the columns
+        source_hash: Content hash of the CSV the columns were built from
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + f".tmp-{os.getpid()}")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+
+    try:
+        for name, array in columns.items():
+            np.save(tmp_path / f"{name}.npy", np.ascontiguousarray(array))
+
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "source_hash": source_hash,
+            "columns": list(columns.keys()),
+            "metadata": metadata,
+        }
+        with open(tmp_path / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
@@ -0,0 +1,151 @@
+"""
+Spatial Index Service
+Z-order (Morton) keys and box decomposition for viewport queries.
+
+Cells are kept in Morton order: the key interleaves the bits of gx and gy,
+so cells that are close on the grid are close in the key order. A grid box
+then decomposes into a short list of contiguous key ranges, and each range
+is found by binary search in any Morton-sorted cell array. A viewport query
+touches the cells in those ranges only, so its cost grows with the number
+of cells returned rather than with the size of the period.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .coordinate_converter import latlon_to_gxgy
+
+# Inclusive grid box: (gx_min, gy_min, gx_max, gy_max)
+GridBox = Tuple[int, int, int, int]
+
+# Grid coordinates are 16-bit, so keys cover a 2^16 x 2^16 grid
+GRID_BITS = 16
+GRID_SIZE = 1 << GRID_BITS
+
+# Boxes are covered by aligned blocks of at least 1/BOX_SUBDIVISIONS of
+# their longest side; keeps the range count small (boundary blocks may
+# include a few cells outside the box, which callers filter)
+BOX_SUBDIVISIONS = 16
+
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """Insert a zero bit after each of the low 16 bits."""
+    v = np.asarray(v, dtype=np.int64) & 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+def morton_keys(gx: np.ndarray, gy: np.ndarray) -> np.ndarray:
+    """
+    Get the Z-order key of grid cells.
+
+    gx supplies the even bits and gy the odd bits, so the four quadrants of
+    a node follow each other in (gx, gy) order (0,0), (1,0), (0,1), (1,1).
+
+    Returns:
+        int64 keys
+    """
+    return _spread_bits(gx) | (_spread_bits(gy) << 1)
+
+
+def box_key_ranges(box: GridBox) -> np.ndarray:
+    """
+    Decompose a grid box into contiguous Morton key ranges.
+
+    The box is covered by aligned power-of-two blocks, each of which is one
+    contiguous key range; ranges of blocks that follow each other in key
+    order are merged, so fully covered quadtree nodes become single ranges.
+
+    Args:
+        box: Inclusive grid box
+
+    Returns:
+        Array of shape [n, 2] with inclusive (first, last) keys, sorted and
+        non-overlapping; together they cover every cell of the box
+    """
+    gx0, gy0 = max(int(box[0]), 0), max(int(box[1]), 0)
+    gx1, gy1 = min(int(box[2]), GRID_SIZE - 1), min(int(box[3]), GRID_SIZE - 1)
+    if gx1 < gx0 or gy1 < gy0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    # Largest power of two not above 1/BOX_SUBDIVISIONS of the longest side
+    longest = max(gx1 - gx0, gy1 - gy0) + 1
+    size = 1 << max(0, (longest // BOX_SUBDIVISIONS).bit_length() - 1)
+    bx, by = np.meshgrid(
+        np.arange(gx0 // size, gx1 // size + 1) * size,
+        np.arange(gy0 // size, gy1 // size + 1) * size
+    )
+    firsts = np.sort(morton_keys(bx.ravel(), by.ravel()))
+    lasts = firsts + size * size - 1
+
+    breaks = np.flatnonzero(firsts[1:] != lasts[:-1] + 1) + 1
+    return np.stack([
+        firsts[np.concatenate([[0], breaks])],
+        lasts[np.concatenate([breaks - 1, [len(lasts) - 1]])],
+    ], axis=1)
+
+
+def cells_in_box(keys: np.ndarray, gx: np.ndarray, gy: np.ndarray, box: GridBox) -> np.ndarray:
+    """
+    Find the cells of a Morton-sorted cell array that lie in a grid box.
+
+    Args:
+        keys: Morton keys of the cells, sorted ascending
+        gx: Grid X coordinate of each cell
+        gy: Grid Y coordinate of each cell
+        box: Inclusive grid box
+
+    Returns:
+        Sorted int64 indices into the cell arrays
+    """
+    ranges = box_key_ranges(box)
+    starts = np.searchsorted(keys, ranges[:, 0], side='left')
+    stops = np.searchsorted(keys, ranges[:, 1], side='right')
+    candidates = expand_ranges(starts, stops)
+
+    cx, cy = gx[candidates], gy[candidates]
+    inside = (cx >= box[0]) & (cx <= box[2]) & (cy >= box[1]) & (cy <= box[3])
+    return candidates[inside]
+
+
+def expand_ranges(starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """Concatenate the index ranges [start, stop) into one int64 array."""
+    lengths = np.maximum(np.asarray(stops, dtype=np.int64) - starts, 0)
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(total, dtype=np.int64) - np.repeat(offsets - starts, lengths)
+
+
+def grid_box_from_bbox(
+    min_lng: float,
+    min_lat: float,
+    max_lng: float,
+    max_lat: float,
+    margin: int = 1
+) -> Optional[GridBox]:
+    """
+    Get the grid box covering a WGS84 bounding box.
+
+    Grid rows and columns are not exactly aligned with meridians and
+    parallels, so the corners and edge midpoints are projected and the
+    result is widened by a margin of cells.
+
+    Returns:
+        Inclusive grid box, or None if the bounding box is empty
+    """
+    if max_lng < min_lng or max_lat < min_lat:
+        return None
+    mid_lng, mid_lat = (min_lng + max_lng) / 2, (min_lat + max_lat) / 2
+    lngs = np.array([min_lng, mid_lng, max_lng, min_lng, max_lng, min_lng, mid_lng, max_lng])
+    lats = np.array([min_lat, min_lat, min_lat, mid_lat, mid_lat, max_lat, max_lat, max_lat])
+    gx, gy = latlon_to_gxgy(lats, lngs)
+    return (
+        int(gx.min()) - margin, int(gy.min()) - margin,
+        int(gx.max()) + margin, int(gy.max()) + margin,
+    )
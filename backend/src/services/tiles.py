@@ -0,0 +1,99 @@
+"""
+Tile Service
+Web Mercator (XYZ) tile geometry for tiled heatmap layers.
+
+A tile covers a fixed lng/lat rectangle, so serving it is a viewport query
+on the spatial index (see spatial.py) followed by an exact clip to the tile
+bounds. Points on a shared edge belong to exactly one tile (west and south
+edges are inclusive), so a map that merges neighbouring tiles never counts
+a point twice.
+"""
+
+import math
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .spatial import GridBox, grid_box_from_bbox
+
+# Deepest zoom served (tiles are ~10 m wide at zoom 22)
+MAX_TILE_ZOOM = 22
+
+# Tile width and height in pixels
+TILE_SIZE = 256
+
+# West, south, east, north in degrees
+TileBounds = Tuple[float, float, float, float]
+
+
+def validate_tile(z: int, x: int, y: int):
+    """
+    Check that tile coordinates exist in the XYZ scheme.
+
+    Raises:
+        ValueError: If z is outside 0..MAX_TILE_ZOOM or x/y outside the
+            2^z x 2^z tile grid
+    """
+    if not 0 <= z <= MAX_TILE_ZOOM:
+        raise ValueError(f"Invalid tile zoom: {z}. Available: 0-{MAX_TILE_ZOOM}")
+    n = 1 << z
+    if not (0 <= x < n and 0 <= y < n):
+        raise ValueError(f"Invalid tile: {z}/{x}/{y}. x and y must be in 0-{n - 1}")
+
+
+def tile_bounds(z: int, x: int, y: int, buffer: float = 0.0) -> TileBounds:
+    """
+    Get the WGS84 bounds of an XYZ tile.
+
+    Args:
+        buffer: Widen the tile by this many pixels on every side
+
+    Returns:
+        (west, south, east, north) in degrees
+    """
+    n = 1 << z
+    pad = buffer / TILE_SIZE
+
+    def lat(row: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return (
+        (x - pad) / n * 360.0 - 180.0, lat(y + 1 + pad),
+        (x + 1 + pad) / n * 360.0 - 180.0, lat(y - pad),
+    )
+
+
+def tile_pixels(lat: np.ndarray, lng: np.ndarray, z: int, x: int, y: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Project WGS84 points to pixel coordinates of a tile.
+
+    Returns:
+        (column, row) float arrays; (0, 0) is the tile's north-west corner
+    """
+    scale = TILE_SIZE * (1 << z)
+    px = (np.asarray(lng, dtype=np.float64) + 180.0) / 360.0 * scale - x * TILE_SIZE
+    sin = np.sin(np.radians(np.asarray(lat, dtype=np.float64)))
+    py = (0.5 - np.log((1 + sin) / (1 - sin)) / (4 * math.pi)) * scale - y * TILE_SIZE
+    return px, py
+
+
+def tile_grid_box(bounds: TileBounds) -> GridBox:
+    """Get the grid box covering a tile (with a margin; clip with clip_to_tile)."""
+    return grid_box_from_bbox(*bounds)
+
+
+def clip_to_tile(columns: Dict[str, np.ndarray], bounds: TileBounds) -> Dict[str, np.ndarray]:
+    """
+    Keep the points whose cell center lies inside a tile.
+
+    Args:
+        columns: Arrays keyed by gx, gy, lat, lng and weight
+        bounds: Tile bounds; west and south edges are inclusive
+
+    Returns:
+        Clipped arrays (same keys)
+    """
+    west, south, east, north = bounds
+    lat, lng = columns['lat'], columns['lng']
+    inside = (lng >= west) & (lng < east) & (lat >= south) & (lat < north)
+    return {name: values[inside] for name, values in columns.items()}
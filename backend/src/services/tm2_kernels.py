@@ -0,0 +1,24 @@
+"""
+Compiled TM2 Kernels
+Numba-compiled versions of the closed-form TM2 inverse.
+
+Imported lazily by coordinate_converter only when a batch is large enough to
+benefit, so regular startups never pay for importing numba/llvmlite or for
+JIT compilation. Compiled kernels are cached on disk (cache=True); point
+NUMBA_CACHE_DIR at a persistent directory before importing this module to
+keep the cache across launches of a packaged build.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+from .coordinate_converter import _tm2_to_latlon
+
+tm2_to_latlon_scalar = njit(cache=True)(_tm2_to_latlon)
+
+
+@njit(parallel=True, cache=True)
+def tm2_to_latlon_parallel(x: np.ndarray, y: np.ndarray, lat: np.ndarray, lng: np.ndarray):
+    """Convert x/y into lat/lng in place, in parallel across cores."""
+    for i in prange(x.shape[0]):
+        lat[i], lng[i] = tm2_to_latlon_scalar(x[i], y[i])
@@ -27,7 +27,22 @@ def get_base_path() -> Path:
 
 # Paths
 BASE_PATH = get_base_path()
-DATA_PATH = BASE_PATH / "data" / "data.csv"
+# A CSV file, or a directory of per-month CSV partitions (see partitions.py)
+DATA_PATH = Path(os.getenv('HEATMAP_DATA_PATH', BASE_PATH / "data" / "data.csv"))
+
+
+def get_user_cache_path() -> Path:
+    """
+    Get a writable per-user cache directory.
+
+    Used in PyInstaller packaged mode, where sys._MEIPASS is a temporary
+    extraction directory that is discarded on exit.
+    """
+    if os.name == 'nt':
+        root = Path(os.getenv('LOCALAPPDATA', Path.home() / 'AppData' / 'Local'))
+    else:
+        root = Path(os.getenv('XDG_CACHE_HOME', Path.home() / '.cache'))
+    return root / 'StoreHeatmap'
 
 
 # TWD97 TM2 Coordinate System Parameters
@@ -51,9 +66,113 @@ API_CONFIG = {
     'host': os.getenv('API_HOST', '127.0.0.1'),
     'port': int(os.getenv('API_PORT', '8000')),
     'reload': os.getenv('API_RELOAD', 'false').lower() == 'true',
+    # uvicorn worker processes; they share one memory-mapped copy of the
+    # dataset snapshot (see main.get_worker_count)
+    'workers': int(os.getenv('API_WORKERS', '1')),
     'log_level': os.getenv('LOG_LEVEL', 'info'),
 }
 
+# Loading Configuration
+LOADING_CONFIG = {
+    # Load data in a background thread so the server accepts connections
+    # (and answers /health) immediately; data routes return 503 until ready
+    'background': os.getenv('HEATMAP_BACKGROUND_LOAD', 'true').lower() == 'true',
+    # Retry-After seconds sent with 503 responses while loading
+    'retry_after': int(os.getenv('HEATMAP_RETRY_AFTER', '2')),
+}
+
+# Reload Configuration (replace the data cache without restarting)
+RELOAD_CONFIG = {
+    # Poll data.csv and reload when it changes
+    'watch': os.getenv('HEATMAP_WATCH_DATA', 'false').lower() == 'true',
+    'watch_interval': float(os.getenv('HEATMAP_WATCH_INTERVAL', '5')),
+    # Enable POST /api/admin/reload for requests from the local machine
+    'admin_reload': os.getenv('HEATMAP_ADMIN_RELOAD', 'false').lower() == 'true',
+    # Token for POST /api/admin/reload (X-Admin-Token header); setting it also
+    # enables the endpoint, for any client that presents it
+    'admin_token': os.getenv('HEATMAP_ADMIN_TOKEN'),
+}
+
+# Snapshot Configuration (binary columnar cache of the preprocessed CSV)
+SNAPSHOT_CONFIG = {
+    'enabled': os.getenv('HEATMAP_SNAPSHOT', 'true').lower() == 'true',
+    'dir': os.getenv('HEATMAP_SNAPSHOT_DIR'),
+}
+
+# Storage Configuration
+STORAGE_CONFIG = {
+    # Dense [cells, months, day_types, hours, metrics] tensor: 'auto' builds it
+    # when it fits in dense_max_bytes, 'on' always builds it, 'off' never does
+    'dense_tensor': os.getenv('HEATMAP_DENSE_TENSOR', 'auto').lower(),
+    'dense_max_bytes': int(os.getenv('HEATMAP_DENSE_MAX_MB', '512')) * 1024 * 1024,
+}
+
+# Resolution Pyramid Configuration (coarser grids for zoomed-out views)
+PYRAMID_CONFIG = {
+    # Cell sizes in meters of the precomputed levels; each must be the 50 m
+    # grid cell times a power of two (empty disables the pyramid)
+    'levels': [int(v) for v in os.getenv('HEATMAP_PYRAMID_LEVELS', '100,200,400,800').split(',') if v.strip()],
+    # A zoom picks the coarsest level whose cells span at most this many pixels
+    'cell_pixels': float(os.getenv('HEATMAP_PYRAMID_CELL_PIXELS', '4')),
+}
+
+# Partitioned Dataset Configuration (DATA_PATH is a directory of months)
+PARTITION_CONFIG = {
+    # Month partitions are loaded on first access and the least recently
+    # used ones evicted once their memory exceeds this budget
+    'memory_budget_bytes': int(os.getenv('HEATMAP_PARTITION_BUDGET_MB', '1024')) * 1024 * 1024,
+}
+
+# Ingestion Configuration (streaming CSV -> partitioned dataset, see ingest.py)
+INGEST_CONFIG = {
+    # Rows parsed per chunk; bounds peak memory regardless of input size
+    'chunk_rows': int(os.getenv('HEATMAP_INGEST_CHUNK_ROWS', '500000')),
+}
+
+# Coordinate Conversion Configuration
+COORDINATE_CONFIG = {
+    # Batch engine: 'numpy' (no compilation), 'numba' (compiled parallel kernel)
+    # or 'auto' (numba only for batches of at least numba_min_batch cells, where
+    # the one-off import and JIT cost pays for itself)
+    'engine': os.getenv('HEATMAP_COORD_ENGINE', 'auto').lower(),
+    'numba_min_batch': int(os.getenv('HEATMAP_NUMBA_MIN_BATCH', '1000000')),
+}
+
+# Query Execution Configuration
+QUERY_CONFIG = {
+    # Threads running CPU-bound query work off the event loop (see api/query_pool.py);
+    # 0 runs it inline on the event loop (the unpooled baseline for load_test.py)
+    'workers': int(os.getenv('HEATMAP_QUERY_WORKERS', str(min(4, os.cpu_count() or 1)))),
+}
+
+# Response Cache Configuration
+CACHE_CONFIG = {
+    # Pre-rendered heatmap payloads kept per DataCache (one per period/metric)
+    'payload_cache_size': int(os.getenv('HEATMAP_PAYLOAD_CACHE_SIZE', '1024')),
+    # Rendered map tiles kept per DataCache (see /api/tiles)
+    'tile_cache_size': int(os.getenv('HEATMAP_TILE_CACHE_SIZE', '4096')),
+}
+
+# Raster Tile Configuration (server-rendered heatmap PNGs, see /api/tiles/{z}/{x}/{y}.png)
+RASTER_CONFIG = {
+    # Defaults match the heatmap layer of the dashboard map (pixels)
+    'radius': int(os.getenv('HEATMAP_RASTER_RADIUS', '30')),
+    'blur': int(os.getenv('HEATMAP_RASTER_BLUR', '45')),
+    # Rendered tiles kept in memory
+    'cache_size': int(os.getenv('HEATMAP_RASTER_CACHE_SIZE', '2048')),
+    # Also keep rendered tiles on disk (shared by workers, kept across restarts)
+    'disk_cache': os.getenv('HEATMAP_RASTER_DISK_CACHE', 'true').lower() == 'true',
+    'dir': os.getenv('HEATMAP_RASTER_CACHE_DIR'),
+}
+
+# HTTP Caching Configuration (data only changes when data.csv changes)
+HTTP_CACHE_CONFIG = {
+    'max_age': int(os.getenv('HEATMAP_HTTP_MAX_AGE', '86400')),
+    # Max age while the data can change at runtime (file watching or a reload
+    # token is configured); 0 sends no-cache so clients revalidate by ETag
+    'reload_max_age': int(os.getenv('HEATMAP_HTTP_RELOAD_MAX_AGE', '0')),
+}
+
 # CORS Configuration
 CORS_CONFIG = {
     'allow_origins': [
@@ -65,6 +184,8 @@ CORS_CONFIG = {
     'allow_credentials': True,
     'allow_methods': ["*"],
     'allow_headers': ["*"],
+    # Response headers readable by cross-origin clients
+    'expose_headers': ["X-Heatmap-Resolution"],
 }
 
 # Metric labels (Chinese)
@@ -96,17 +217,72 @@ GENDER_LABELS = {
 }
 
 
+def get_numba_cache_dir() -> Optional[Path]:
+    """
+    Get the on-disk cache directory for compiled Numba kernels.
+
+    Returns the user cache directory in PyInstaller packaged mode, where the
+    default location next to the sources is a temporary extraction directory
+    that is discarded on exit; None otherwise (use Numba's default).
+    """
+    if os.getenv('NUMBA_CACHE_DIR'):
+        return Path(os.environ['NUMBA_CACHE_DIR'])
+    if getattr(sys, 'frozen', False):
+        return get_user_cache_path() / 'numba'
+    return None
+
+
+def runtime_reload_enabled() -> bool:
+    """Check whether the data can be replaced while serving (file watching or the admin reload)."""
+    return bool(RELOAD_CONFIG['watch'] or RELOAD_CONFIG['admin_reload'] or RELOAD_CONFIG['admin_token'])
+
+
 def get_data_path() -> Path:
     """
-    Get path to data.csv file.
+    Get path to the dataset (data.csv, or a partitioned dataset directory).
 
     Returns:
-        Path object pointing to data.csv
+        Path object pointing to the data file or directory
 
     Raises:
-        FileNotFoundError: If data.csv doesn't exist
+        FileNotFoundError: If the dataset doesn't exist
     """
     if not DATA_PATH.exists():
         raise FileNotFoundError(f"Data file not found: {DATA_PATH}")
     return DATA_PATH
 
+
+def get_snapshot_dir() -> Optional[Path]:
+    """
+    Get the directory where DataCache snapshots are stored.
+
+    Returns:
+        Path to the snapshot directory, or None if snapshots are disabled
+    """
+    if not SNAPSHOT_CONFIG['enabled']:
+        return None
+    if SNAPSHOT_CONFIG['dir']:
+        return Path(SNAPSHOT_CONFIG['dir'])
+    if getattr(sys, 'frozen', False):
+        return get_user_cache_path() / 'snapshots'
+    if DATA_PATH.is_dir():
+        return DATA_PATH / '.snapshot'
+    return DATA_PATH.parent / '.snapshot'
+
+
+def get_raster_cache_dir() -> Optional[Path]:
+    """
+    Get the directory where rendered raster tiles are stored.
+
+    Returns:
+        Path to the tile cache directory, or None if the disk cache is disabled
+    """
+    if not RASTER_CONFIG['disk_cache']:
+        return None
+    if RASTER_CONFIG['dir']:
+        return Path(RASTER_CONFIG['dir'])
+    if getattr(sys, 'frozen', False):
+        return get_user_cache_path() / 'tiles'
+    if DATA_PATH.is_dir():
+        return DATA_PATH / '.tiles'
+    return DATA_PATH.parent / '.tiles'
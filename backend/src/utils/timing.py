@@ -0,0 +1,50 @@
+"""
+Phase Timing
+Wall-clock timing of named startup phases, for logging.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+class PhaseTimer:
+    """
+    Accumulates elapsed wall-clock time per named phase, in first-use order.
+
+    Example:
+        >>> timer = PhaseTimer()
+        >>> with timer.phase("parse"):
+        ...     parse()
+        >>> logger.info(f"Startup phases: {timer.summary()}")
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        # Phase currently running (readable from other threads for progress)
+        self.current: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block and add it to the named phase."""
+        start = time.perf_counter()
+        self.current = name
+        try:
+            yield
+        finally:
+            self.current = None
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def add(self, name: str, seconds: float):
+        """Record a phase measured elsewhere."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @property
+    def total(self) -> float:
+        """Sum of all phases in seconds."""
+        return sum(self.phases.values())
+
+    def summary(self) -> str:
+        """Format the phases as 'name 12ms, other 3ms (total 15ms)'."""
+        parts = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        return f"{parts} (total {self.total * 1000:.0f}ms)"
@@ -0,0 +1,88 @@
+"""
+Shared fixtures: small synthetic datasets in the data.csv layout.
+"""
+
+import itertools
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services import data_loader
+from src.services.data_loader import DEMOGRAPHIC_COLUMNS, METRICS
+
+DAY_TYPES = ['平日', '假日']
+
+
+def make_frame(months: List[int], n_cells: int = 60, seed: int = 0, hours=range(24)) -> pd.DataFrame:
+    """
+    Build random rows for a set of months.
+
+    Cells are drawn from a 48 x 48 block of the Taipei grid; each
+    (month, day_type, hour) period holds a random subset of them.
+    """
+    rng = np.random.default_rng(seed)
+    gx0, gy0 = 7000, 6800
+    flat = rng.choice(48 * 48, n_cells, replace=False)
+    cells_gx, cells_gy = gx0 + flat % 48, gy0 + flat // 48
+
+    rows = []
+    for month, day_type, hour in itertools.product(months, DAY_TYPES, hours):
+        present = rng.random(n_cells) < 0.6
+        for gx, gy in zip(cells_gx[present], cells_gy[present]):
+            rows.append((month, gx, gy, hour, day_type))
+    df = pd.DataFrame(rows, columns=['month', 'gx', 'gy', 'hour', 'day_type'])
+
+    total = rng.uniform(1, 50, len(df)).round(2)
+    short = (total * rng.uniform(0.1, 0.4, len(df))).round(2)
+    mid = (total * rng.uniform(0.1, 0.4, len(df))).round(2)
+    df['avg_total_users'] = total
+    df['avg_users_under_10min'] = short
+    df['avg_users_10_30min'] = mid
+    df['avg_users_over_30min'] = (total - short - mid).round(2)
+    male = rng.uniform(30, 70, len(df)).round(2)
+    df['sex_1'], df['sex_2'] = male, (100 - male).round(2)
+    for col in DEMOGRAPHIC_COLUMNS[2:]:
+        df[col] = rng.uniform(0, 20, len(df)).round(2)
+    assert set(METRICS) <= set(df.columns)
+    # Shuffle so loaders cannot rely on the input order
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+@pytest.fixture
+def dataset_frame() -> pd.DataFrame:
+    return make_frame([202412, 202502, 202505])
+
+
+@pytest.fixture
+def csv_path(tmp_path: Path, dataset_frame: pd.DataFrame) -> Path:
+    path = tmp_path / 'data.csv'
+    dataset_frame.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def app(csv_path: Path, monkeypatch):
+    """
+    The API app serving csv_path.
+
+    The cache is initialized directly (the startup event, which loads the
+    configured data path, is not run) and the global state is restored after
+    the test.
+    """
+    from src.main import app
+
+    for name in ('_data_cache', '_source', '_load_timer', '_reload_timer'):
+        monkeypatch.setattr(data_loader, name, getattr(data_loader, name))
+    monkeypatch.setattr(data_loader, '_load_state', dict(data_loader._load_state))
+    monkeypatch.setattr(data_loader, '_reload_state', dict(data_loader._reload_state))
+    data_loader.initialize_cache(str(csv_path), None)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+    return TestClient(app)
@@ -0,0 +1,61 @@
+"""
+Grid cell to WGS84 conversion against the bisection reference.
+"""
+
+import numpy as np
+import pytest
+
+from src.services import coordinate_converter
+from src.services.coordinate_converter import (
+    _grid_to_tm2,
+    _tm2_to_latlon_reference,
+    batch_gxgy_to_latlon,
+    gxgy_to_latlon,
+    latlon_to_gxgy,
+)
+
+# Degrees; the reference stops its bisection within 1 mm of the meridian arc
+TOLERANCE = 1e-7
+
+
+@pytest.fixture(scope='module')
+def grid():
+    """Cells spanning Taiwan and the outlying islands."""
+    gx, gy = np.meshgrid(np.arange(1000, 8001, 350), np.arange(3000, 8001, 250), indexing='ij')
+    return gx.ravel(), gy.ravel()
+
+
+@pytest.fixture(scope='module')
+def reference(grid):
+    tm2_x, tm2_y = _grid_to_tm2(*grid)
+    points = [_tm2_to_latlon_reference(x, y) for x, y in zip(tm2_x, tm2_y)]
+    return np.array([p[0] for p in points]), np.array([p[1] for p in points])
+
+
+@pytest.mark.parametrize('engine', ['numpy', 'numba'])
+def test_batch_matches_reference(engine, grid, reference):
+    if engine == 'numba':
+        pytest.importorskip('numba')
+        assert coordinate_converter._numba_kernel() is not None
+    lat, lng = batch_gxgy_to_latlon(*grid, engine=engine)
+    assert lat.dtype == lng.dtype == np.float64
+    np.testing.assert_allclose(lat, reference[0], rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(lng, reference[1], rtol=0, atol=TOLERANCE)
+
+
+def test_scalar_matches_batch(grid):
+    lat, lng = batch_gxgy_to_latlon(*grid, engine='numpy')
+    for i in range(0, len(lat), 17):
+        assert gxgy_to_latlon(int(grid[0][i]), int(grid[1][i])) == pytest.approx((lat[i], lng[i]), abs=1e-12)
+
+
+def test_latlon_to_gxgy_round_trip(grid):
+    lat, lng = batch_gxgy_to_latlon(*grid, engine='numpy')
+    gx, gy = latlon_to_gxgy(lat, lng)
+    np.testing.assert_array_equal(gx, grid[0])
+    np.testing.assert_array_equal(gy, grid[1])
+
+
+def test_unknown_engine_rejected(grid):
+    with pytest.raises(ValueError):
+        batch_gxgy_to_latlon(*grid, engine='gpu')
@@ -0,0 +1,80 @@
+"""
+Cache-Control and ETag revalidation of the data endpoints.
+"""
+
+import time
+
+import pytest
+
+from src.services.serialization import HEATMAP_BINARY_MEDIA_TYPE
+from src.utils.config import RELOAD_CONFIG
+
+from conftest import make_frame
+
+HEATMAP = '/api/heatmap?month=202412&hour=8'
+BINARY = {'Accept': HEATMAP_BINARY_MEDIA_TYPE}
+
+
+def test_static_data_is_cached_for_max_age(client):
+    # The default configuration has no way to replace the data while serving
+    assert client.post('/api/admin/reload').status_code == 403
+
+    for headers in ({}, BINARY):
+        response = client.get(HEATMAP, headers=headers)
+        assert response.status_code == 200
+        assert response.headers['cache-control'] == 'public, max-age=86400'
+
+        revalidated = client.get(HEATMAP, headers={**headers, 'If-None-Match': response.headers['etag']})
+        assert revalidated.status_code == 304
+
+    json_etag = client.get(HEATMAP).headers['etag']
+    assert client.get(HEATMAP, headers=BINARY).headers['etag'] != json_etag
+
+
+def test_metadata_is_always_revalidated(client):
+    response = client.get('/api/metadata')
+    assert response.headers['cache-control'] == 'no-cache'
+    revalidated = client.get('/api/metadata', headers={'If-None-Match': response.headers['etag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['cache-control'] == 'no-cache'
+
+
+@pytest.mark.parametrize('setting', [('watch', True), ('admin_reload', True), ('admin_token', 'secret')])
+def test_reloadable_data_is_revalidated(client, monkeypatch, setting):
+    monkeypatch.setitem(RELOAD_CONFIG, *setting)
+    for headers in ({}, BINARY):
+        response = client.get(HEATMAP, headers=headers)
+        assert response.headers['cache-control'] == 'no-cache'
+        revalidated = client.get(HEATMAP, headers={**headers, 'If-None-Match': response.headers['etag']})
+        assert revalidated.status_code == 304
+
+
+def _wait_for_reload(client):
+    for _ in range(200):
+        reload = client.get('/ready').json()['reload']
+        if reload['status'] != 'loading':
+            return reload
+        time.sleep(0.05)
+    raise AssertionError('Reload did not finish')
+
+
+def test_request_after_reload_gets_new_version(client, csv_path, monkeypatch):
+    monkeypatch.setitem(RELOAD_CONFIG, 'admin_token', 'secret')
+    before = client.get('/api/metadata')
+    heatmap_before = client.get(HEATMAP)
+    assert heatmap_before.headers['cache-control'] == 'no-cache'
+    assert before.json()['months'] == [202412, 202502, 202505]
+
+    make_frame([202412, 202502, 202505, 202508]).to_csv(csv_path, index=False)
+    assert client.post('/api/admin/reload').status_code == 403
+    assert client.post('/api/admin/reload', headers={'X-Admin-Token': 'secret'}).status_code == 202
+    assert _wait_for_reload(client)['status'] == 'ready'
+
+    after = client.get('/api/metadata', headers={'If-None-Match': before.headers['etag']})
+    assert after.status_code == 200
+    assert after.headers['etag'] != before.headers['etag']
+    assert after.json()['months'] == [202412, 202502, 202505, 202508]
+
+    heatmap_after = client.get(HEATMAP, headers={'If-None-Match': heatmap_before.headers['etag']})
+    assert heatmap_after.status_code == 200
+    assert heatmap_after.headers['etag'] != heatmap_before.headers['etag']
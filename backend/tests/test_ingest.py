@@ -0,0 +1,89 @@
+"""
+Chunked ingestion into a partitioned dataset against a single-shot load.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.data_loader import DataCache
+from src.services.ingest import append_csv, ingest_csv
+from src.services.partitioned_cache import PartitionedDataCache
+from src.services.partitions import read_atlas, read_manifest
+
+PERIODS = [(202412, 0, '平日'), (202502, 13, '假日'), (202505, 23, '平日')]
+
+
+def _sorted_rows(frame):
+    return frame.sort_values(['month', 'day_type', 'hour', 'gx', 'gy']).reset_index(drop=True)
+
+
+def assert_same_dataset(dataset_dir, frame):
+    """Check a dataset directory against the rows it was ingested from."""
+    manifest = read_manifest(str(dataset_dir))
+    assert manifest['months'] == sorted(frame['month'].unique().tolist())
+    assert manifest['n_rows'] == len(frame)
+    assert manifest['unique_locations'] == len(frame[['gx', 'gy']].drop_duplicates())
+
+    atlas = read_atlas(str(dataset_dir))
+    cells = frame[['gx', 'gy']].drop_duplicates().sort_values(['gx', 'gy'])
+    assert sorted(zip(atlas.gx.tolist(), atlas.gy.tolist())) == list(cells.itertuples(index=False, name=None))
+
+    for month in manifest['months']:
+        entry = manifest['partitions'][str(month)]
+        partition = _sorted_rows(pd.read_csv(dataset_dir / entry['file']))
+        expected = _sorted_rows(frame[frame['month'] == month])
+        assert entry['rows'] == len(expected)
+        pd.testing.assert_frame_equal(partition[expected.columns], expected, check_dtype=False)
+
+
+def assert_same_queries(cache, reference):
+    for month, hour, day_type in PERIODS:
+        actual = cache.get_heatmap_columns(month, hour, 'avg_total_users', day_type)
+        expected = reference.get_heatmap_columns(month, hour, 'avg_total_users', day_type)
+        for name in expected:
+            np.testing.assert_array_equal(actual[name], expected[name])
+        demographics = cache.get_demographics(month, hour, 'avg_total_users', day_type)
+        expected = reference.get_demographics(month, hour, 'avg_total_users', day_type)
+        assert demographics['total_users'] == pytest.approx(expected['total_users'])
+        assert demographics['gender'] == pytest.approx(expected['gender'])
+        assert demographics['age'] == pytest.approx(expected['age'])
+
+
+@pytest.mark.parametrize('chunk_rows', [997, 10 ** 7])
+def test_chunked_ingest_matches_single_shot(tmp_path, csv_path, dataset_frame, chunk_rows):
+    manifest = ingest_csv(str(csv_path), str(tmp_path / 'months'), chunk_rows=chunk_rows)
+    assert manifest == read_manifest(str(tmp_path / 'months'))
+    assert_same_dataset(tmp_path / 'months', dataset_frame)
+    assert_same_queries(PartitionedDataCache(str(tmp_path / 'months')), DataCache(str(csv_path), None))
+
+
+def test_ingest_refuses_existing_dataset(tmp_path, csv_path):
+    ingest_csv(str(csv_path), str(tmp_path / 'months'))
+    with pytest.raises(FileExistsError):
+        ingest_csv(str(csv_path), str(tmp_path / 'months'))
+
+
+def test_append_matches_single_shot(tmp_path, csv_path, dataset_frame):
+    first = dataset_frame[dataset_frame['month'] < 202505]
+    first.to_csv(tmp_path / 'first.csv', index=False)
+    dataset_frame[dataset_frame['month'] == 202505].to_csv(tmp_path / 'next.csv', index=False)
+
+    ingest_csv(str(tmp_path / 'first.csv'), str(tmp_path / 'months'), chunk_rows=997)
+    first_partitions = read_manifest(str(tmp_path / 'months'))['partitions']
+    appended = append_csv(str(tmp_path / 'next.csv'), str(tmp_path / 'months'), chunk_rows=997)
+
+    assert appended == ingest_csv(str(csv_path), str(tmp_path / 'single'))
+    for month, entry in first_partitions.items():
+        assert appended['partitions'][month] == entry
+    assert_same_dataset(tmp_path / 'months', dataset_frame)
+    assert_same_queries(PartitionedDataCache(str(tmp_path / 'months')), DataCache(str(csv_path), None))
+
+
+def test_append_refuses_existing_month(tmp_path, csv_path, dataset_frame):
+    ingest_csv(str(csv_path), str(tmp_path / 'months'))
+    dataset_frame[dataset_frame['month'] == 202502].to_csv(tmp_path / 'again.csv', index=False)
+    with pytest.raises(ValueError):
+        append_csv(str(tmp_path / 'again.csv'), str(tmp_path / 'months'))
+    assert read_manifest(str(tmp_path / 'months'))['months'] == [202412, 202502, 202505]
+    assert not list((tmp_path / 'months').glob('*.partial'))
@@ -0,0 +1,94 @@
+"""
+Cell profiles of a partitioned dataset: complete, and without loading partitions.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from src.services import partitions
+from src.services.data_loader import DataCache
+from src.services.ingest import ingest_csv
+from src.services.partitioned_cache import PartitionedDataCache
+from src.services.partitions import PROFILES_DIR
+
+
+@pytest.fixture
+def dataset_dir(tmp_path, csv_path):
+    ingest_csv(str(csv_path), str(tmp_path / 'months'))
+    return tmp_path / 'months'
+
+
+@pytest.fixture
+def scanned_dir(tmp_path, dataset_frame):
+    """Hand-made partitions: no manifest, atlas or profile indexes."""
+    directory = tmp_path / 'scanned'
+    directory.mkdir()
+    for month, rows in dataset_frame.groupby('month'):
+        rows.to_csv(directory / f'{month}.csv', index=False)
+    return directory
+
+
+def _cells(frame):
+    return [(int(gx), int(gy)) for gx, gy in frame[['gx', 'gy']].drop_duplicates().itertuples(index=False)]
+
+
+def assert_complete_profiles(cache, reference, frame):
+    for gx, gy in _cells(frame):
+        profile = cache.get_cell_profile(gx, gy)
+        expected = reference.get_cell_profile(gx, gy)
+        assert profile['months'] == expected['months']
+        assert profile['values'] == expected['values']
+        assert profile['lat'] == pytest.approx(expected['lat'], abs=1e-9)
+        assert profile['lng'] == pytest.approx(expected['lng'], abs=1e-9)
+    assert cache.get_cell_profile(0, 0) is None
+    assert cache.loaded_months == []
+
+
+@pytest.mark.parametrize('snapshots', [False, True])
+def test_profiles_are_complete_without_loading(dataset_dir, csv_path, dataset_frame, tmp_path, snapshots):
+    cache = PartitionedDataCache(str(dataset_dir), tmp_path / 'snapshots' if snapshots else None)
+    assert_complete_profiles(cache, DataCache(str(csv_path), None), dataset_frame)
+
+
+def test_ingest_writes_profile_indexes(dataset_dir, monkeypatch):
+    assert len(list((dataset_dir / PROFILES_DIR).glob('*.profile'))) == 3
+
+    def fail(*args):
+        raise AssertionError('profile index rebuilt')
+
+    monkeypatch.setattr(partitions, 'build_profile_index', fail)
+    PartitionedDataCache(str(dataset_dir))
+
+
+def test_missing_indexes_are_built_at_creation(scanned_dir, csv_path, dataset_frame):
+    cache = PartitionedDataCache(str(scanned_dir))
+    assert cache.cell_atlas is None
+    assert len(list((scanned_dir / PROFILES_DIR).glob('*.profile'))) == 3
+    assert_complete_profiles(cache, DataCache(str(csv_path), None), dataset_frame)
+
+
+def test_unwritable_dataset_keeps_indexes_in_memory(scanned_dir, csv_path, dataset_frame, monkeypatch):
+    def read_only(*args):
+        raise PermissionError('read-only dataset')
+
+    monkeypatch.setattr(partitions, 'write_profile_index', read_only)
+    cache = PartitionedDataCache(str(scanned_dir))
+    assert not (scanned_dir / PROFILES_DIR).exists()
+    assert_complete_profiles(cache, DataCache(str(csv_path), None), dataset_frame)
+
+
+def test_stale_index_is_rebuilt(dataset_dir, dataset_frame):
+    frame = dataset_frame[dataset_frame['month'] == 202502].copy()
+    gx, gy = _cells(frame)[0]
+    frame.loc[(frame['gx'] == gx) & (frame['gy'] == gy), 'avg_total_users'] = 12345.0
+    partition_file = dataset_dir / '202502.csv'
+    frame.to_csv(partition_file, index=False)
+    stat = partition_file.stat()
+    os.utime(partition_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    profile = PartitionedDataCache(str(dataset_dir)).get_cell_profile(gx, gy)
+    month = np.array(profile['values']['avg_total_users'][1], dtype=object)
+    assert {v for v in month.ravel() if v is not None} == {12345.0}
+    assert len(list((dataset_dir / PROFILES_DIR).glob('202502.*.profile'))) == 1
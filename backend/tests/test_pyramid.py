@@ -0,0 +1,73 @@
+"""
+Pyramid levels against a groupby of the base rows by (gx // f, gy // f).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.coordinate_converter import GRID_CELL_SIZE
+from src.services.data_loader import DataCache
+from src.services.pyramid import level_factor
+from src.utils.config import PYRAMID_CONFIG
+
+LEVELS = [100, 200, 400, 800]
+
+
+@pytest.fixture
+def cache(csv_path, monkeypatch):
+    monkeypatch.setitem(PYRAMID_CONFIG, 'levels', LEVELS)
+    return DataCache(str(csv_path), None)
+
+
+def _level_sums(rows, metric, factor):
+    grouped = rows.assign(gx=rows['gx'] // factor, gy=rows['gy'] // factor).groupby(['gx', 'gy'])[metric].sum()
+    return grouped.reset_index()
+
+
+def _columns_frame(columns, metric):
+    frame = pd.DataFrame({'gx': columns['gx'].astype(np.int64), 'gy': columns['gy'].astype(np.int64),
+                          metric: columns['weight']})
+    return frame.sort_values(['gx', 'gy']).reset_index(drop=True)
+
+
+def test_levels_are_built(cache):
+    assert sorted(cache.levels) == LEVELS
+    with pytest.raises(ValueError):
+        level_factor(3 * GRID_CELL_SIZE)
+
+
+@pytest.mark.parametrize('resolution', LEVELS)
+@pytest.mark.parametrize('metric', ['avg_total_users', 'avg_users_10_30min'])
+def test_level_sums_match_groupby(cache, dataset_frame, resolution, metric):
+    factor = level_factor(resolution)
+    for month, hour, day_type in [(202412, 0, '平日'), (202502, 9, '假日'), (202505, 23, '平日')]:
+        rows = dataset_frame[
+            (dataset_frame['month'] == month) & (dataset_frame['hour'] == hour)
+            & (dataset_frame['day_type'] == day_type)
+        ]
+        actual = _columns_frame(cache.get_heatmap_columns(month, hour, metric, day_type, resolution=resolution), metric)
+        expected = _level_sums(rows, metric, factor)
+        np.testing.assert_array_equal(actual[['gx', 'gy']], expected[['gx', 'gy']])
+        np.testing.assert_allclose(actual[metric], expected[metric], rtol=1e-5)
+
+
+@pytest.mark.parametrize('resolution', [200, 800])
+def test_level_range_sums_match_groupby(cache, dataset_frame, resolution):
+    factor = level_factor(resolution)
+    rows = dataset_frame[
+        dataset_frame['month'].isin([202412, 202505]) & dataset_frame['hour'].between(7, 10)
+        & (dataset_frame['day_type'] == '平日')
+    ]
+    columns = cache.get_heatmap_range_columns([202412, 202505], 7, 10, 'avg_total_users', '平日', resolution=resolution)
+    actual = _columns_frame(columns, 'avg_total_users')
+    expected = _level_sums(rows, 'avg_total_users', factor)
+    np.testing.assert_array_equal(actual[['gx', 'gy']], expected[['gx', 'gy']])
+    np.testing.assert_allclose(actual['avg_total_users'], expected['avg_total_users'], rtol=1e-5)
+
+
+def test_level_totals_are_preserved(cache, dataset_frame):
+    base = cache.get_heatmap_columns(202502, 12, 'avg_total_users', '平日')['weight'].sum(dtype=np.float64)
+    for resolution in LEVELS:
+        level = cache.get_heatmap_columns(202502, 12, 'avg_total_users', '平日', resolution=resolution)
+        assert level['weight'].sum(dtype=np.float64) == pytest.approx(base, rel=1e-5)
@@ -0,0 +1,92 @@
+"""
+Cold queries run off the event loop, and identical ones run once.
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from src.services import data_loader
+from src.services.serialization import HEATMAP_BINARY_MEDIA_TYPE
+from src.utils.config import QUERY_CONFIG
+
+HEATMAP = '/api/heatmap?month=202502&hour=9'
+BINARY = {'Accept': HEATMAP_BINARY_MEDIA_TYPE}
+# How long each spied payload build takes
+BUILD_SECONDS = 0.5
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+def slow_builder(app, monkeypatch):
+    """Make payload builds slow and count them."""
+    cache = data_loader.get_cache()
+    build = cache.get_heatmap_payload
+    calls = []
+    lock = threading.Lock()
+
+    def spy(*args):
+        with lock:
+            calls.append(args)
+        time.sleep(BUILD_SECONDS)
+        return build(*args)
+
+    monkeypatch.setattr(cache, 'get_heatmap_payload', spy)
+    return calls
+
+
+@pytest.fixture
+async def http(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        yield client
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('headers', [{}, BINARY], ids=['json', 'binary'])
+async def test_identical_cold_queries_build_once(http, slow_builder, headers):
+    responses = await asyncio.gather(*(http.get(HEATMAP, headers=headers) for _ in range(8)))
+    assert [r.status_code for r in responses] == [200] * 8
+    assert len({r.content for r in responses}) == 1
+    assert len(slow_builder) == 1
+
+
+@pytest.mark.anyio
+async def test_health_responsive_during_cold_queries(http, slow_builder):
+    queries = [
+        asyncio.ensure_future(http.get(f'/api/heatmap?month=202502&hour={hour}'))
+        for hour in range(4)
+    ]
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    health = await http.get('/health')
+    elapsed = time.perf_counter() - started
+    assert health.status_code == 200
+    assert elapsed < BUILD_SECONDS / 2
+    assert not all(q.done() for q in queries)
+
+    responses = await asyncio.gather(*queries)
+    assert [r.status_code for r in responses] == [200] * 4
+    assert len(slow_builder) == 4
+
+
+@pytest.mark.anyio
+async def test_inline_baseline_blocks_health(http, slow_builder, monkeypatch):
+    monkeypatch.setitem(QUERY_CONFIG, 'workers', 0)
+    started = time.perf_counter()
+    query = asyncio.ensure_future(http.get(HEATMAP))
+    await asyncio.sleep(0.05)
+
+    # The build ran on the event loop, so nothing else was served meanwhile
+    health = await http.get('/health')
+    elapsed = time.perf_counter() - started
+    assert health.status_code == 200
+    assert elapsed >= BUILD_SECONDS / 2
+    assert (await query).status_code == 200
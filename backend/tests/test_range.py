@@ -0,0 +1,60 @@
+"""
+Hour-range / multi-month aggregation against a pandas groupby.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.data_loader import DataCache
+from src.utils.config import STORAGE_CONFIG
+
+
+@pytest.fixture(params=['on', 'off'])
+def cache(request, csv_path, monkeypatch):
+    """Cache answering from the dense prefix sums ('on') or from period slices ('off')."""
+    monkeypatch.setitem(STORAGE_CONFIG, 'dense_tensor', request.param)
+    cache = DataCache(str(csv_path), None)
+    assert (cache.dense is not None) == (request.param == 'on')
+    return cache
+
+
+def _expected(frame, months, hour_start, hour_end, metric, day_type, agg):
+    if hour_start <= hour_end:
+        hours = frame['hour'].between(hour_start, hour_end)
+    else:
+        hours = (frame['hour'] >= hour_start) | (frame['hour'] <= hour_end)
+    rows = frame[frame['month'].isin(months) & hours & (frame['day_type'] == day_type)]
+    grouped = rows.groupby(['gx', 'gy'])[metric]
+    return (grouped.mean() if agg == 'mean' else grouped.sum()).rename('weight').reset_index()
+
+
+def _actual(columns):
+    frame = pd.DataFrame({name: columns[name] for name in ('gx', 'gy', 'weight')})
+    return frame.astype({'gx': np.int64, 'gy': np.int64}).sort_values(['gx', 'gy']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('months, hour_start, hour_end', [
+    ([202412], 8, 8),
+    ([202412, 202505], 6, 18),
+    ([202502], 22, 2),
+    ([202412, 202502, 202505], 23, 0),
+    ([202502], 0, 23),
+])
+@pytest.mark.parametrize('agg', ['sum', 'mean'])
+def test_range_matches_groupby(cache, dataset_frame, months, hour_start, hour_end, agg):
+    for metric in ('avg_total_users', 'avg_users_over_30min'):
+        for day_type in ('平日', '假日'):
+            columns = cache.get_heatmap_range_columns(months, hour_start, hour_end, metric, day_type, agg)
+            expected = _expected(dataset_frame, months, hour_start, hour_end, metric, day_type, agg)
+            actual = _actual(columns)
+            np.testing.assert_array_equal(actual[['gx', 'gy']], expected[['gx', 'gy']])
+            np.testing.assert_allclose(actual['weight'], expected['weight'], rtol=1e-5)
+
+
+def test_range_of_missing_hours_is_empty(csv_path, tmp_path):
+    frame = pd.read_csv(csv_path)
+    frame[frame['hour'] < 12].to_csv(tmp_path / 'morning.csv', index=False)
+    cache = DataCache(str(tmp_path / 'morning.csv'), None)
+    assert len(cache.get_heatmap_range_columns([202412], 14, 20)['weight']) == 0
+    assert len(cache.get_heatmap_range_columns([202412], 22, 3)['weight']) > 0
@@ -0,0 +1,163 @@
+"""
+Server-rendered raster tiles: rendering, caching and dataset versions.
+"""
+
+import math
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.coordinate_converter import gxgy_to_latlon
+from src.services.data_loader import DataCache
+from src.services.raster import (
+    NAMESPACE_MARKER, TILE_NAMESPACE, RasterTileCache, empty_tile_png, render_tile_png
+)
+from src.services.tiles import TILE_SIZE, tile_bounds, tile_pixels
+from src.utils.config import RASTER_CONFIG
+
+
+VERSION = '0123456789abcdef'
+
+
+def decode_png(png):
+    """Decode an RGBA PNG written by encode_png (unfiltered rows)."""
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    width, height, depth, color = struct.unpack('>IIBB', png[16:26])
+    assert (depth, color) == (8, 6)
+    idat = png[33:]
+    length = struct.unpack('>I', idat[:4])[0]
+    assert idat[4:8] == b'IDAT'
+    rows = np.frombuffer(zlib.decompress(idat[8:8 + length]), dtype=np.uint8).reshape(height, width * 4 + 1)
+    return rows[:, 1:].reshape(height, width, 4)
+
+
+def tile_of(lat, lng, z):
+    """XYZ tile containing a point."""
+    n = 1 << z
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return z, x, y
+
+
+def test_tile_renders_point():
+    lat, lng = gxgy_to_latlon(7020, 6820)
+    z, x, y = tile_of(lat, lng, 15)
+    png = render_tile_png(_columns([lat], [lng], [5.0]), z, x, y, (0.0, 5.0), 10, 10)
+    rgba = decode_png(png)
+    assert rgba.shape == (TILE_SIZE, TILE_SIZE, 4)
+
+    px, py = tile_pixels(np.array([lat]), np.array([lng]), z, x, y)
+    col, row = int(px[0]), int(py[0])
+    assert rgba[row, col, 3] > 200
+    # Red end of the gradient at full weight, nothing beyond the kernel
+    assert rgba[row, col, 0] > rgba[row, col, 2]
+    far = (row + 40) % TILE_SIZE, (col + 40) % TILE_SIZE
+    assert rgba[far][3] == 0
+    assert (decode_png(empty_tile_png())[..., 3] == 0).all()
+
+
+def _columns(lat, lng, weight):
+    return {'lat': np.asarray(lat, dtype=np.float64), 'lng': np.asarray(lng, dtype=np.float64),
+            'weight': np.asarray(weight, dtype=np.float32)}
+
+
+def test_non_finite_points_are_skipped():
+    z, x, y = 14, 13721, 7014
+    west, south, east, north = tile_bounds(z, x, y)
+    lat = np.linspace(south, north, 5)[1:4]
+    lng = np.linspace(west, east, 5)[1:4]
+    clean = render_tile_png(_columns(lat[:2], lng[:2], [1.0, 2.0]), z, x, y, (1.0, 2.0), 15, 15)
+    dirty = render_tile_png(_columns(lat, lng, [1.0, 2.0, np.nan]), z, x, y, (1.0, 2.0), 15, 15)
+    assert clean != empty_tile_png()
+    assert dirty == clean
+    assert render_tile_png(_columns(lat[:1], lng[:1], [np.inf]), z, x, y, (0.0, 1.0), 15, 15) == empty_tile_png()
+
+
+def test_weight_range_ignores_nan(tmp_path, dataset_frame):
+    frame = dataset_frame.copy()
+    period = (frame['month'] == 202412) & (frame['hour'] == 8) & (frame['day_type'] == '平日')
+    frame.loc[frame.index[period][0], 'avg_total_users'] = np.nan
+    frame.to_csv(tmp_path / 'nan.csv', index=False)
+    cache = DataCache(str(tmp_path / 'nan.csv'), None)
+    weights = pd.to_numeric(frame.loc[period, 'avg_total_users']).dropna().astype(np.float32)
+    assert cache.weight_range(202412, 8, 'avg_total_users', '平日') == (float(weights.min()), float(weights.max()))
+
+
+def test_tiles_are_cached_in_memory_and_on_disk(tmp_path):
+    rendered = []
+
+    def render():
+        rendered.append(1)
+        return b'png'
+
+    tiles = RasterTileCache(8, tmp_path, VERSION)
+    assert tiles.get_or_render(['a'], 3, 1, 2, render) == b'png'
+    assert tiles.get_or_render(['a'], 3, 1, 2, render) == b'png'
+    assert len(rendered) == 1
+    assert len(list((tmp_path / TILE_NAMESPACE / VERSION).rglob('2.png'))) == 1
+
+    # Another process (or a restart) reads the tile back from disk
+    assert RasterTileCache(8, tmp_path, VERSION).get_or_render(['a'], 3, 1, 2, render) == b'png'
+    assert len(rendered) == 1
+
+    # Other parameters are other tiles
+    tiles.get_or_render(['b'], 3, 1, 2, render)
+    assert len(rendered) == 2
+
+
+def test_memory_only_cache(tmp_path):
+    tiles = RasterTileCache(8, None, VERSION)
+    assert tiles.directory is None
+    assert tiles.get_or_render(['a'], 0, 0, 0, lambda: b'png') == b'png'
+    assert not list(tmp_path.iterdir())
+
+
+def test_pruning_keeps_foreign_files(tmp_path):
+    (tmp_path / 'important_stuff').mkdir()
+    (tmp_path / 'important_stuff' / 'notes.txt').write_text('keep me')
+    RasterTileCache(8, tmp_path, 'fedcba9876543210').get_or_render(['a'], 0, 0, 0, lambda: b'old')
+    (tmp_path / TILE_NAMESPACE / 'notes').mkdir()
+
+    tiles = RasterTileCache(8, tmp_path, VERSION)
+    assert (tmp_path / 'important_stuff' / 'notes.txt').read_text() == 'keep me'
+    assert (tmp_path / TILE_NAMESPACE / 'notes').is_dir()
+    assert (tmp_path / TILE_NAMESPACE / NAMESPACE_MARKER).exists()
+    assert not (tmp_path / TILE_NAMESPACE / 'fedcba9876543210').exists()
+    assert tiles.get_or_render(['a'], 0, 0, 0, lambda: b'new') == b'new'
+
+
+def test_unmarked_namespace_is_not_pruned(tmp_path):
+    (tmp_path / TILE_NAMESPACE / 'fedcba9876543210').mkdir(parents=True)
+    RasterTileCache(8, tmp_path, VERSION)
+    assert (tmp_path / TILE_NAMESPACE / 'fedcba9876543210').is_dir()
+
+
+@pytest.fixture
+def tile_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(RASTER_CONFIG, 'disk_cache', True)
+    monkeypatch.setitem(RASTER_CONFIG, 'dir', str(tmp_path / 'tiles'))
+    return tmp_path / 'tiles' / TILE_NAMESPACE
+
+
+def test_new_dataset_version_gets_new_tiles(tile_dir, csv_path, dataset_frame):
+    lat, lng = gxgy_to_latlon(7024, 6824)
+    z, x, y = tile_of(lat, lng, 13)
+
+    cache = DataCache(str(csv_path), None)
+    first = cache.get_raster_tile(z, x, y, 202412, 9, 'avg_total_users', '平日')
+    assert decode_png(first)[..., 3].any()
+    assert cache.get_raster_tile(z, x, y, 202412, 9, 'avg_total_users', '平日') is first
+    assert (tile_dir / cache.version).is_dir()
+
+    frame = dataset_frame.copy()
+    frame['avg_total_users'] *= np.where(frame['gx'] % 2 == 0, 4.0, 0.25)
+    frame.to_csv(csv_path, index=False)
+    reloaded = DataCache(str(csv_path), None)
+    assert reloaded.version != cache.version
+
+    second = reloaded.get_raster_tile(z, x, y, 202412, 9, 'avg_total_users', '平日')
+    assert second != first
+    assert [p.name for p in tile_dir.iterdir() if p.is_dir()] == [reloaded.version]
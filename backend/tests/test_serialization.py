@@ -0,0 +1,45 @@
+"""
+Heatmap body rendering from column arrays.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from src.services.serialization import render_heatmap_binary, render_heatmap_json
+
+
+def _columns(weight, lat=None):
+    n = len(weight)
+    return {
+        'gx': np.arange(n, dtype=np.int16),
+        'gy': np.arange(n, dtype=np.int16) + 10,
+        'lat': np.asarray(lat if lat is not None else np.linspace(25.0, 25.1, n), dtype=np.float64),
+        'lng': np.linspace(121.5, 121.6, n),
+        'weight': np.asarray(weight, dtype=np.float32),
+    }
+
+
+def test_json_matches_schema():
+    body = json.loads(render_heatmap_json(202412, 7, 'avg_total_users', _columns([1.5, 3.0])))
+    assert body['count'] == 2
+    assert body['min_weight'] == 1.5 and body['max_weight'] == 3.0
+    assert body['data'][1] == {'gx': 1, 'gy': 11, 'lat': 25.1, 'lng': 121.6, 'weight': 3.0}
+
+
+def test_json_skips_non_finite_points():
+    columns = _columns([1.0, np.nan, 2.0, np.inf], lat=[25.0, 25.1, np.nan, 25.3])
+    raw = render_heatmap_json(202412, 7, 'avg_total_users', columns).decode('utf-8')
+    # Strict parsing: bare NaN / Infinity would be rejected
+    body = json.loads(raw, parse_constant=lambda name: (_ for _ in ()).throw(ValueError(name)))
+    assert body['count'] == 1
+    assert [p['gx'] for p in body['data']] == [0]
+    assert body['min_weight'] == body['max_weight'] == 1.0
+
+
+def test_binary_skips_non_finite_points():
+    payload = render_heatmap_binary(202412, 7, 'avg_total_users', _columns([1.0, np.nan, 2.0]))
+    magic, _, hour, _, count, month, min_weight, max_weight = struct.unpack_from('<4sHBBIIff', payload)
+    assert (magic, hour, month, count) == (b'HMAP', 7, 202412, 2)
+    assert (min_weight, max_weight) == (1.0, 2.0)
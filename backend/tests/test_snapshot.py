@@ -0,0 +1,61 @@
+"""
+Snapshot round trip: a DataCache restored from its snapshot matches the
+one built from the CSV, and stale snapshots are rebuilt.
+"""
+
+import numpy as np
+
+from src.services import snapshot
+from src.services.data_loader import DERIVED_ARRAYS, DataCache
+
+
+def _assert_same_cache(a: DataCache, b: DataCache):
+    assert a.lookup_dict == b.lookup_dict
+    assert list(a.columns) == list(b.columns)
+    for name in a.columns:
+        np.testing.assert_array_equal(a.columns[name], b.columns[name], err_msg=name)
+    for name in DERIVED_ARRAYS:
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name), err_msg=name)
+    np.testing.assert_array_equal(a.atlas.lat, b.atlas.lat)
+    assert a.available_months == b.available_months
+    assert a.available_day_types == b.available_day_types
+    month, hour, day_type = next(iter(a.lookup_dict))
+    assert a.get_demographics(month, hour, 'avg_total_users', day_type) == \
+        b.get_demographics(month, hour, 'avg_total_users', day_type)
+
+
+def test_snapshot_round_trip(csv_path, tmp_path):
+    snapshot_dir = tmp_path / 'snapshots'
+    reference = DataCache(str(csv_path))
+    built = DataCache(str(csv_path), snapshot_dir)
+    assert 'csv_parse' in built.load_timings.phases
+    assert any(snapshot_dir.glob('*.snapshot'))
+
+    restored = DataCache(str(csv_path), snapshot_dir)
+    assert 'csv_parse' not in restored.load_timings.phases
+    _assert_same_cache(reference, restored)
+    _assert_same_cache(reference, built)
+
+
+def test_changed_csv_rebuilds_snapshot(csv_path, tmp_path, dataset_frame):
+    snapshot_dir = tmp_path / 'snapshots'
+    DataCache(str(csv_path), snapshot_dir)
+
+    dataset_frame.loc[0, 'avg_total_users'] += 1
+    dataset_frame.to_csv(csv_path, index=False)
+    changed = DataCache(str(csv_path), snapshot_dir)
+    assert 'csv_parse' in changed.load_timings.phases
+    _assert_same_cache(DataCache(str(csv_path)), changed)
+    # The snapshot of the old content is pruned
+    assert len(list(snapshot_dir.glob('*.snapshot'))) == 1
+
+
+def test_snapshot_version_change_rebuilds(csv_path, tmp_path, monkeypatch):
+    snapshot_dir = tmp_path / 'snapshots'
+    DataCache(str(csv_path), snapshot_dir)
+
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_VERSION', snapshot.SNAPSHOT_VERSION + 1)
+    rebuilt = DataCache(str(csv_path), snapshot_dir)
+    assert 'csv_parse' in rebuilt.load_timings.phases
+    # The rebuilt snapshot carries the new version and is used next time
+    assert 'csv_parse' not in DataCache(str(csv_path), snapshot_dir).load_timings.phases
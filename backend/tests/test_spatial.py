@@ -0,0 +1,62 @@
+"""
+Morton box queries against a plain gx/gy filter.
+"""
+
+import numpy as np
+import pytest
+
+from src.services.data_loader import DataCache
+from src.services.spatial import box_key_ranges, cells_in_box, morton_keys
+
+
+@pytest.fixture(scope='module')
+def cells():
+    rng = np.random.default_rng(3)
+    keys = np.unique((rng.integers(6500, 7600, 20000) << 16) | rng.integers(6300, 7300, 20000))
+    gx, gy = (keys >> 16).astype(np.int16), (keys & 0xFFFF).astype(np.int16)
+    order = np.argsort(morton_keys(gx, gy))
+    return gx[order], gy[order]
+
+
+def _boxes():
+    rng = np.random.default_rng(4)
+    boxes = [(7000, 6800, 7000, 6800), (6400, 6200, 7700, 7400), (7100, 6500, 7099, 6600), (0, 0, 3, 3)]
+    for _ in range(40):
+        gx0, gy0 = rng.integers(6400, 7600), rng.integers(6200, 7300)
+        boxes.append((gx0, gy0, gx0 + rng.integers(0, 400), gy0 + rng.integers(0, 400)))
+    return boxes
+
+
+@pytest.mark.parametrize('box', _boxes())
+def test_cells_in_box_matches_filter(cells, box):
+    gx, gy = cells
+    expected = np.flatnonzero((gx >= box[0]) & (gx <= box[2]) & (gy >= box[1]) & (gy <= box[3]))
+    found = cells_in_box(morton_keys(gx, gy), gx, gy, box)
+    np.testing.assert_array_equal(found, expected)
+
+
+@pytest.mark.parametrize('box', _boxes()[:10])
+def test_key_ranges_cover_box(box):
+    ranges = box_key_ranges(box)
+    assert (ranges[1:, 0] > ranges[:-1, 1]).all()
+    bx, by = np.meshgrid(np.arange(box[0], box[2] + 1), np.arange(box[1], box[3] + 1))
+    keys = morton_keys(bx.ravel(), by.ravel())
+    slot = np.searchsorted(ranges[:, 0], keys, side='right') - 1
+    assert (slot >= 0).all() and (keys <= ranges[slot, 1]).all()
+
+
+def test_heatmap_box_matches_filter(csv_path, dataset_frame):
+    cache = DataCache(str(csv_path), None)
+    box = (7010, 6810, 7030, 6840)
+    rows = dataset_frame[
+        (dataset_frame['month'] == 202502) & (dataset_frame['hour'] == 9) & (dataset_frame['day_type'] == '平日')
+        & dataset_frame['gx'].between(box[0], box[2]) & dataset_frame['gy'].between(box[1], box[3])
+    ]
+    for columns in (
+        cache.get_heatmap_columns(202502, 9, 'avg_total_users', '平日', box),
+        cache.get_heatmap_range_columns([202502], 9, 9, 'avg_total_users', '平日', box=box),
+    ):
+        found = sorted(zip(columns['gx'].tolist(), columns['gy'].tolist(), columns['weight'].tolist()))
+        expected = sorted(zip(rows['gx'], rows['gy'], rows['avg_total_users']))
+        assert [cell[:2] for cell in found] == [cell[:2] for cell in expected]
+        np.testing.assert_allclose([c[2] for c in found], [c[2] for c in expected], rtol=1e-6)
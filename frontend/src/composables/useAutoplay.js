@@ -1,15 +1,22 @@
 /**
  * useAutoplay Composable
  * Manages automatic hour cycling with 1-second intervals
+ *
+ * When a stream source ({ month, metric, dayType } refs) is given and the
+ * browser supports EventSource, frames are pushed by the server at the
+ * playback rate and cached before the hour advances. Otherwise the day is
+ * prefetched in one request and a local interval cycles the hours.
  */
 
-import { ref, computed, watch, onUnmounted } from 'vue'
+import { ref, computed, watch, onUnmounted, unref } from 'vue'
+import { openPlaybackStream, prefetchHeatmapData } from '../services/dataService'
 
-export function useAutoplay(initialHour = 0) {
+export function useAutoplay(initialHour = 0, streamSource = null) {
   // State
   const currentHour = ref(initialHour)
   const isPlaying = ref(false)
   const intervalId = ref(null)
+  const eventSource = ref(null)
   const intervalDuration = 1000 // 1 second interval
 
   // Computed
@@ -17,10 +24,14 @@ export function useAutoplay(initialHour = 0) {
   const canPause = computed(() => isPlaying.value)
 
   // Methods
-  function play() {
-    if (isPlaying.value) return
-
-    isPlaying.value = true
+  function startInterval() {
+    if (streamSource) {
+      prefetchHeatmapData(
+        unref(streamSource.month),
+        unref(streamSource.metric),
+        unref(streamSource.dayType)
+      )
+    }
 
     // Start interval to cycle through hours
     intervalId.value = setInterval(() => {
@@ -28,6 +39,40 @@ export function useAutoplay(initialHour = 0) {
     }, intervalDuration)
   }
 
+  function startStream() {
+    eventSource.value = openPlaybackStream(
+      {
+        month: unref(streamSource.month),
+        metric: unref(streamSource.metric),
+        dayType: unref(streamSource.dayType),
+        startHour: (currentHour.value + 1) % 24,
+        intervalMs: intervalDuration
+      },
+      (frame) => {
+        currentHour.value = frame.hour
+      },
+      () => {
+        // Stream unavailable: fall back to local interval playback
+        eventSource.value = null
+        if (isPlaying.value && !intervalId.value) {
+          startInterval()
+        }
+      }
+    )
+  }
+
+  function play() {
+    if (isPlaying.value) return
+
+    isPlaying.value = true
+
+    if (streamSource && typeof EventSource !== 'undefined') {
+      startStream()
+    } else {
+      startInterval()
+    }
+  }
+
   function pause() {
     if (!isPlaying.value) return
 
@@ -37,6 +82,11 @@ export function useAutoplay(initialHour = 0) {
       clearInterval(intervalId.value)
       intervalId.value = null
     }
+
+    if (eventSource.value) {
+      eventSource.value.close()
+      eventSource.value = null
+    }
   }
 
   function reset() {
@@ -24,6 +24,11 @@ export function useHeatmapData() {
     return heatmapData.value?.data || []
   })
 
+  // Column typed arrays when the binary heatmap format is in use
+  const dataColumns = computed(() => {
+    return heatmapData.value?.columns || null
+  })
+
   const statistics = computed(() => {
     if (!heatmapData.value) return null
 
@@ -144,6 +149,7 @@ export function useHeatmapData() {
 
     // Computed
     dataPoints,
+    dataColumns,
     statistics,
     availableMonths,
     availableHours,
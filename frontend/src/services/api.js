@@ -14,6 +14,9 @@ const apiClient = axios.create({
   }
 })
 
+// Retries while the backend is still loading its data (503 with Retry-After)
+const MAX_NOT_READY_RETRIES = 30
+
 // Request interceptor
 apiClient.interceptors.request.use(
   (config) => {
@@ -31,6 +34,16 @@ apiClient.interceptors.response.use(
     return response.data
   },
   (error) => {
+    // Backend still loading data: wait as instructed and retry the request
+    const { config, response } = error
+    if (response && response.status === 503 && config) {
+      config.notReadyRetries = (config.notReadyRetries || 0) + 1
+      if (config.notReadyRetries <= MAX_NOT_READY_RETRIES) {
+        const delay = (parseInt(response.headers['retry-after'], 10) || 1) * 1000
+        return new Promise((resolve) => setTimeout(resolve, delay)).then(() => apiClient(config))
+      }
+    }
+
     // Handle errors globally
     if (error.response) {
       // Server responded with error status
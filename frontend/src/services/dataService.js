@@ -5,11 +5,30 @@
 
 import apiClient from './api'
 
+// Binary heatmap wire format (see backend/src/services/serialization.py)
+export const HEATMAP_BINARY_TYPE = 'application/vnd.heatmap+octet-stream'
+export const HEATMAP_FRAMES_TYPE = 'application/vnd.heatmap-frames+octet-stream'
+const HEATMAP_BINARY_MAGIC = 'HMAP'
+const HEATMAP_BINARY_VERSION = 1
+const HEATMAP_BINARY_HEADER_SIZE = 24
+
+// Request the compact binary heatmap encoding instead of JSON
+const USE_BINARY_HEATMAP = true
+
+// Load the map's heatmap layer from /api/tiles (visible tiles only) instead
+// of one request per period
+export const USE_TILED_HEATMAP = false
+
+// Show server-rendered heatmap PNG tiles instead of drawing the heatmap in
+// the browser (for slow clients such as kiosks)
+export const USE_RASTER_HEATMAP = false
+
 // Simple in-memory cache
 const cache = {
   metadata: null,
   heatmapData: new Map(),
-  demographicData: new Map()
+  demographicData: new Map(),
+  cellProfiles: new Map()
 }
 
 /**
@@ -31,16 +50,78 @@ export async function getMetadata() {
   }
 }
 
+/**
+ * Decode a binary heatmap payload into typed arrays
+ * Column views share the response buffer, so no per-point parsing happens.
+ * @param {ArrayBuffer} buffer - Response body in the binary heatmap format
+ * @param {string} metric - Metric the payload was requested for
+ * @returns {Object} Heatmap data with column typed arrays (lat/lng/weight/gx/gy)
+ */
+export function decodeHeatmapBinary(buffer, metric) {
+  const view = new DataView(buffer)
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4))
+  if (magic !== HEATMAP_BINARY_MAGIC) {
+    throw new Error('Invalid heatmap payload')
+  }
+  const version = view.getUint16(4, true)
+  if (version !== HEATMAP_BINARY_VERSION) {
+    throw new Error(`Unsupported heatmap payload version: ${version}`)
+  }
+
+  const count = view.getUint32(8, true)
+  let offset = HEATMAP_BINARY_HEADER_SIZE
+
+  // Typed arrays use platform byte order; every supported browser platform is little-endian
+  const lat = new Float32Array(buffer, offset, count)
+  offset += count * 4
+  const lng = new Float32Array(buffer, offset, count)
+  offset += count * 4
+  const weight = new Float32Array(buffer, offset, count)
+  offset += count * 4
+  const gx = new Int16Array(buffer, offset, count)
+  offset += count * 2
+  const gy = new Int16Array(buffer, offset, count)
+
+  return {
+    month: view.getUint32(12, true),
+    hour: view.getUint8(6),
+    metric,
+    count,
+    min_weight: view.getFloat32(16, true),
+    max_weight: view.getFloat32(20, true),
+    columns: { lat, lng, weight, gx, gy }
+  }
+}
+
+/**
+ * Store heatmap data in the cache, evicting the oldest entries when full
+ * @param {string} cacheKey - `${month}-${hour}-${metric}-${dayType}`
+ * @param {Object} data - Heatmap data
+ */
+function cacheHeatmapData(cacheKey, data) {
+  cache.heatmapData.set(cacheKey, data)
+
+  // Limit cache size to prevent memory issues
+  while (cache.heatmapData.size > 100) {
+    const firstKey = cache.heatmapData.keys().next().value
+    cache.heatmapData.delete(firstKey)
+  }
+}
+
 /**
  * Get heatmap data for specific time period
  * @param {number} month - Month in YYYYMM format
  * @param {number} hour - Hour (0-23)
  * @param {string} metric - Metric name
  * @param {string} dayType - Day type (平日 or 假日)
- * @returns {Promise<Object>} Heatmap data with lat/lng/weight points
+ * @param {number[]|null} bbox - Optional viewport [minLng, minLat, maxLng, maxLat]
+ *   (an EPSG:4326 extent); only cells inside it are returned
+ * @returns {Promise<Object>} Heatmap data; binary responses carry `columns`
+ *   typed arrays, JSON responses carry a `data` array of lat/lng/weight points
  */
-export async function getHeatmapData(month, hour, metric = 'avg_total_users', dayType = '平日') {
-  const cacheKey = `${month}-${hour}-${metric}-${dayType}`
+export async function getHeatmapData(month, hour, metric = 'avg_total_users', dayType = '平日', bbox = null) {
+  const bboxParam = bbox ? bbox.join(',') : null
+  const cacheKey = `${month}-${hour}-${metric}-${dayType}${bboxParam ? `-${bboxParam}` : ''}`
 
   // Return cached data if available
   if (cache.heatmapData.has(cacheKey)) {
@@ -48,28 +129,109 @@ export async function getHeatmapData(month, hour, metric = 'avg_total_users', da
   }
 
   try {
-    const data = await apiClient.get('/heatmap', {
-      params: { month, hour, metric, day_type: dayType }
-    })
+    const params = { month, hour, metric, day_type: dayType }
+    if (bboxParam) {
+      params.bbox = bboxParam
+    }
+    const data = USE_BINARY_HEATMAP
+      ? decodeHeatmapBinary(
+        await apiClient.get('/heatmap', {
+          params,
+          responseType: 'arraybuffer',
+          headers: { Accept: HEATMAP_BINARY_TYPE }
+        }),
+        metric
+      )
+      : await apiClient.get('/heatmap', { params })
 
     // Cache the result
-    cache.heatmapData.set(cacheKey, data)
+    cacheHeatmapData(cacheKey, data)
+
+    return data
+  } catch (error) {
+    console.error('Failed to fetch heatmap data:', error)
+    throw error
+  }
+}
+
+/**
+ * Get the heatmap points of one XYZ map tile
+ * Tiles are not kept in the in-memory cache; the browser HTTP cache serves
+ * repeated tiles (responses carry an ETag).
+ * @param {number} z - Tile zoom
+ * @param {number} x - Tile column
+ * @param {number} y - Tile row
+ * @param {number} month - Month in YYYYMM format
+ * @param {number} hour - Hour (0-23)
+ * @param {string} metric - Metric name
+ * @param {string} dayType - Day type (平日 or 假日)
+ * @returns {Promise<Object>} Decoded binary heatmap data; min_weight/max_weight
+ *   hold the weight range of the whole period
+ */
+export async function getHeatmapTile(z, x, y, month, hour, metric = 'avg_total_users', dayType = '平日') {
+  const buffer = await apiClient.get(`/tiles/${z}/${x}/${y}`, {
+    params: { month, hour, metric, day_type: dayType },
+    responseType: 'arraybuffer',
+    headers: { Accept: HEATMAP_BINARY_TYPE }
+  })
+  return decodeHeatmapBinary(buffer, metric)
+}
+
+/**
+ * Get the XYZ URL template of server-rendered heatmap tiles
+ * @param {Object} query - Period ({ month, hour, metric, dayType })
+ * @param {number} radius - Heatmap point radius in pixels
+ * @param {number} blur - Heatmap blur size in pixels
+ * @returns {string} URL with {z}/{x}/{y} placeholders for an XYZ tile source
+ */
+export function getHeatmapRasterUrl(query, radius, blur) {
+  const params = new URLSearchParams({
+    month: query.month,
+    hour: query.hour,
+    metric: query.metric,
+    day_type: query.dayType,
+    radius: Math.round(radius),
+    blur: Math.round(blur)
+  })
+  return `${apiClient.defaults.baseURL}/tiles/{z}/{x}/{y}.png?${params}`
+}
 
-    // Limit cache size to prevent memory issues
-    if (cache.heatmapData.size > 100) {
-      const firstKey = cache.heatmapData.keys().next().value
-      cache.heatmapData.delete(firstKey)
+/**
+ * Get the time profile of one grid cell (every month, day type, hour and metric)
+ * @param {number} gx - Grid X coordinate
+ * @param {number} gy - Grid Y coordinate
+ * @returns {Promise<Object>} Profile with months/day_types/hours axes and
+ *   `values[metric][month][day_type][hour]` (null where the cell has no data)
+ */
+export async function getCellProfile(gx, gy) {
+  const cacheKey = `${gx}-${gy}`
+
+  // Return cached data if available
+  if (cache.cellProfiles.has(cacheKey)) {
+    return cache.cellProfiles.get(cacheKey)
+  }
+
+  try {
+    const data = await apiClient.get(`/cell/${gx}/${gy}/profile`)
+    cache.cellProfiles.set(cacheKey, data)
+
+    // Limit cache size
+    while (cache.cellProfiles.size > 200) {
+      const firstKey = cache.cellProfiles.keys().next().value
+      cache.cellProfiles.delete(firstKey)
     }
 
     return data
   } catch (error) {
-    console.error('Failed to fetch heatmap data:', error)
+    console.error('Failed to fetch cell profile:', error)
     throw error
   }
 }
 
 /**
  * Get demographic statistics for specific time period
+ * A cache miss fetches every metric's distribution for the period in one
+ * request, so switching metrics afterwards is served from the cache.
  * @param {number} month - Month in YYYYMM format
  * @param {number} hour - Hour (0-23)
  * @param {string} metric - Metric name for weighting
@@ -85,26 +247,68 @@ export async function getDemographics(month, hour, metric = 'avg_total_users', d
   }
 
   try {
-    const data = await apiClient.get('/demographics', {
-      params: { month, hour, metric, day_type: dayType }
+    const data = await apiClient.get('/demographics/all', {
+      params: { month, hour, day_type: dayType }
     })
 
-    // Cache the result
-    cache.demographicData.set(cacheKey, data)
+    // Cache the result for every metric
+    for (const [metricKey, metricData] of Object.entries(data.metrics)) {
+      cache.demographicData.set(`${month}-${hour}-${metricKey}-${dayType}`, metricData)
+    }
 
     // Limit cache size
-    if (cache.demographicData.size > 100) {
+    while (cache.demographicData.size > 400) {
       const firstKey = cache.demographicData.keys().next().value
       cache.demographicData.delete(firstKey)
     }
 
-    return data
+    return data.metrics[metric]
   } catch (error) {
     console.error('Failed to fetch demographics:', error)
     throw error
   }
 }
 
+/**
+ * Open the server-push playback stream (Server-Sent Events)
+ * Each pushed frame is cached before `onFrame` runs, so the regular
+ * getHeatmapData/getDemographics calls for that hour are cache hits.
+ * @param {Object} options - { month, metric, dayType, startHour, intervalMs }
+ * @param {Function} onFrame - Called with each frame ({ month, hour, heatmap, demographics })
+ * @param {Function} [onError] - Called if the stream fails
+ * @returns {EventSource} Stream handle; call close() to stop playback
+ */
+export function openPlaybackStream(options, onFrame, onError = null) {
+  const { month, metric, dayType, startHour = 0, intervalMs = 1000 } = options
+  const params = new URLSearchParams({
+    month,
+    metric,
+    day_type: dayType,
+    start_hour: startHour,
+    interval_ms: intervalMs
+  })
+  const source = new EventSource(`${apiClient.defaults.baseURL}/playback/stream?${params}`)
+
+  source.addEventListener('frame', (event) => {
+    const frame = JSON.parse(event.data)
+    cacheHeatmapData(`${frame.month}-${frame.hour}-${frame.metric}-${frame.day_type}`, frame.heatmap)
+    cache.demographicData.set(
+      `${frame.month}-${frame.hour}-${frame.metric}-${frame.day_type}`,
+      frame.demographics
+    )
+    onFrame(frame)
+  })
+
+  source.addEventListener('end', () => source.close())
+
+  source.onerror = (error) => {
+    source.close()
+    if (onError) onError(error)
+  }
+
+  return source
+}
+
 /**
  * Clear all caches (useful for testing or forcing refresh)
  */
@@ -112,23 +316,82 @@ export function clearCache() {
   cache.metadata = null
   cache.heatmapData.clear()
   cache.demographicData.clear()
+  cache.cellProfiles.clear()
 }
 
 /**
- * Prefetch data for better performance
- * @param {number} month - Month to prefetch
- * @param {string} metric - Metric to prefetch
+ * Split complete frames off the front of a streamed byte buffer
+ * @param {Uint8Array} pending - Bytes received but not yet consumed
+ * @param {boolean} binary - Length-prefixed binary frames (else NDJSON lines)
+ * @returns {{ frames: Array, rest: Uint8Array }} Complete frames and leftover bytes
  */
-export async function prefetchHeatmapData(month, metric = 'avg_total_users') {
-  const promises = []
+function splitFrames(pending, binary) {
+  const frames = []
+  let offset = 0
 
-  // Prefetch all 24 hours for the given month/metric
-  for (let hour = 0; hour < 24; hour++) {
-    promises.push(getHeatmapData(month, hour, metric))
+  if (binary) {
+    const view = new DataView(pending.buffer, pending.byteOffset, pending.byteLength)
+    while (pending.byteLength - offset >= 4) {
+      const length = view.getUint32(offset, true)
+      if (pending.byteLength - offset - 4 < length) break
+      // slice() copies the frame into its own aligned ArrayBuffer for typed-array views
+      frames.push(pending.slice(offset + 4, offset + 4 + length).buffer)
+      offset += 4 + length
+    }
+  } else {
+    let newline = pending.indexOf(10, offset)
+    while (newline !== -1) {
+      frames.push(JSON.parse(new TextDecoder().decode(pending.subarray(offset, newline))))
+      offset = newline + 1
+      newline = pending.indexOf(10, offset)
+    }
   }
 
+  return { frames, rest: pending.slice(offset) }
+}
+
+/**
+ * Prefetch all 24 hours of a month in one streamed request
+ * Frames are cached as they arrive, so the first hours are available
+ * before the whole month has been received.
+ * @param {number} month - Month to prefetch
+ * @param {string} metric - Metric to prefetch
+ * @param {string} dayType - Day type to prefetch
+ * @param {Function} [onFrame] - Called with each hour's heatmap data as it arrives
+ */
+export async function prefetchHeatmapData(month, metric = 'avg_total_users', dayType = '平日', onFrame = null) {
+  const params = new URLSearchParams({ month, metric, day_type: dayType })
+  const binary = USE_BINARY_HEATMAP
+
   try {
-    await Promise.all(promises)
+    const response = await fetch(`${apiClient.defaults.baseURL}/heatmap/pack?${params}`, {
+      headers: { Accept: binary ? HEATMAP_FRAMES_TYPE : 'application/x-ndjson' }
+    })
+    if (!response.ok) {
+      throw new Error(`Prefetch request failed: ${response.status}`)
+    }
+
+    const reader = response.body.getReader()
+    let pending = new Uint8Array(0)
+
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+
+      const merged = new Uint8Array(pending.byteLength + value.byteLength)
+      merged.set(pending)
+      merged.set(value, pending.byteLength)
+
+      const { frames, rest } = splitFrames(merged, binary)
+      pending = rest
+
+      for (const frame of frames) {
+        const data = binary ? decodeHeatmapBinary(frame, metric) : frame
+        cacheHeatmapData(`${month}-${data.hour}-${metric}-${dayType}`, data)
+        if (onFrame) onFrame(data)
+      }
+    }
+
     console.log(`Prefetched heatmap data for month ${month}, metric ${metric}`)
   } catch (error) {
     console.error('Prefetch failed:', error)